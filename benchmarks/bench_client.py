@@ -0,0 +1,262 @@
+"""
+End-to-end benchmark of the client against the scripted fake tsserver
+(tsserver_client/fake_server.py), measuring the client side of the pipe:
+request throughput and latency, pipelining, large bodies, geterr event
+fan-out, unsubscribed event storms, completion while typing and
+concurrency scaling.
+
+The server answers instantly unless told otherwise, so differences between
+runs come from TSServerComm. Results can be written as JSON and compared
+with an earlier run, e.g. one from the previous commit:
+
+    python benchmarks/bench_client.py --json after.json --compare before.json
+    python benchmarks/bench_client.py --codec json --lazy --only sequential pipelined
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tsserver_client import TSServerClient  # noqa: E402
+from tsserver_client.completion import TSServerCompletionSession  # noqa: E402
+from tsserver_client.fake_server import launch_options  # noqa: E402
+
+FILE = '/fake/src/index.ts'
+
+
+def percentiles(samples: list[float]) -> dict:
+    samples = sorted(samples)
+
+    def at(q):
+        return samples[min(len(samples) - 1, int(q / 100 * len(samples)))] * 1000
+
+    return {'p50_ms': at(50), 'p90_ms': at(90), 'p99_ms': at(99), 'max_ms': samples[-1] * 1000}
+
+
+async def start_client(opts: argparse.Namespace, *server_args: str) -> TSServerClient:
+    client = await TSServerClient.start(
+        launch_options(*server_args),
+        codec=opts.codec,
+        lazy_decode=opts.lazy
+    )
+    await client.cmd_configure()
+    await client.cmd_open(FILE)
+    return client
+
+
+async def bench_sequential(opts: argparse.Namespace) -> dict:
+    client = await start_client(opts)
+    try:
+        samples = []
+        start = time.perf_counter()
+        for i in range(opts.requests):
+            t = time.perf_counter()
+            await client.cmd_quick_info(FILE, i + 1, 1)
+            samples.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.stop()
+    return {'requests_per_s': opts.requests / elapsed, **percentiles(samples)}
+
+
+async def bench_pipelined(opts: argparse.Namespace) -> dict:
+    client = await start_client(opts)
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(client.cmd_quick_info(FILE, i + 1, 1) for i in range(opts.requests)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.stop()
+    return {'requests_per_s': opts.requests / elapsed}
+
+
+async def bench_batch(opts: argparse.Namespace) -> dict:
+    client = await start_client(opts)
+    try:
+        start = time.perf_counter()
+        async with client.batch() as batch:
+            for i in range(opts.requests):
+                batch.quick_info(FILE, i + 1, 1)
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.stop()
+    return {'requests_per_s': opts.requests / elapsed}
+
+
+async def bench_large_body(opts: argparse.Namespace) -> dict:
+    body_size = 1 << 20
+    n = max(1, opts.requests // 50)
+    client = await start_client(opts, '--body-size', str(body_size))
+    try:
+        samples = []
+        start = time.perf_counter()
+        for i in range(n):
+            t = time.perf_counter()
+            body = await client.cmd_quick_info(FILE, i + 1, 1)
+            len(body['padding'])  # make lazy decoding pay for the body
+            samples.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.stop()
+    return {'mib_per_s': n * body_size / elapsed / (1 << 20), **percentiles(samples)}
+
+
+async def bench_geterr(opts: argparse.Namespace) -> dict:
+    n_files = max(1, opts.requests // 10)
+    files = [f'/fake/src/file{i}.ts' for i in range(n_files)]
+    client = await start_client(opts, '--diagnostics', '20')
+    try:
+        await client.open_files(files)
+        start = time.perf_counter()
+        diagnostics = await client.cmd_get_errors(files)
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.stop()
+    return {
+        'events_per_s': 3 * n_files / elapsed,
+        'diagnostics_per_s': len(diagnostics) / elapsed
+    }
+
+
+async def bench_event_storm(opts: argparse.Namespace) -> dict:
+    storm = 20
+    n = max(1, opts.requests // 10)
+    client = await start_client(opts, '--event-storm', str(storm))
+    try:
+        start = time.perf_counter()
+        for i in range(n):
+            await client.cmd_quick_info(FILE, i + 1, 1)
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.stop()
+    return {'requests_per_s': n / elapsed, 'frames_per_s': n * (storm + 1) / elapsed}
+
+
+async def bench_completion(opts: argparse.Namespace) -> dict:
+    # typing identifiers: a completions request per keystroke vs one completionInfo per
+    # identifier, the server takes 1ms per request
+    words = ['getValue', 'createElementNode', 'handleUserEvent', 'parseConfigPath'] * max(1, opts.requests // 200)
+    keystrokes = sum(len(word) for word in words)
+    client = await start_client(opts, '--completions', '2000', '--latency', '1')
+    try:
+        start = time.perf_counter()
+        for word in words:
+            for i in range(1, len(word) + 1):
+                await client.cmd_completions(FILE, 1, i + 1, prefix=word[:i])
+        legacy = time.perf_counter() - start
+        session = TSServerCompletionSession(client, FILE)
+        start = time.perf_counter()
+        for n, word in enumerate(words):
+            for i in range(1, len(word) + 1):
+                await session.complete(n + 1, i + 1, prefix=word[:i], limit=50)
+            await session.details(k=5)
+        elapsed = time.perf_counter() - start
+    finally:
+        await client.stop()
+    return {'completions_keystrokes_per_s': keystrokes / legacy, 'session_keystrokes_per_s': keystrokes / elapsed}
+
+
+async def bench_concurrency(opts: argparse.Namespace) -> dict:
+    # tasks sending requests back to back, the server takes 0.2ms per request
+    client = await start_client(opts, '--latency', '0.2')
+    ret = {}
+    try:
+        for n_tasks in (1, 4, 16, 64):
+            per_task = max(1, opts.requests // n_tasks // 4)
+
+            async def worker(offset):
+                for i in range(per_task):
+                    await client.cmd_quick_info(FILE, offset + i + 1, 1)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(t * per_task) for t in range(n_tasks)))
+            ret[f'tasks_{n_tasks}_requests_per_s'] = n_tasks * per_task / (time.perf_counter() - start)
+    finally:
+        await client.stop()
+    return ret
+
+
+BENCHMARKS = {
+    'sequential': bench_sequential,
+    'pipelined': bench_pipelined,
+    'batch': bench_batch,
+    'large_body': bench_large_body,
+    'geterr': bench_geterr,
+    'event_storm': bench_event_storm,
+    'completion': bench_completion,
+    'concurrency': bench_concurrency
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(name: str, opts: argparse.Namespace) -> dict:
+    # median of every metric over the repeats
+    runs = [asyncio.run(BENCHMARKS[name](opts)) for _ in range(opts.repeat)]
+    return {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+
+
+def print_results(results: dict, baseline: dict):
+    for name, metrics in results.items():
+        print(name)
+        for key, value in metrics.items():
+            line = f'    {key:<28} {value:>14,.3f}'
+            old = baseline.get(name, {}).get(key, None)
+            if old:
+                line += f'    {value / old:6.2f}x  (was {old:,.3f})'
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the median is reported')
+    parser.add_argument('--codec', default=None, help='json, orjson, msgspec or auto')
+    parser.add_argument('--lazy', action='store_true', help='lazy_decode=True')
+    parser.add_argument('--only', nargs='*', choices=list(BENCHMARKS), default=None)
+    parser.add_argument('--json', default=None, help='write the results to this file')
+    parser.add_argument('--compare', default=None, help='results file of an earlier run')
+    opts = parser.parse_args()
+
+    baseline = {}
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)['results']
+    results = {name: run(name, opts) for name in (opts.only or BENCHMARKS)}
+    print_results(results, baseline)
+    if opts.json:
+        with open(opts.json, 'w') as f:
+            json.dump({
+                'meta': {
+                    'commit': git_commit(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'codec': opts.codec,
+                    'lazy': opts.lazy,
+                    'requests': opts.requests,
+                    'repeat': opts.repeat
+                },
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Micro-benchmark of the stdout framing/parsing path of TSServerComm.
+
+A fake server is simulated by feeding pre-built tsserver frames into an
+asyncio.StreamReader, so only the client side is measured. The `legacy`
+row is the readline/read based loop used before TSServerFrameReader, the
+`lazy` row peeks at headers and leaves response bodies undecoded.
+
+    python benchmarks/bench_framing.py [--messages N] [--body-size BYTES]
+"""
+import sys
+import time
+import json
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tsserver_client.codec import get_codec  # noqa: E402
+from tsserver_client.comm import TSServerOutputBody, TSServerResponse  # noqa: E402
+from tsserver_client.framing import TSServerFrameReader  # noqa: E402
+
+CONTENT_LENGTH_HEADER = b'Content-Length: '
+
+
+def build_stream(n_messages: int, body_size: int) -> bytes:
+    entries = max(1, body_size // 100)
+    out = bytearray()
+    for i in range(n_messages):
+        msg = json.dumps({
+            'seq': 0,
+            'type': 'response',
+            'command': 'references',
+            'request_seq': i,
+            'success': True,
+            'body': {'refs': [{'file': '/src/a.ts', 'start': {'line': j, 'offset': 1}} for j in range(entries)]}
+        }).encode('utf-8')
+        out += b'Content-Length: %d\r\n\r\n' % (len(msg) + 1) + msg + b'\n'
+    return bytes(out)
+
+
+def make_reader(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader(limit=2 ** 26)
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+async def legacy_loop(stream: asyncio.StreamReader) -> int:
+    count = 0
+    body_length = 0
+    while not stream.at_eof():
+        if body_length == 0:
+            b_header = (await stream.readline()).strip()
+            if b_header and b_header.startswith(CONTENT_LENGTH_HEADER):
+                body_length = int(b_header[len(CONTENT_LENGTH_HEADER):])
+        else:
+            b_body = await stream.read(body_length + 1)
+            body_length = 0
+            if TSServerOutputBody.from_bytes(b_body, get_codec('json')):
+                count += 1
+    return count
+
+
+async def framed_loop(stream: asyncio.StreamReader, codec_name: str) -> int:
+    codec = get_codec(codec_name)
+    count = 0
+    async for b_body in TSServerFrameReader(stream):
+        if TSServerOutputBody.from_bytes(b_body, codec):
+            count += 1
+    return count
+
+
+async def lazy_loop(stream: asyncio.StreamReader, codec_name: str) -> int:
+    codec = get_codec(codec_name)
+    count = 0
+    async for b_body in TSServerFrameReader(stream):
+        header = TSServerOutputBody.peek_header(b_body)
+        if TSServerResponse.lazy(b_body, header, codec).success:
+            count += 1
+    return count
+
+
+def available_codecs() -> list[str]:
+    names = []
+    for name in ('json', 'orjson', 'msgspec'):
+        try:
+            get_codec(name)
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+def run(label: str, coro_factory, data: bytes, n_messages: int):
+    async def timed():
+        stream = make_reader(data)
+        start = time.perf_counter()
+        return await coro_factory(stream), time.perf_counter() - start
+
+    count, elapsed = asyncio.run(timed())
+    print(f'{label:<20} {count:>8} msgs  {n_messages / elapsed:>12,.0f} msgs/s  {elapsed:8.3f} s')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--body-size', type=int, default=2000)
+    opts = parser.parse_args()
+
+    data = build_stream(opts.messages, opts.body_size)
+    print(f'{opts.messages} messages, {len(data) / 2 ** 20:.1f} MiB')
+    run('legacy/json', legacy_loop, data, opts.messages)
+    for name in available_codecs():
+        run(f'framed/{name}', lambda s, n=name: framed_loop(s, n), data, opts.messages)
+    run('framed/lazy', lambda s: lazy_loop(s, 'json'), data, opts.messages)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from tsserver_client import TSServerClient
+from tsserver_client.fake_server import launch_options
+
+
+def test_send_commands_returns_responses_in_request_order():
+    async def main():
+        client = await TSServerClient.start(launch_options('--jitter', '1'))
+        try:
+            resps = await client.send_commands([
+                ('quickinfo', {'file': '/p/a.ts', 'line': line, 'offset': 1}) for line in range(1, 41)
+            ], max_in_flight=8)
+            assert [resp.body['echo']['line'] for resp in resps] == list(range(1, 41))
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_timed_out_items_are_returned_as_exceptions():
+    async def main():
+        client = await TSServerClient.start(launch_options('--latency', '200'))
+        try:
+            resps = await client.send_commands([
+                ('quickinfo', {'file': '/p/a.ts', 'line': line, 'offset': 1}) for line in range(1, 4)
+            ], timeout=0.3)
+            assert resps[0].success
+            assert all(isinstance(resp, asyncio.TimeoutError) for resp in resps[1:])
+            # the late responses are not taken for later requests
+            info = await client.cmd_quick_info('/p/a.ts', 9, 1)
+            assert info['echo']['line'] == 9
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_batch_resolves_item_futures():
+    async def main():
+        client = await TSServerClient.start(launch_options())
+        try:
+            async with client.batch(max_in_flight=2) as batch:
+                infos = [batch.quick_info('/p/a.ts', line, 1) for line in range(1, 6)]
+                definition = batch.goto_definition('/p/a.ts', 2, 3)
+            assert [(await info).body['echo']['line'] for info in infos] == list(range(1, 6))
+            assert (await definition).command == 'definition'
+            assert len(batch.results) == 6
+            with pytest.raises(RuntimeError):
+                batch.add('quickinfo')
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
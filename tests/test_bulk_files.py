@@ -0,0 +1,44 @@
+import asyncio
+from tsserver_client import TSServerClient, TSServerMetrics
+from tsserver_client.fake_server import launch_options
+
+
+async def _open_files(client: TSServerClient) -> list[str]:
+    info = await client.cmd_project_info('/p/a.ts', need_file_name_list=True)
+    return sorted(info['fileNames'])
+
+
+def test_files_are_opened_and_closed_in_one_request():
+    async def main():
+        metrics = TSServerMetrics()
+        client = await TSServerClient.start(launch_options(), metrics=metrics)
+        try:
+            paths = [f'/p/{name}.ts' for name in 'abcd']
+            assert await client.open_files(paths[:2], contents={'/p/c.ts': 'let c;\n', '/p/d.ts': ''})
+            assert await _open_files(client) == paths
+            assert client.document('/p/c.ts').text == 'let c;\n'
+            assert await client.close_files(paths[1:3])
+            assert await _open_files(client) == ['/p/a.ts', '/p/d.ts']
+            assert client.document('/p/c.ts') is None
+            assert metrics.requests['updateOpen'] == 2 and 'open' not in metrics.requests
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_sync_files_sends_edits_of_documents_and_skips_empty_updates():
+    async def main():
+        metrics = TSServerMetrics()
+        client = await TSServerClient.start(launch_options(), metrics=metrics)
+        try:
+            await client.open_files(contents={'/p/a.ts': 'let a = 1;\n'}, project_root_path='/p')
+            assert await client.sync_files(changed={'/p/a.ts': 'let a = 2;\n'}, closed=[])
+            doc = client.document('/p/a.ts')
+            assert doc.text == 'let a = 2;\n' and doc.version == 1
+            assert await client.sync_files(changed={'/p/a.ts': 'let a = 2;\n'})
+            assert metrics.requests['updateOpen'] == 2
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+import asyncio
+from tsserver_client import TSServerClient
+from tsserver_client.cache import TSServerResultCache
+from tsserver_client.fake_server import launch_options
+
+
+def _key(cache: TSServerResultCache, cmd: str, path: str, line: int = 1, version: int = 0):
+    return cache.make_key(cmd, {'file': path, 'line': line, 'offset': 1}, version)
+
+
+def test_invalidating_a_file_drops_its_entries_and_project_entries():
+    cache = TSServerResultCache()
+    cache.put(_key(cache, 'quickinfo', '/p/a.ts'), {'a': 1})
+    cache.put(_key(cache, 'navtree', '/p/a.ts'), {'b': 1})
+    cache.put(_key(cache, 'navtree', '/p/b.ts'), {'c': 1})
+    cache.invalidate_file('/p/b.ts')
+    assert cache.get(_key(cache, 'quickinfo', '/p/a.ts')) == (False, None)
+    assert cache.get(_key(cache, 'navtree', '/p/a.ts')) == (True, {'b': 1})
+    assert cache.get(_key(cache, 'navtree', '/p/b.ts')) == (False, None)
+
+
+def test_put_after_an_invalidation_is_dropped():
+    cache = TSServerResultCache()
+    generation = cache.generation
+    cache.invalidate_file('/p/a.ts')
+    cache.put(_key(cache, 'quickinfo', '/p/a.ts'), {'a': 1}, generation)
+    assert len(cache) == 0
+    cache.put(_key(cache, 'quickinfo', '/p/a.ts'), {'a': 1}, cache.generation)
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TSServerResultCache(max_entries=2)
+    for line in (1, 2):
+        cache.put(_key(cache, 'quickinfo', '/p/a.ts', line), line)
+    cache.get(_key(cache, 'quickinfo', '/p/a.ts', 1))
+    cache.put(_key(cache, 'quickinfo', '/p/a.ts', 3), 3)
+    assert cache.get(_key(cache, 'quickinfo', '/p/a.ts', 2)) == (False, None)
+    assert cache.get(_key(cache, 'quickinfo', '/p/a.ts', 1)) == (True, 1)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cached_results_are_not_shared_with_callers():
+    async def main():
+        client = await TSServerClient.start(launch_options())
+        try:
+            cache = client.enable_result_cache()
+            first = await client.cmd_quick_info('/p/a.ts', 1, 1)
+            first['echo']['line'] = 100
+            second = await client.cmd_quick_info('/p/a.ts', 1, 1)
+            assert second['echo']['line'] == 1
+            second['echo']['line'] = 200
+            assert (await client.cmd_quick_info('/p/a.ts', 1, 1))['echo']['line'] == 1
+            assert cache.hits == 2 and cache.misses == 1
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_changing_a_file_refreshes_cached_results():
+    async def main():
+        client = await TSServerClient.start(launch_options())
+        try:
+            cache = client.enable_result_cache()
+            await client.cmd_open('/p/a.ts', fileContent='let a = 1;\n')
+            await client.cmd_quick_info('/p/a.ts', 1, 5)
+            await client.cmd_change('/p/a.ts', 1, 9, 1, 10, '2')
+            await client.cmd_quick_info('/p/a.ts', 1, 5)
+            assert cache.misses == 2 and cache.hits == 0
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
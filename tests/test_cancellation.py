@@ -0,0 +1,82 @@
+import os
+import asyncio
+import pytest
+from tsserver_client import TSServerClient
+from tsserver_client.cancellation import TSServerCancellation
+from tsserver_client.comm import TSServerRequestCancelledException
+from tsserver_client.fake_server import launch_options
+
+ARGS = {'file': '/p/a.ts', 'line': 1, 'offset': 1}
+
+
+async def _start(*args: str):
+    cancellation = TSServerCancellation()
+    client = await TSServerClient.start(
+        launch_options('--cancellationPipeName', cancellation.pipe_name, *args),
+        cancellation=cancellation
+    )
+    return client, os.path.dirname(cancellation.pipe_name)
+
+
+def test_timeout_drops_the_late_response():
+    async def main():
+        client = await TSServerClient.start(launch_options('--latency', '100'))
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await client.cmd_quick_info('/p/a.ts', 1, 1, timeout=0.01)
+            info = await client.cmd_quick_info('/p/a.ts', 2, 1)
+            assert info['echo']['line'] == 2
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_cancelled_request_is_signalled_until_tsserver_answers():
+    async def main():
+        client, pipe_dir = await _start('--latency', '100')
+        try:
+            task = asyncio.create_task(client.send_command('quickinfo', ARGS))
+            await asyncio.sleep(0.02)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert len(os.listdir(pipe_dir)) == 1
+            with pytest.raises(asyncio.TimeoutError):
+                await client.send_command('quickinfo', ARGS, timeout=0.01)
+            # both signals are cleared by tsserver's answers
+            await client.send_command('quickinfo', ARGS)
+            assert os.listdir(pipe_dir) == []
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_superseded_request_fails():
+    async def main():
+        client, pipe_dir = await _start('--latency', '50')
+        try:
+            first = asyncio.create_task(client.cmd_quick_info('/p/a.ts', 1, 1, supersede=True))
+            await asyncio.sleep(0.01)
+            second = await client.cmd_quick_info('/p/a.ts', 2, 1, supersede=True)
+            assert second['echo']['line'] == 2
+            with pytest.raises(TSServerRequestCancelledException):
+                await first
+            assert os.listdir(pipe_dir) == []
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_requests_not_written_yet_are_not_signalled():
+    async def main():
+        client, pipe_dir = await _start()
+        try:
+            client.cancel_request(1000)
+            assert os.listdir(pipe_dir) == []
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+from tsserver_client import TSServerClient
+from tsserver_client.comm import TSServerProcessException
+from tsserver_client.fake_server import launch_options
+
+
+def test_concurrent_responses_reach_their_requests():
+    async def main():
+        client = await TSServerClient.start(launch_options('--jitter', '2'))
+        try:
+            infos = await asyncio.gather(*(
+                client.cmd_quick_info('/fake/a.ts', line, 1) for line in range(1, 51)
+            ))
+            assert [info['echo']['line'] for info in infos] == list(range(1, 51))
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_pending_requests_fail_when_tsserver_exits():
+    async def main():
+        client = await TSServerClient.start(launch_options('--latency', '200'))
+        try:
+            pending = asyncio.create_task(client.cmd_quick_info('/fake/a.ts', 1, 1))
+            await asyncio.sleep(0.05)
+            client.process.kill()
+            with pytest.raises(TSServerProcessException):
+                await pending
+            assert not client.is_alive
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
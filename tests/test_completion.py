@@ -0,0 +1,54 @@
+import asyncio
+from tsserver_client import TSServerClient
+from tsserver_client.completion import (
+    TSServerCompletionSession, match_class,
+    MATCH_PREFIX, MATCH_PREFIX_IGNORE_CASE, MATCH_SUBSTRING, MATCH_SUBSEQUENCE
+)
+from tsserver_client.fake_server import launch_options
+from tsserver_client.metrics import TSServerMetrics
+
+
+def _match(prefix: str, name: str):
+    return match_class(prefix, prefix.lower(), name, name.lower())
+
+
+def test_match_classes():
+    assert _match('get', 'getValue') == MATCH_PREFIX
+    assert _match('GET', 'getValue') == MATCH_PREFIX_IGNORE_CASE
+    assert _match('value', 'getValue') == MATCH_SUBSTRING
+    assert _match('gV', 'getValue') == MATCH_SUBSEQUENCE
+    assert _match('vg', 'getValue') is None
+
+
+def test_entries_are_filtered_locally_as_the_identifier_grows():
+    async def main():
+        metrics = TSServerMetrics()
+        client = await TSServerClient.start(launch_options('--completions', '300'), metrics=metrics)
+        try:
+            await client.open_document('/p/a.ts', 'let x;\nge')
+            session = TSServerCompletionSession(client, '/p/a.ts', details_batch_size=2)
+            first = await session.complete(2, 3)
+            await client.update_document('/p/a.ts', 'let x;\ngetV')
+            narrowed = await session.complete(2, 5)
+            await client.update_document('/p/a.ts', 'let x;\ngetV\nse')
+            moved = await session.complete(3, 3, limit=5)
+            details = await session.details(k=5)
+            again = await session.details(k=3)
+            return first, narrowed, moved, details, again, session.requests, dict(metrics.requests)
+        finally:
+            await client.stop()
+
+    first, narrowed, moved, details, again, requests, sent = asyncio.run(main())
+    assert not first.from_cache and first.prefix == 'ge'
+    assert narrowed.from_cache and narrowed.prefix == 'getV'
+    names = [e['name'] for e in narrowed.entries]
+    assert names and set(names) <= {e['name'] for e in first.entries}
+    classes = [_match('getV', name) for name in names]
+    assert None not in classes and classes == sorted(classes)
+    assert not moved.from_cache and len(moved.entries) == 5
+    assert requests == 2 == sent['completionInfo']
+    assert [d['name'] for d in details] == [e['name'] for e in moved.entries]
+    assert again == details[:3]
+    # the distinct entries in batches of two, none asked twice
+    distinct = len({e['name'] for e in moved.entries})
+    assert sent['completionEntryDetails'] == (distinct + 1) // 2
@@ -0,0 +1,56 @@
+import pytest
+from tsserver_client.diagnostics import TSServerDiagnosticBatch, TSServerDiagnosticTable
+
+
+def _diag(line: int, text: str = 'Cannot find name.', **extra) -> dict:
+    return {
+        'start': {'line': line, 'offset': 1},
+        'end': {'line': line, 'offset': 5},
+        'text': text,
+        'code': 2304,
+        'category': 'error'
+    } | extra
+
+
+def _table(*batches: tuple) -> TSServerDiagnosticTable:
+    table = TSServerDiagnosticTable()
+    for file, kind, diagnostics in batches:
+        table.add_batch(TSServerDiagnosticBatch(file, kind, diagnostics))
+    return table
+
+
+def test_rows_read_like_the_tsserver_diagnostics():
+    unusual = {'text': 'no position', 'category': 'error', 'code': 1}
+    related = _diag(2, reportsUnnecessary=True)
+    table = _table(('/p/a.ts', 'semantic', [_diag(1), related]), ('/p/b.ts', 'suggestion', [unusual]))
+    assert table.to_dicts() == [
+        _diag(1) | {'file': '/p/a.ts', 'diag': 'semantic'},
+        related | {'file': '/p/a.ts', 'diag': 'semantic'},
+        unusual | {'file': '/p/b.ts', 'diag': 'suggestion'}
+    ]
+    assert table[-1]['text'] == 'no position'
+    with pytest.raises(KeyError):
+        table[-1]['start']
+    with pytest.raises(IndexError):
+        table[3]
+
+
+def test_files_and_texts_are_interned():
+    table = _table(
+        ('/p/a.ts', 'syntax', [_diag(1, 'Same text.'), _diag(2, ''.join(['Same', ' text.']))]),
+        ('/p/a.ts', 'semantic', [_diag(3)])
+    )
+    assert table.files == ['/p/a.ts']
+    assert table[0]['text'] is table[1]['text']
+
+
+def test_extend_select_and_slices_keep_rows():
+    first = _table(('/p/a.ts', 'syntax', [_diag(1)]))
+    second = _table(('/p/b.ts', 'semantic', [_diag(1, extra=1)]), ('/p/a.ts', 'semantic', [_diag(2)]))
+    expected = first.to_dicts() + second.to_dicts()
+    first.extend(second)
+    assert first.to_dicts() == expected
+    assert first.files == ['/p/a.ts', '/p/b.ts']
+    assert first.select([2, 0]).to_dicts() == [expected[2], expected[0]]
+    assert first[1:].to_dicts() == expected[1:]
+    assert first[::-1].to_dicts() == expected[::-1]
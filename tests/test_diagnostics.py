@@ -0,0 +1,50 @@
+import asyncio
+import contextlib
+import pytest
+from tsserver_client import TSServerClient
+from tsserver_client.fake_server import launch_options
+from tsserver_client.scheduler import TSServerScheduler
+
+A, B = '/fake/a.ts', '/fake/b.ts'
+ALL_ROWS = [
+    (A, 'syntax'), (A, 'semantic'), (A, 'suggestion'),
+    (B, 'syntax'), (B, 'semantic'), (B, 'suggestion')
+]
+
+
+def test_stream_yields_every_file_and_kind():
+    async def main():
+        client = await TSServerClient.start(launch_options('--diagnostics', '2'))
+        try:
+            batches = [batch async for batch in client.stream_errors([A, B], kinds=['semantic'])]
+            assert [(batch.file, batch.kind, len(batch.diagnostics)) for batch in batches] == [
+                (A, 'semantic', 2), (B, 'semantic', 2)
+            ]
+            table = await client.cmd_get_errors([A, B])
+            assert [(row['file'], row['diag']) for row in table] == [row for row in ALL_ROWS for _ in range(2)]
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize('cancellable', [False, True])
+@pytest.mark.parametrize('scheduled', [False, True])
+def test_closing_a_stream_early_leaks_no_diagnostics(cancellable, scheduled):
+    async def main():
+        client = await TSServerClient.start(
+            launch_options('--latency', '5'),
+            cancellable=cancellable,
+            scheduler=TSServerScheduler() if scheduled else None
+        )
+        try:
+            await client.open_files([A, B])
+            async with contextlib.aclosing(client.stream_errors([A, B])) as stream:
+                async for _ in stream:
+                    break
+            table = await client.cmd_get_errors([A, B])
+            assert [(row['file'], row['diag']) for row in table] == ALL_ROWS
+        finally:
+            await client.stop()
+
+    asyncio.run(asyncio.wait_for(main(), 10))
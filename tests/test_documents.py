@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from tsserver_client import TSServerClient
+from tsserver_client.documents import TSDocument, index_of, position_of, text_change
+from tsserver_client.positions import line_starts
+from tsserver_client.fake_server import launch_options
+
+
+def _apply(text: str, change: dict) -> str:
+    start = index_of(text, change['start']['line'], change['start']['offset'])
+    end = index_of(text, change['end']['line'], change['end']['offset'])
+    return text[:start] + change['newText'] + text[end:]
+
+
+def test_line_starts_count_every_tsserver_line_break():
+    assert line_starts('a\r\nb\nc\rd e') == [0, 3, 5, 7, 9]
+
+
+@pytest.mark.parametrize('text', ['ab\r\ncd', 'a\U0001F600b\ncéd'])
+def test_index_and_position_round_trip(text):
+    for index in range(len(text) + 1):
+        if text[index - 1:index + 1] == '\r\n':
+            continue  # inside a line break
+        assert index_of(text, *position_of(text, index)) == index
+
+
+def test_offsets_count_utf16_code_units():
+    text = 'x\U0001F600y'
+    assert position_of(text, 2) == (1, 4)
+    assert index_of(text, 1, 4) == 2
+    with pytest.raises(ValueError):
+        index_of(text, 2, 1)
+
+
+@pytest.mark.parametrize('old, new', [
+    ('let a = 1;\r\nlet b = 2;\r\n', 'let a = 1;\r\nlet c = 2;\r\n'),
+    ('a\r\nb', 'a\nb'),
+    ('a\nb', 'a\r\nb'),
+    ('\U0001F600 = 1', '\U0001F600 = 22'),
+    ('', 'new'),
+    ('old', '')
+])
+def test_text_change_turns_old_into_new(old, new):
+    change = text_change(old, new)
+    assert _apply(old, change) == new
+
+
+def test_text_change_never_splits_crlf():
+    # the common prefix 'a\r' would end inside the line break
+    change = text_change('a\r\nb', 'a\rx\nb')
+    assert change == {'start': {'line': 1, 'offset': 2}, 'end': {'line': 2, 'offset': 1}, 'newText': '\rx\n'}
+    assert text_change('same', 'same') is None
+
+
+def test_document_edits():
+    doc = TSDocument('/p/a.ts', 'const a = 1;\r\nconst é = 2;\r\n')
+    doc.apply_change(2, 7, 2, 8, 'b')
+    assert doc.text == 'const a = 1;\r\nconst b = 2;\r\n'
+    assert doc.version == 1
+
+
+def test_client_sends_edits_and_keeps_versions():
+    async def main():
+        client = await TSServerClient.start(launch_options())
+        try:
+            doc = await client.open_document('/p/a.ts', 'let a = 1;\n')
+            await client.edit_document('/p/a.ts', 1, 5, 1, 6, 'b')
+            await client.update_document('/p/a.ts', 'let b = 2;\n')
+            assert client.document('/p/a.ts') is doc
+            assert doc.text == 'let b = 2;\n' and doc.version == 2
+            await client.close_document('/p/a.ts')
+            assert client.document('/p/a.ts') is None
+            with pytest.raises(ValueError):
+                await client.edit_document('/p/a.ts', 1, 1, 1, 1, 'x')
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from tsserver_client import TSServerDualClient, TSServerMetrics
+from tsserver_client.fake_server import launch_options
+
+
+async def _start(server_mode: str = 'partialSemantic', *args: str):
+    metrics, syntax_metrics = TSServerMetrics(), TSServerMetrics()
+    client = await TSServerDualClient.start(
+        launch_options(*args),
+        server_mode=server_mode,
+        metrics=metrics,
+        syntax_kwargs={'metrics': syntax_metrics}
+    )
+    return client, metrics.requests, syntax_metrics.requests
+
+
+async def _open_while_loading(client: TSServerDualClient, path: str):
+    loading = client.subscribe_events(['projectLoadingStart'])
+    await client.cmd_open(path)
+    await asyncio.wait_for(loading.wait_output(), 1)
+    client.unsubscribe_events(loading)
+
+
+@pytest.mark.parametrize('server_mode, syntax_answers', [('partialSemantic', True), ('syntactic', False)])
+def test_requests_during_project_load_go_to_a_capable_server(server_mode, syntax_answers):
+    async def main():
+        client, semantic, syntax = await _start(server_mode, '--project-load', '300')
+        try:
+            await _open_while_loading(client, '/p/a.ts')
+            info = await client.cmd_quick_info('/p/a.ts', 1, 1)
+            assert info['echo']['line'] == 1
+            assert ('quickinfo' in syntax) == syntax_answers
+            assert ('quickinfo' in semantic) != syntax_answers
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_shared_commands_reach_both_servers_and_reload_only_the_semantic_one(tmp_path):
+    path = tmp_path / 'a.ts'
+    path.write_text('let a = 1;\n')
+
+    async def main():
+        client, semantic, syntax = await _start()
+        try:
+            assert await client.cmd_configure()
+            await client.cmd_open(str(path))
+            assert await client.cmd_reload(str(path))
+            assert semantic['configure'] == syntax['configure'] == 1
+            assert semantic['reload'] == 1 and 'reload' not in syntax
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_per_process_arguments_are_not_shared():
+    async def main():
+        metrics = TSServerMetrics()
+        client = await TSServerDualClient.start(launch_options(), metrics=metrics)
+        try:
+            await client.cmd_configure()
+            assert client.syntax_server.metrics is None
+            assert metrics.requests['configure'] == 1
+            assert metrics.snapshot()['latency']['response']['configure']['count'] == 1
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+import asyncio
+from tsserver_client import TSServerClient
+from tsserver_client.fake_server import launch_options
+
+
+def test_get_errors_accepts_range_entries_and_unnormalized_paths():
+    async def main():
+        client = await TSServerClient.start(launch_options())
+        try:
+            table = await client.cmd_get_errors([{'file': '/p/a.ts', 'ranges': []}, '/p/x/../b.ts', '/p//c.ts'])
+            assert table.files == ['/p/a.ts', '/p/b.ts', '/p/c.ts']
+            assert len(table) == 9
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_subscribers_receive_only_their_events():
+    async def main():
+        client = await TSServerClient.start(launch_options('--event-storm', '2'))
+        try:
+            telemetry = []
+            handler = client.subscribe_events(['telemetry'], callback=telemetry.append)
+            loading = client.subscribe_events(['projectLoadingFinish'])
+            await client.cmd_open('/p/a.ts')
+            await client.cmd_quick_info('/p/a.ts', 1, 1)
+            assert len(telemetry) == 4
+            assert {event.event for event in telemetry} == {'telemetry'}
+            event = await asyncio.wait_for(loading.wait_output(), 1)
+            assert event.event == 'projectLoadingFinish'
+            client.unsubscribe_events(handler)
+            await client.cmd_quick_info('/p/a.ts', 1, 1)
+            assert len(telemetry) == 4
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
+
+def test_failing_callback_does_not_stop_reading():
+    async def main():
+        client = await TSServerClient.start(launch_options('--event-storm', '1'))
+        try:
+            def fail(event):
+                raise RuntimeError('callback failed')
+            client.subscribe_events(['telemetry'], callback=fail)
+            for line in (1, 2):
+                info = await asyncio.wait_for(client.cmd_quick_info('/p/a.ts', line, 1), 1)
+                assert info['echo']['line'] == line
+            assert client.is_alive
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
+
@@ -0,0 +1,89 @@
+import io
+import json
+import argparse
+from tsserver_client.fake_server import FakeTSServer
+
+
+def _server(**opts) -> FakeTSServer:
+    defaults = dict(
+        latency=0., jitter=0., body_size=0, diagnostics=1, completions=0, event_storm=0,
+        project_load=0., seed=0, cancellationPipeName=None, serverMode='semantic'
+    )
+    defaults.update(opts)
+    return FakeTSServer(argparse.Namespace(**defaults), out=io.BytesIO())
+
+
+def _messages(server: FakeTSServer) -> list[dict]:
+    data = server.out.getvalue()
+    messages = []
+    while data:
+        header, _, data = data.partition(b'\r\n\r\n')
+        length = int(header[len(b'Content-Length: '):])
+        messages.append(json.loads(data[:length]))
+        data = data[length:]
+    return messages
+
+
+def _serve(server: FakeTSServer, *requests: dict) -> list[dict]:
+    server.serve(io.BytesIO(b''.join(json.dumps(r).encode() + b'\n' for r in requests)))
+    return _messages(server)
+
+
+def test_requests_are_answered_in_order_and_open_loads_the_project():
+    server = _server(body_size=8)
+    messages = _serve(
+        server,
+        {'seq': 1, 'command': 'open', 'arguments': {'file': '/p/a.ts'}},
+        {'seq': 2, 'command': 'quickinfo', 'arguments': {'file': '/p/a.ts', 'line': 3, 'offset': 1}},
+        {'seq': 3, 'command': 'exit'},
+        {'seq': 4, 'command': 'quickinfo', 'arguments': {}}
+    )
+    assert [m.get('event') for m in messages[:2]] == ['projectLoadingStart', 'projectLoadingFinish']
+    assert len(messages) == 3
+    assert messages[2]['request_seq'] == 2
+    assert messages[2]['body'] == {'echo': {'file': '/p/a.ts', 'line': 3, 'offset': 1}, 'padding': 'x' * 8}
+
+
+def test_geterr_emits_every_kind_per_file_then_request_completed():
+    server = _server(diagnostics=2)
+    messages = _serve(server, {'seq': 5, 'command': 'geterr', 'arguments': {'files': ['/p/b.ts', 'C:\\p\\.\\a.ts']}})
+    assert [(m['event'], m['body'].get('file')) for m in messages] == [
+        ('syntaxDiag', '/p/b.ts'), ('semanticDiag', '/p/b.ts'), ('suggestionDiag', '/p/b.ts'),
+        ('syntaxDiag', 'C:/p/a.ts'), ('semanticDiag', 'C:/p/a.ts'), ('suggestionDiag', 'C:/p/a.ts'),
+        ('requestCompleted', None)
+    ]
+    assert len(messages[0]['body']['diagnostics']) == 2
+    assert messages[-1]['body'] == {'request_seq': 5}
+
+
+def test_completions_are_seeded_and_filtered_by_prefix():
+    entries = _serve(_server(completions=50), {'seq': 1, 'command': 'completionInfo', 'arguments': {}})[0]['body']['entries']
+    assert len(entries) == 50
+    assert entries == _serve(_server(completions=50), {'seq': 1, 'command': 'completionInfo', 'arguments': {}})[0]['body']['entries']
+    prefix = entries[0]['name'][:4]
+    filtered = _serve(_server(completions=50), {'seq': 2, 'command': 'completions', 'arguments': {'prefix': prefix}})
+    assert filtered[0]['body'] == [e for e in entries if e['name'].startswith(prefix)]
+
+
+def test_cancelled_requests_fail_and_cancelled_geterr_stops(tmp_path):
+    pipe = str(tmp_path / 'cancel') + '*'
+    (tmp_path / 'cancel7').touch()
+    (tmp_path / 'cancel8').touch()
+    messages = _serve(
+        _server(cancellationPipeName=pipe),
+        {'seq': 7, 'command': 'quickinfo', 'arguments': {}},
+        {'seq': 8, 'command': 'geterr', 'arguments': {'files': ['/p/a.ts']}}
+    )
+    assert messages[0]['success'] is False and messages[0]['message'] == 'Request cancelled'
+    assert [m['event'] for m in messages[1:]] == ['requestCompleted']
+
+
+def test_server_mode_rejects_commands():
+    messages = _serve(
+        _server(serverMode='syntactic'),
+        {'seq': 1, 'command': 'quickinfo', 'arguments': {}},
+        {'seq': 2, 'command': 'navtree', 'arguments': {}}
+    )
+    assert messages[0]['success'] is False
+    assert 'LanguageServiceMode.syntactic' in messages[0]['message']
+    assert messages[1]['success'] is True
@@ -0,0 +1,73 @@
+import sys
+import json
+import asyncio
+import logging
+import pytest
+from tsserver_client.codec import JSONCodec, get_codec
+from tsserver_client.comm import TSServerOutputBody, TSServerResponse
+from tsserver_client.framing import TSServerFrameReader
+
+
+def _frame(body: bytes) -> bytes:
+    return b'Content-Length: %d\r\n\r\n' % len(body) + body
+
+
+def _read_all(pieces: list[bytes], chunk_size: int = 16) -> list[bytes]:
+    async def main():
+        stream = asyncio.StreamReader()
+        reader = TSServerFrameReader(stream, chunk_size=chunk_size)
+
+        async def feed():
+            for piece in pieces:
+                stream.feed_data(piece)
+                await asyncio.sleep(0)
+            stream.feed_eof()
+
+        feeding = asyncio.create_task(feed())
+        frames = [frame async for frame in reader]
+        await feeding
+        return frames
+
+    return asyncio.run(main())
+
+
+def test_frames_split_across_reads():
+    data = _frame(b'{"a": 1}') + _frame(b'{"b": 2}')
+    pieces = [data[i:i + 3] for i in range(0, len(data), 3)]
+    assert _read_all(pieces) == [b'{"a": 1}', b'{"b": 2}']
+
+
+def test_body_larger_than_chunk_size():
+    body = b'"' + b'x' * 10000 + b'"'
+    assert _read_all([_frame(body)[:40], _frame(body)[40:], _frame(b'1')]) == [body, b'1']
+
+
+def test_eof_inside_a_frame_ends_the_stream():
+    assert _read_all([_frame(b'{"a": 1}'), _frame(b'{"b": 2}')[:-3]]) == [b'{"a": 1}']
+
+
+def test_headers_without_content_length_are_skipped():
+    assert _read_all([b'Other: 1\r\n\r\n' + _frame(b'2')]) == [b'2']
+
+
+def test_auto_codec_falls_back_to_json(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'orjson', None)
+    monkeypatch.setitem(sys.modules, 'msgspec', None)
+    codec = get_codec('auto')
+    assert codec.name == 'json'
+    assert codec.loads(memoryview(codec.dumps({'a': [1]}))) == {'a': [1]}
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec('yaml')
+
+
+def test_unparsable_message_is_logged(caplog):
+    codec = JSONCodec()
+    with caplog.at_level(logging.WARNING, logger='tsserver_client.comm'):
+        assert TSServerOutputBody.from_bytes(b'{"seq": 0', codec) is None
+    assert 'Cannot parse' in caplog.text
+    message = {'seq': 0, 'type': 'response', 'command': 'quickinfo', 'request_seq': 3, 'success': True}
+    resp = TSServerOutputBody.from_bytes(json.dumps(message).encode(), codec)
+    assert isinstance(resp, TSServerResponse) and resp.request_seq == 3
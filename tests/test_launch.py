@@ -0,0 +1,52 @@
+import os
+import asyncio
+from tsserver_client import TSServerClient, TSServerLaunchOptions
+from tsserver_client.fake_server import launch_options
+
+
+def test_argv_puts_node_options_before_tsserver_options():
+    options = TSServerLaunchOptions(
+        node_path='node',
+        node_flags=['--no-warnings'],
+        tsserver_path='tsserver.js',
+        tsserver_args=['--noGetErrOnBackgroundUpdate'],
+        max_old_space_size=4096,
+        disable_automatic_typing_acquisition=True,
+        use_inferred_project_per_project_root=True,
+        locale='en',
+        log_file='/tmp/ts.log',
+        log_verbosity='verbose'
+    )
+    assert options.argv() == [
+        'node', '--no-warnings', '--max-old-space-size=4096', 'tsserver.js',
+        '--noGetErrOnBackgroundUpdate', '--disableAutomaticTypingAcquisition',
+        '--useInferredProjectPerProjectRoot', '--locale', 'en', '--logFile', '/tmp/ts.log',
+        '--logVerbosity', 'verbose'
+    ]
+
+
+def test_replace_does_not_share_argument_lists():
+    options = TSServerLaunchOptions(node_path='node', tsserver_path='tsserver.js', tsserver_args=[])
+    other = options.replace(tsserver_args=[*options.tsserver_args, '--serverMode', 'syntactic'])
+    assert options.argv() == ['node', *options.node_flags, 'tsserver.js']
+    assert other.argv()[-2:] == ['--serverMode', 'syntactic']
+
+
+def test_env_extends_the_current_environment(monkeypatch):
+    monkeypatch.setenv('TSSERVER_CLIENT_TEST', 'inherited')
+    assert TSServerLaunchOptions().environ() is None
+    env = TSServerLaunchOptions(env={'TSC_NONPOLLING_WATCHER': 'true'}).environ()
+    assert env['TSC_NONPOLLING_WATCHER'] == 'true'
+    assert env['TSSERVER_CLIENT_TEST'] == 'inherited'
+
+
+def test_client_starts_with_launch_options(tmp_path):
+    async def main():
+        client = await TSServerClient.start(launch_options(cwd=str(tmp_path), env={'A': '1'}))
+        try:
+            assert client.timings['spawn'] > 0
+            assert await client.cmd_configure()
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+import json
+import asyncio
+from tsserver_client import TSServerClient
+from tsserver_client.codec import JSONCodec
+from tsserver_client.comm import TSServerOutputBody, TSServerResponse
+from tsserver_client.fake_server import launch_options
+
+
+def _encode(message: dict) -> bytes:
+    # tsserver's own field order, which peek_header relies on
+    return json.dumps(message, separators=(',', ':')).encode()
+
+
+def test_peek_header_reads_responses_and_events():
+    response = _encode({'seq': 0, 'type': 'response', 'command': 'quickinfo', 'request_seq': 7, 'success': True})
+    header = TSServerOutputBody.peek_header(response)
+    assert (header.type, header.command, header.request_seq, header.success) == ('response', 'quickinfo', 7, True)
+    event = _encode({'seq': 0, 'type': 'event', 'event': 'telemetry', 'body': {}})
+    assert TSServerOutputBody.peek_header(event).event == 'telemetry'
+    assert TSServerOutputBody.peek_header(b'{"body": 1}') is None
+
+
+def test_lazy_response_decodes_on_first_access():
+    raw = _encode({
+        'seq': 0, 'type': 'response', 'command': 'quickinfo', 'request_seq': 7, 'success': False,
+        'message': 'No content', 'body': {'a': 1}
+    })
+    resp = TSServerResponse.lazy(raw, TSServerOutputBody.peek_header(raw), JSONCodec())
+    assert resp.type == 'response' and resp.raw is raw
+    assert resp.body == {'a': 1}
+    assert resp.message == 'No content'
+    assert resp.metadata is None
+    eager = TSServerOutputBody.from_bytes(raw, JSONCodec())
+    assert eager.body == {'a': 1} and eager.raw is None
+
+
+def test_lazy_client_answers_requests_and_drops_unwanted_events():
+    async def main():
+        client = await TSServerClient.start(launch_options('--event-storm', '3'), lazy_decode=True)
+        try:
+            infos = await asyncio.gather(*(client.cmd_quick_info('/p/a.ts', line, 1) for line in range(1, 6)))
+            assert [info['echo']['line'] for info in infos] == list(range(1, 6))
+            events = []
+            client.subscribe_events(['telemetry'], callback=events.append)
+            await client.cmd_quick_info('/p/a.ts', 1, 1)
+            assert len(events) == 3 and events[0].body['telemetryEventName'] == 'fake'
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from tsserver_client import TSServerClient
+from tsserver_client.fake_server import launch_options
+from tsserver_client.metrics import TSServerLatencyHistogram, TSServerMetrics
+
+
+def test_histogram_percentiles_are_bucket_bounds_capped_by_max():
+    hist = TSServerLatencyHistogram()
+    assert hist.percentile(50) is None
+    for seconds in [0.001] * 9 + [0.5]:
+        hist.add(seconds)
+    assert 0.001 <= hist.percentile(50) < 0.002
+    assert hist.percentile(99) == 0.5
+    snapshot = hist.snapshot()
+    assert snapshot['count'] == 10
+    assert snapshot['min'] == 0.001 and snapshot['max'] == 0.5
+
+
+def test_client_requests_are_counted_and_timed():
+    async def main():
+        metrics = TSServerMetrics()
+        client = await TSServerClient.start(launch_options('--latency', '5'), metrics=metrics)
+        try:
+            for line in range(1, 4):
+                await client.cmd_quick_info('/p/a.ts', line, 1)
+            await client.cmd_open('/p/a.ts')
+            await client.cmd_get_errors(['/p/a.ts'])
+        finally:
+            await client.stop()
+        return metrics.snapshot()
+
+    snapshot = asyncio.run(main())
+    assert snapshot['requests']['quickinfo'] == 3
+    assert snapshot['requests']['open'] == 1
+    assert snapshot['latency']['response']['quickinfo']['count'] == 3
+    assert snapshot['latency']['response']['quickinfo']['min'] >= 0.005
+    assert snapshot['latency']['response']['geterr']['count'] == 1
+    assert snapshot['frames']['syntaxDiag'] == 1
+    assert snapshot['in_flight'] == 0
+    assert snapshot['bytes_out'] > 0 and snapshot['bytes_in'] > 0
+    assert snapshot['parse_failures'] == 0
+
+
+def test_failing_observer_is_logged_and_ignored(caplog):
+    seen = []
+
+    def failing(metric, name, value):
+        raise RuntimeError('observer')
+
+    async def main():
+        metrics = TSServerMetrics()
+        metrics.add_observer(failing)
+        metrics.add_observer(lambda metric, name, value: seen.append((metric, name)))
+        client = await TSServerClient.start(launch_options(), metrics=metrics)
+        try:
+            return await client.cmd_quick_info('/p/a.ts', 1, 1)
+        finally:
+            await client.stop()
+
+    with caplog.at_level(logging.ERROR, 'tsserver_client.metrics'):
+        info = asyncio.run(main())
+    assert info['echo']['line'] == 1
+    assert ('response', 'quickinfo') in seen
+    assert 'Metrics observer failed' in caplog.text
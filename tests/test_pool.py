@@ -0,0 +1,59 @@
+import asyncio
+from tsserver_client import TSServerPool
+from tsserver_client.fake_server import launch_options
+
+
+def _project(root, name: str) -> str:
+    project = root / name
+    (project / 'src').mkdir(parents=True)
+    (project / 'tsconfig.json').write_text('{}')
+    return str(project)
+
+
+def test_files_of_a_project_share_a_worker(tmp_path):
+    a = _project(tmp_path, 'a')
+
+    async def main():
+        pool = await TSServerPool.start(2, launch_options=launch_options())
+        try:
+            idx = pool.worker_index(f'{a}/index.ts')
+            assert pool.worker_index(f'{a}/src/deep.ts') == idx
+            info = await pool.cmd_quick_info(f'{a}/src/deep.ts', 1, 1)
+            assert info['echo']['file'] == f'{a}/src/deep.ts'
+        finally:
+            await pool.stop()
+
+    asyncio.run(main())
+
+
+def test_new_projects_go_to_the_least_loaded_worker(tmp_path):
+    a, b, c = (_project(tmp_path, name) for name in 'abc')
+
+    async def main():
+        pool = await TSServerPool.start(2, launch_options=launch_options('--latency', '200'))
+        try:
+            # idle workers take new projects in turn
+            assert pool.worker_index(f'{a}/x.ts') == 0
+            assert pool.worker_index(f'{b}/x.ts') == 1
+            # a request in flight on worker 0 sends the next project to worker 1
+            busy = asyncio.create_task(pool.cmd_quick_info(f'{a}/x.ts', 1, 1))
+            await asyncio.sleep(0.05)
+            assert pool.worker_index(f'{c}/x.ts') == 1
+            await busy
+        finally:
+            await pool.stop()
+
+    asyncio.run(main())
+
+
+def test_files_outside_projects_are_grouped_by_directory(tmp_path):
+    async def main():
+        pool = await TSServerPool.start(2, launch_options=launch_options())
+        try:
+            one, two = tmp_path / 'one', tmp_path / 'two'
+            assert pool.worker_index(f'{one}/a.ts') == pool.worker_index(f'{one}/b.ts')
+            assert pool.worker_index(f'{one}/a.ts') != pool.worker_index(f'{two}/a.ts')
+        finally:
+            await pool.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from tsserver_client import TSServerClient
+from tsserver_client.diagnostics import TSServerDiagnosticBatch, TSServerDiagnosticTable
+from tsserver_client.fake_server import launch_options
+from tsserver_client.positions import TSServerPositionIndex, TSServerPositions, read_text
+
+TEXT = 'let a = 1;\r\nconst é = "\U0001F600x";\nb c'
+
+
+def test_char_and_byte_offsets_round_trip():
+    index = TSServerPositionIndex(TEXT)
+    encoded = TEXT.encode('utf-8')
+    assert index.line_count == 4
+    for i in range(len(TEXT) + 1):
+        line, offset = index.position_of(i)
+        assert index.index_of(line, offset) == i
+        byte = len(TEXT[:i].encode('utf-8'))
+        assert index.index_of(line, offset, 'byte') == byte
+        assert index.position_of(byte, 'byte') == (line, offset)
+    # 'x' follows a surrogate pair: two UTF-16 units, one character, four bytes
+    x = TEXT.index('x')
+    assert index.position_of(x) == (2, 14)
+    assert encoded[index.index_of(2, 14, 'byte'):].startswith(b'x')
+    # offsets past the end of a line are clamped to it, line break included
+    assert index.index_of(1, 100) == TEXT.index('const')
+
+
+def test_bom_is_dropped_but_counted_in_bytes(tmp_path):
+    path = tmp_path / 'a.ts'
+    path.write_bytes(b'\xef\xbb\xbfconst \xc3\xa9 = 1;\r\n')
+    text, byte_base = read_text(str(path))
+    assert text == 'const é = 1;\r\n' and byte_base == 3
+    index = TSServerPositionIndex(text, byte_base)
+    assert index.index_of(1, 7) == 6
+    assert index.index_of(1, 8, 'byte') == 3 + 8
+    assert index.position_of(3 + 8, 'byte') == (1, 8)
+
+
+def test_annotate_and_diagnostic_indices(tmp_path, caplog):
+    path = str(tmp_path / 'a.ts')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(TEXT)
+    positions = TSServerPositions()
+    result = {'file': path, 'start': {'line': 2, 'offset': 7}, 'refs': [
+        {'fileName': str(tmp_path / 'missing.ts'), 'start': {'line': 1, 'offset': 1}}
+    ]}
+    with caplog.at_level(logging.WARNING, 'tsserver_client.positions'):
+        assert positions.annotate(result) is result
+        positions.annotate(result, unit='byte')
+    assert result['start'] == {'line': 2, 'offset': 7, 'index': 18, 'byte': 18}
+    assert result['refs'][0]['start'] == {'line': 1, 'offset': 1}
+    assert 'missing.ts' in caplog.text
+
+    table = TSServerDiagnosticTable()
+    table.add_batch(TSServerDiagnosticBatch(path, 'semantic', [
+        {'start': {'line': 2, 'offset': 11}, 'end': {'line': 2, 'offset': 15}, 'text': '', 'code': 1, 'category': 'error'},
+        {'text': 'no position', 'code': 2, 'category': 'error'},
+        {'start': {'line': 9, 'offset': 1}, 'end': {'line': 9, 'offset': 2}, 'text': '', 'code': 3, 'category': 'error'}
+    ]))
+    starts, ends = positions.diagnostic_indices(table)
+    assert list(starts) == [TEXT.index('"'), -1, -1]
+    assert list(ends) == [TEXT.index('x') + 1, -1, -1]
+
+
+def test_least_recently_used_files_are_dropped():
+    reads = []
+
+    def get_text(path):
+        reads.append(path)
+        return path, 0
+
+    positions = TSServerPositions(get_text, max_files=2)
+    for path in ('a', 'b', 'a', 'c', 'a', 'b'):
+        positions.get(path)
+    assert reads == ['a', 'b', 'c', 'b']
+    assert len(positions) == 2
+    positions.invalidate('a')
+    positions.get('a')
+    assert reads[-1] == 'a'
+
+
+def test_client_annotates_cached_results_with_the_current_text():
+    async def main():
+        client = await TSServerClient.start(launch_options())
+        try:
+            client.enable_result_cache()
+            await client.open_document('/p/a.ts', 'é\nab')
+            first = client.positions.annotate(await client.cmd_quick_info('/p/a.ts', 2, 2), unit='byte')
+            cached = await client.cmd_quick_info('/p/a.ts', 2, 2)
+            assert 'byte' not in cached['echo']
+            await client.update_document('/p/a.ts', 'abc\nab')
+            changed = client.positions.annotate(await client.cmd_quick_info('/p/a.ts', 2, 2), unit='byte')
+        finally:
+            await client.stop()
+        return first, changed
+
+    first, changed = asyncio.run(main())
+    assert first['echo']['byte'] == 4
+    assert changed['echo']['byte'] == 5
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import pytest
+from tsserver_client import TSServerClient
+from tsserver_client.comm import TSServerProcessException
+from tsserver_client.fake_server import launch_options as fake_launch_options
+from tsserver_client.recording import (
+    TSServerRecorder, read_sessions, exchanges, launch_options as mock_launch_options, REQUEST, FRAME, SESSION
+)
+from tsserver_client.replay import replay
+
+
+async def _record_session(path: str):
+    with TSServerRecorder(path) as recorder:
+        client = await TSServerClient.start(fake_launch_options('--latency', '2'), recorder=recorder)
+        try:
+            await client.cmd_open('/p/a.ts')
+            infos = [await client.cmd_quick_info('/p/a.ts', line, 1) for line in (1, 2)]
+            await client.cmd_get_errors(['/p/a.ts'])
+        finally:
+            await client.stop()
+    return infos
+
+
+def test_sessions_are_appended_and_paired_into_exchanges(tmp_path):
+    path = str(tmp_path / 'session.tsrec')
+    asyncio.run(_record_session(path))
+    asyncio.run(_record_session(path))
+    sessions = read_sessions(path)
+    assert len(sessions) == 2
+    assert sessions[1][0].kind == SESSION
+    assert {record.kind for record in sessions[0]} == {SESSION, REQUEST, FRAME}
+    pairs = exchanges(sessions[0])
+    assert [e.request['command'] for e in pairs] == ['open', 'quickinfo', 'quickinfo', 'geterr', 'exit']
+    # responses and requestCompleted go to their own request, other events to the latest one
+    assert [m['request_seq'] for e in pairs[1:3] for _, m in e.frames if m['type'] == 'response'] == \
+           [e.request['seq'] for e in pairs[1:3]]
+    assert [m['event'] for _, m in pairs[3].frames] == ['syntaxDiag', 'semanticDiag', 'suggestionDiag', 'requestCompleted']
+    assert all(delay >= 0 for e in pairs for delay, _ in e.frames)
+
+
+def test_mock_server_answers_from_the_recording(tmp_path):
+    path = str(tmp_path / 'session.tsrec')
+    recorded = asyncio.run(_record_session(path))
+
+    async def main():
+        client = await TSServerClient.start(mock_launch_options(path, speed=None))
+        try:
+            await client.cmd_open('/p/a.ts')
+            infos = [await client.cmd_quick_info('/p/a.ts', line, 1) for line in (2, 1)]
+            diagnostics = await client.cmd_get_errors(['/p/a.ts'], timeout=5)
+            missing = await client.send_command('navtree', {'file': '/p/a.ts'})
+        finally:
+            await client.stop()
+        return infos, diagnostics, missing
+
+    infos, diagnostics, missing = asyncio.run(main())
+    assert infos == recorded[::-1]
+    assert len(diagnostics) == 3
+    assert not missing.success and missing.message == 'Not in the recording'
+
+
+def test_replay_compares_latencies(tmp_path):
+    path = str(tmp_path / 'session.tsrec')
+    asyncio.run(_record_session(path))
+    report = asyncio.run(replay(path, launch_options=mock_launch_options(path, speed=None), speed=None, timeout=5))
+    assert report['failures'] == 0
+    assert report['commands']['quickinfo']['recorded']['count'] == 2
+    assert report['commands']['quickinfo']['replayed']['count'] == 2
+    assert report['commands']['geterr']['replayed']['count'] == 1
+
+
+def test_failing_recorder_is_logged_and_detached(tmp_path, caplog):
+    async def main():
+        recorder = TSServerRecorder(str(tmp_path / 'session.tsrec'))
+        recorder.close()  # every write fails from now on
+        client = await TSServerClient.start(fake_launch_options(), recorder=recorder)
+        try:
+            return [await client.cmd_quick_info('/p/a.ts', line, 1) for line in (1, 2)]
+        finally:
+            await client.stop()
+
+    with caplog.at_level(logging.ERROR, 'tsserver_client.comm'):
+        infos = asyncio.run(main())
+    assert [info['echo']['line'] for info in infos] == [1, 2]
+    assert caplog.text.count('Recording tsserver traffic failed') == 1
+
+
+def test_reader_failure_fails_pending_requests(monkeypatch, caplog):
+    def failing_decode(self, b_body):
+        raise RuntimeError('decode')
+
+    async def main():
+        client = await TSServerClient.start(fake_launch_options())
+        try:
+            monkeypatch.setattr(TSServerClient, '_decode_output', failing_decode)
+            with pytest.raises(TSServerProcessException, match='reading tsserver output failed'):
+                await asyncio.wait_for(client.cmd_quick_info('/p/a.ts', 1, 1), 5)
+            assert not client.is_alive
+        finally:
+            await client.stop()
+
+    with caplog.at_level(logging.ERROR, 'tsserver_client.comm'):
+        asyncio.run(main())
+    assert 'Reading tsserver output failed' in caplog.text
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from tsserver_client import TSServerClient
+from tsserver_client.fake_server import launch_options
+from tsserver_client.scheduler import TSServerScheduler, priority_of, request_context
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_command_priorities():
+    assert priority_of('completionInfo') == 'interactive'
+    assert priority_of('geterr') == 'bulk'
+    assert priority_of('references') == 'normal'
+    assert priority_of('change') is None
+    with request_context(priority='bulk'):
+        assert priority_of('references') == 'bulk'
+        assert priority_of('change') is None
+
+
+def test_limits_per_priority():
+    async def main():
+        scheduler = TSServerScheduler({'normal': 2})
+        await scheduler.acquire('normal')
+        await scheduler.acquire('normal')
+        third = asyncio.create_task(scheduler.acquire('normal'))
+        await _settle()
+        assert not third.done()
+        assert scheduler.in_flight('normal') == 2 and scheduler.queued('normal') == 1
+        scheduler.release('normal')
+        await third
+        assert scheduler.in_flight('normal') == 2 and scheduler.queued('normal') == 0
+
+    asyncio.run(main())
+
+
+def test_callers_are_served_round_robin():
+    async def main():
+        scheduler = TSServerScheduler({'normal': 1})
+        await scheduler.acquire('normal')
+        order = []
+
+        async def request(caller: str, i: int):
+            with request_context(caller=caller):
+                await scheduler.acquire('normal')
+            order.append((caller, i))
+
+        tasks = [asyncio.create_task(request('a', i)) for i in range(3)]
+        tasks.append(asyncio.create_task(request('b', 0)))
+        await _settle()
+        for _ in tasks:
+            scheduler.release('normal')
+            await _settle()
+        await asyncio.gather(*tasks)
+        assert order == [('a', 0), ('b', 0), ('a', 1), ('a', 2)]
+
+    asyncio.run(main())
+
+
+def test_bulk_waits_for_interactive_requests():
+    async def main():
+        scheduler = TSServerScheduler()
+        await scheduler.acquire('interactive')
+        bulk = asyncio.create_task(scheduler.acquire('bulk'))
+        await _settle()
+        assert not bulk.done()
+        scheduler.release('interactive')
+        await bulk
+        assert scheduler.in_flight('bulk') == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def main():
+        scheduler = TSServerScheduler({'normal': 1})
+        await scheduler.acquire('normal')
+        waiter = asyncio.create_task(scheduler.acquire('normal'))
+        await _settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.queued('normal') == 0
+        scheduler.release('normal')
+        assert scheduler.in_flight('normal') == 0
+        await asyncio.wait_for(scheduler.acquire('normal'), 1)
+
+    asyncio.run(main())
+
+
+def test_scheduled_client_answers_every_request():
+    async def main():
+        scheduler = TSServerScheduler({'interactive': 2, 'normal': 1})
+        client = await TSServerClient.start(launch_options('--latency', '2'), scheduler=scheduler)
+        try:
+            infos, refs = await asyncio.gather(
+                asyncio.gather(*(client.cmd_quick_info('/p/a.ts', line, 1) for line in range(1, 11))),
+                asyncio.gather(*(client.cmd_references('/p/a.ts', line, 1) for line in range(1, 6)))
+            )
+            assert [info['echo']['line'] for info in infos] == list(range(1, 11))
+            assert [ref['echo']['line'] for ref in refs] == list(range(1, 6))
+            assert scheduler.in_flight('interactive') == scheduler.in_flight('normal') == 0
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from tsserver_client.fake_server import launch_options
+from tsserver_client.sharding import check_sharded, shard_files
+
+
+def test_shard_files_balances_sizes_and_keeps_input_order(tmp_path):
+    files = []
+    for name, size in [('a', 10), ('b', 400), ('c', 30), ('d', 200), ('e', 190)]:
+        path = tmp_path / f'{name}.ts'
+        path.write_text('x' * size)
+        files.append(str(path))
+    shards = shard_files(files, 2)
+    assert sorted(f for shard in shards for f in shard) == sorted(files)
+    # b 400 | d 200 + e 190, then c and a onto the lighter shard
+    assert shards == [[files[0], files[1]], [files[2], files[3], files[4]]]
+    assert shard_files(files[:1], 4) == [files[:1]]
+
+
+def test_merged_diagnostics_do_not_depend_on_sharding():
+    files = [f'/p/{name}.ts' for name in 'ecadbf']
+
+    async def main():
+        results = []
+        for workers in (1, 3):
+            with ThreadPoolExecutor(workers) as executor:
+                results.append(await check_sharded(
+                    files, workers=workers, launch_options=launch_options('--diagnostics', '2', '--jitter', '2'),
+                    timeout=10, executor=executor
+                ))
+        return results
+
+    single, sharded = asyncio.run(main())
+    assert len(sharded.shards) == 3
+    assert sorted(f for report in sharded.shards for f in report.files) == sorted(files)
+    assert sharded.diagnostics.to_dicts() == single.diagnostics.to_dicts()
+    assert list(dict.fromkeys(d['file'] for d in sharded.diagnostics.to_dicts())) == files
+    assert len(sharded.diagnostics) == sum(report.diagnostics for report in sharded.shards)
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from tsserver_client import TSServerClient, TSServerSpares
+from tsserver_client.fake_server import launch_options
+
+
+def test_acquired_clients_are_configured_and_replaced():
+    async def main():
+        spares = await TSServerSpares.start(2, launch_options=launch_options())
+        try:
+            assert spares.available == 2
+            client = await spares.acquire()
+            try:
+                assert client.is_alive
+                assert await client.cmd_quick_info('/p/a.ts', 1, 1)
+            finally:
+                await client.stop()
+            for _ in range(100):
+                if spares.available == 2:
+                    break
+                await asyncio.sleep(0.02)
+            assert spares.available == 2
+        finally:
+            await spares.stop()
+
+    asyncio.run(main())
+
+
+def test_failed_setup_is_raised_by_acquire():
+    async def main():
+        async def setup(client: TSServerClient):
+            raise RuntimeError('setup failed')
+
+        spares = await TSServerSpares.start(1, launch_options=launch_options(), setup=setup)
+        try:
+            with pytest.raises(RuntimeError):
+                await spares.acquire()
+        finally:
+            await spares.stop()
+
+    asyncio.run(main())
+
+
+def test_stop_during_setup_stops_the_new_client():
+    async def main():
+        started: list[TSServerClient] = []
+        setups = []
+
+        async def factory():
+            client = await TSServerClient.start(launch_options())
+            started.append(client)
+            return client
+
+        async def setup(client: TSServerClient):
+            setups.append(client)
+            if len(setups) > 1:
+                await asyncio.sleep(60)
+
+        spares = await TSServerSpares.start(1, factory, setup=setup)
+        first = await spares.acquire()
+        await first.stop()
+        for _ in range(100):
+            if len(setups) == 2:
+                break
+            await asyncio.sleep(0.02)
+        await spares.stop()
+        assert len(started) == 2
+        assert all(client.process is None for client in started)
+
+    asyncio.run(main())
+
+
+def test_client_on_file_waits_for_the_project():
+    async def main():
+        spares = await TSServerSpares.start(1, launch_options=launch_options('--project-load', '50'))
+        try:
+            async with spares.client_on_file('/p/a.ts') as client:
+                info = await client.cmd_project_info('/p/a.ts', need_file_name_list=True)
+                assert info['fileNames'] == ['/p/a.ts']
+        finally:
+            await spares.stop()
+
+    asyncio.run(main())
+
+
+def test_wait_project_loaded_times_the_first_load():
+    async def main():
+        client = await TSServerClient.start(launch_options('--project-load', '100'))
+        try:
+            await client.cmd_open('/p/a.ts')
+            info = await client.wait_project_loaded('/p/a.ts', timeout=5)
+            assert info['configFileName'] == '/fake/tsconfig.json'
+            assert client.timings['project_load'] >= 0.1
+        finally:
+            await client.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+import asyncio
+from tsserver_client.stderr import TSServerStderrBuffer, drain_stderr
+
+
+def test_lines_are_completed_across_chunks():
+    buffer = TSServerStderrBuffer()
+    assert buffer.feed(b'first li') == []
+    assert buffer.feed(b'ne\nsecond\nthi') == [b'first line', b'second']
+    assert buffer.tail() == 'first line\nsecond\nthi'
+    assert buffer.tail(2) == 'second\nthi'
+
+
+def test_only_the_latest_bytes_are_kept():
+    buffer = TSServerStderrBuffer(max_bytes=16)
+    for i in range(10):
+        buffer.feed(b'line %d\n' % i)
+    assert buffer.tail() == 'line 8\nline 9'
+    buffer.feed(b'x' * 40)  # an unterminated line longer than the buffer
+    assert buffer.tail() == 'x' * 16
+
+
+def test_drain_keeps_reading_when_the_callback_fails():
+    async def main():
+        stream = asyncio.StreamReader()
+        stream.feed_data(b'one\r\ntwo\nthree\n')
+        stream.feed_eof()
+        seen = []
+
+        def callback(line: str):
+            seen.append(line)
+            if line == 'one':
+                raise RuntimeError('callback failed')
+
+        buffer = TSServerStderrBuffer()
+        await asyncio.wait_for(drain_stderr(stream, buffer, callback, chunk_size=4), 1)
+        assert seen == ['one', 'two', 'three']
+        assert buffer.tail() == 'one\r\ntwo\nthree'
+
+    asyncio.run(main())
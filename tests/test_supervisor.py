@@ -0,0 +1,84 @@
+import asyncio
+from tsserver_client import TSServerClient, TSServerSupervisor
+from tsserver_client.fake_server import launch_options
+
+
+def test_call_on_a_dead_tsserver_is_retried_after_replaying_the_session():
+    async def main():
+        sup = await TSServerSupervisor.start(launch_options=launch_options(), check_interval=60)
+        try:
+            await sup.cmd_configure()
+            await sup.open_files(['/fake/a.ts', '/fake/b.ts'])
+            first = sup.client
+            first.process.kill()
+            info = await sup.cmd_quick_info('/fake/a.ts', 3, 1)
+            assert info['echo']['line'] == 3
+            assert sup.client is not first and sup.restarts == 1
+            project = await sup.client.cmd_project_info('/fake/a.ts', need_file_name_list=True)
+            assert sorted(project['fileNames']) == ['/fake/a.ts', '/fake/b.ts']
+        finally:
+            await sup.stop()
+
+    asyncio.run(main())
+
+
+def test_exited_tsserver_is_restarted_by_the_watchdog():
+    async def main():
+        sup = await TSServerSupervisor.start(launch_options=launch_options(), check_interval=0.05)
+        try:
+            sup.client.process.kill()
+            for _ in range(100):
+                if sup.restarts:
+                    break
+                await asyncio.sleep(0.02)
+            assert sup.restarts == 1
+            assert sup.last_restart_reason.startswith('exited with code')
+            assert sup.client.is_alive
+        finally:
+            await sup.stop()
+
+    asyncio.run(main())
+
+
+def test_restart_after_max_requests_keeps_answering():
+    async def main():
+        sup = await TSServerSupervisor.start(launch_options=launch_options(), max_requests=3)
+        try:
+            first = sup.client
+            infos = await asyncio.gather(*(sup.cmd_quick_info('/fake/a.ts', line, 1) for line in range(1, 8)))
+            assert [info['echo']['line'] for info in infos] == list(range(1, 8))
+            for _ in range(100):
+                if sup.client is not first:
+                    break
+                await asyncio.sleep(0.02)
+            assert sup.client is not first
+            assert sup.last_restart_reason.endswith('requests')
+        finally:
+            await sup.stop()
+
+    asyncio.run(main())
+
+
+def test_failed_restart_is_logged_and_retried(caplog):
+    async def main():
+        attempts = []
+
+        async def factory():
+            attempts.append(None)
+            if len(attempts) == 2:
+                raise OSError('cannot start tsserver')
+            return await TSServerClient.start(launch_options())
+
+        sup = await TSServerSupervisor.start(factory, check_interval=0.05)
+        try:
+            sup.client.process.kill()
+            for _ in range(100):
+                if sup.restarts:
+                    break
+                await asyncio.sleep(0.02)
+            assert sup.restarts == 1 and len(attempts) == 3
+            assert 'cannot start tsserver' in caplog.text
+        finally:
+            await sup.stop()
+
+    asyncio.run(main())
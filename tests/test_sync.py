@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from tsserver_client import SyncTSServerClient, TSServerPool
+from tsserver_client.fake_server import launch_options
+
+
+def test_threads_share_one_client():
+    with SyncTSServerClient(launch_options('--jitter', '1')) as tss:
+        assert tss.cmd_configure()
+        with ThreadPoolExecutor(8) as executor:
+            infos = list(executor.map(lambda line: tss.cmd_quick_info('/p/a.ts', line, 1), range(1, 41)))
+        assert [info['echo']['line'] for info in infos] == list(range(1, 41))
+        future = tss.submit('cmd_quick_info', '/p/a.ts', 7, 1)
+        assert future.result(5)['echo']['line'] == 7
+    assert tss.loop.is_closed()
+    tss.close()  # closing twice is a no-op
+
+
+def test_calls_from_the_client_loop_are_refused():
+    with SyncTSServerClient(launch_options()) as tss:
+        async def nested():
+            return tss.cmd_quick_info('/p/a.ts', 1, 1)
+
+        with pytest.raises(RuntimeError):
+            asyncio.run_coroutine_threadsafe(nested(), tss.loop).result(5)
+
+
+def test_client_factory_can_be_a_pool():
+    with SyncTSServerClient(client_factory=lambda: TSServerPool.start(2, launch_options=launch_options())) as tss:
+        table = tss.cmd_get_errors(['/p/a.ts', '/q/b.ts'])
+        # merged in worker order
+        assert [row['file'] for row in table] == ['/p/a.ts'] * 3 + ['/q/b.ts'] * 3
+
+
+def test_failing_factory_shuts_the_loop_down():
+    async def factory():
+        raise OSError('cannot start tsserver')
+
+    with pytest.raises(OSError):
+        SyncTSServerClient(client_factory=factory)
@@ -1,9 +1,23 @@
 from .comm import TSServerComm, TSServerOutputBody, TSServerResponse, TSServerEvent
 from .client import TSServerClient
+from .dual import TSServerDualClient
+from .launch import TSServerLaunchOptions
+from .metrics import TSServerMetrics
+from .pool import TSServerPool
+from .spares import TSServerSpares
+from .supervisor import TSServerSupervisor
+from .sync import SyncTSServerClient
 
 __all__ = [
     'TSServerComm',
     'TSServerClient',
+    'TSServerDualClient',
+    'TSServerLaunchOptions',
+    'TSServerMetrics',
+    'TSServerPool',
+    'TSServerSpares',
+    'TSServerSupervisor',
+    'SyncTSServerClient',
     'TSServerOutputBody',
     'TSServerResponse',
     'TSServerEvent'
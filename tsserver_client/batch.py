@@ -0,0 +1,106 @@
+import asyncio
+from .comm import TSServerComm, TSServerResponse
+from typing import Union
+
+DEFAULT_MAX_IN_FLIGHT = 128
+
+
+class TSServerBatch:
+    """
+    Collects requests and sends them pipelined through `TSServerComm.send_commands`.
+
+        async with client.batch() as batch:
+            infos = [batch.quick_info(path, line, offset) for line, offset in positions]
+        results = batch.results
+
+    Every `add`-like method returns a future resolved with the TSServerResponse
+    of that item (or its exception) once the batch has been executed.
+    """
+
+    def __init__(
+            self,
+            comm: TSServerComm,
+            max_in_flight: Union[None, int] = DEFAULT_MAX_IN_FLIGHT,
+            timeout: Union[None, float] = None
+    ):
+        self._comm: TSServerComm = comm
+        self._max_in_flight: Union[None, int] = max_in_flight
+        self._timeout: Union[None, float] = timeout
+        self._commands: list[tuple[str, Union[None, dict]]] = []
+        self._futures: list[asyncio.Future] = []
+        self.results: Union[None, list[Union[TSServerResponse, BaseException]]] = None
+
+    def __len__(self):
+        return len(self._commands)
+
+    async def __aenter__(self) -> 'TSServerBatch':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.execute()
+        else:
+            for future in self._futures:
+                future.cancel()
+
+    def add(
+            self,
+            cmd: str,
+            arguments: Union[None, dict] = None
+    ) -> asyncio.Future:
+        if self.results is not None:
+            raise RuntimeError('TSServerBatch has already been executed')
+        future = asyncio.get_running_loop().create_future()
+        self._commands.append((cmd, arguments))
+        self._futures.append(future)
+        return future
+
+    def _add_location(self, cmd: str, path: str, line: int, offset: int, **kwargs) -> asyncio.Future:
+        args = {
+            'file': path,
+            'line': line,
+            'offset': offset
+        }
+        args.update(kwargs)
+        return self.add(cmd, args)
+
+    def quick_info(self, path: str, line: int, offset: int, **kwargs) -> asyncio.Future:
+        return self._add_location('quickinfo', path, line, offset, **kwargs)
+
+    def goto_definition(self, path: str, line: int, offset: int, **kwargs) -> asyncio.Future:
+        return self._add_location('definition', path, line, offset, **kwargs)
+
+    def goto_type_definition(self, path: str, line: int, offset: int, **kwargs) -> asyncio.Future:
+        return self._add_location('typeDefinition', path, line, offset, **kwargs)
+
+    def references(self, path: str, line: int, offset: int, **kwargs) -> asyncio.Future:
+        return self._add_location('references', path, line, offset, **kwargs)
+
+    def signature_help(self, path: str, line: int, offset: int, **kwargs) -> asyncio.Future:
+        return self._add_location('signatureHelp', path, line, offset, **kwargs)
+
+    def completions(self, path: str, line: int, offset: int, prefix: str = '', **kwargs) -> asyncio.Future:
+        return self._add_location('completions', path, line, offset, prefix=prefix, **kwargs)
+
+    async def execute(self) -> list[Union[TSServerResponse, BaseException]]:
+        """
+        Send every collected request.
+        :return: responses in the order the requests were added,
+                 with the exception in place of every failed item.
+        """
+        if self.results is not None:
+            return self.results
+        self.results = await self._comm.send_commands(
+            self._commands,
+            max_in_flight=self._max_in_flight,
+            timeout=self._timeout
+        )
+        for future, result in zip(self._futures, self.results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+                future.exception()  # reported through self.results already
+            else:
+                future.set_result(result)
+        return self.results
@@ -0,0 +1,114 @@
+import copy
+import json
+from collections import OrderedDict
+from typing import Hashable, Tuple, Union
+
+# semantic commands: their results may show types, symbols or locations from
+# any file of the project, so a change to any file can make them stale
+PROJECT_COMMANDS = frozenset({'quickinfo', 'signatureHelp', 'definition', 'typeDefinition', 'references'})
+
+
+class TSServerResultCache:
+    """
+    LRU cache of read-only query results, keyed by
+    (command, file, line, offset, other arguments, file version).
+
+    Invalidating a file drops its own entries and, conservatively, every
+    project-dependent entry (see PROJECT_COMMANDS) of any file: a quickinfo
+    on file A can show a type imported from the changed file B.
+
+    Values are copied in and out, so callers may modify what they get,
+    e.g. with TSServerPositions.annotate.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        if max_entries <= 0:
+            raise ValueError('max_entries must be positive')
+        self.max_entries: int = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.invalidations: int = 0
+        self.generation: int = 0  # bumped on every invalidation
+        self._entries: OrderedDict[Hashable, object] = OrderedDict()
+        self._by_file: dict[str, set[Hashable]] = {}
+        self._project: set[Hashable] = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(cmd: str, arguments: dict, version: int) -> Tuple:
+        rest = {k: v for k, v in arguments.items() if k not in ('file', 'line', 'offset')}
+        return (
+            cmd,
+            arguments.get('file', None),
+            arguments.get('line', None),
+            arguments.get('offset', None),
+            json.dumps(rest, sort_keys=True) if rest else None,
+            version
+        )
+
+    def get(self, key: Tuple) -> Tuple[bool, object]:
+        """
+        :return: (True, value) on a hit, (False, None) on a miss.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, copy.deepcopy(value)
+
+    def put(self, key: Tuple, value, generation: Union[None, int] = None):
+        """
+        :param generation: `self.generation` read before the request was sent;
+                           the value is dropped if an invalidation happened since.
+        """
+        if generation is not None and generation != self.generation:
+            return
+        cmd, file = key[0], key[1]
+        self._entries[key] = copy.deepcopy(value)
+        self._entries.move_to_end(key)
+        self._by_file.setdefault(file, set()).add(key)
+        if cmd in PROJECT_COMMANDS:
+            self._project.add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._forget(old_key)
+            self.evictions += 1
+
+    def _forget(self, key: Tuple):
+        keys = self._by_file.get(key[1], None)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_file[key[1]]
+        self._project.discard(key)
+
+    def invalidate_file(self, path: str):
+        self.generation += 1
+        self.invalidations += 1
+        stale = self._by_file.pop(path, set()) | self._project
+        for key in stale:
+            self._entries.pop(key, None)
+            self._forget(key)
+
+    def clear(self):
+        self.generation += 1
+        self.invalidations += 1
+        self._entries.clear()
+        self._by_file.clear()
+        self._project.clear()
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+
+
+class TSServerCancellation:
+    """
+    Per-request cancellation through tsserver's `--cancellationPipeName`.
+
+    tsserver is started with `--cancellationPipeName <prefix>*` and, while
+    executing request `seq`, treats the existence of the file `<prefix><seq>`
+    as a cancellation signal. The file is removed once the request finished.
+    """
+
+    def __init__(self):
+        self._dir: str = tempfile.mkdtemp(prefix='tsserver-cancellation-')
+        self._prefix: str = os.path.join(self._dir, 'seq')
+        self.pending: set[int] = set()
+
+    @property
+    def pipe_name(self) -> str:
+        return self._prefix + '*'
+
+    def cancel(self, request_seq: int):
+        if request_seq in self.pending:
+            return
+        with open(self._prefix + str(request_seq), 'wb'):
+            pass
+        self.pending.add(request_seq)
+
+    def clear(self, request_seq: int):
+        if request_seq not in self.pending:
+            return
+        self.pending.discard(request_seq)
+        try:
+            os.remove(self._prefix + str(request_seq))
+        except FileNotFoundError:
+            pass
+
+    def cleanup(self):
+        self.pending.clear()
+        shutil.rmtree(self._dir, ignore_errors=True)
@@ -1,56 +1,295 @@
+import time
 import asyncio
 from contextlib import asynccontextmanager
-from .comm import TSServerComm, TSServerStopLoopException, TSServerEvent
-from .config import *
+from .comm import (
+    TSServerComm,
+    TSServerStopLoopException,
+    TSServerProcessException,
+    TSServerOutputHandler,
+    TSServerEvent
+)
+from .cancellation import TSServerCancellation
+from .launch import TSServerLaunchOptions
+from .batch import TSServerBatch, DEFAULT_MAX_IN_FLIGHT
+from .cache import TSServerResultCache
+from .documents import TSDocument, text_change
+from .diagnostics import TSServerDiagnosticBatch, TSServerDiagnosticTable, DIAGNOSTIC_KINDS
+from .session import TSServerSession
+from .positions import TSServerPositions, read_text
 from typing import (
+    Iterable,
     Union,
-    AsyncIterator
+    AsyncIterator,
+    Tuple
 )
 
+# seconds an aborted error check may take to report its requestCompleted
+GETERR_ABORT_TIMEOUT = 5.
+
 
 class TSServerClient(TSServerComm):
     def __init__(
             self,
-            ts_server_proc: asyncio.subprocess.Process
+            ts_server_proc: asyncio.subprocess.Process,
+            **kwargs
     ):
-        super().__init__(ts_server_proc)
+        super().__init__(ts_server_proc, **kwargs)
+        self._file_versions: dict[str, int] = {}
+        self._result_cache: Union[None, TSServerResultCache] = None
+        self._positions: Union[None, TSServerPositions] = None
+        self._documents: dict[str, TSDocument] = {}
+        self._session: TSServerSession = TSServerSession(documents=self._documents)
+        self._latest_geterr_seq: Union[None, int] = None
+        self._loading_projects: set[str] = set()
+        self._projects_loaded: asyncio.Event = asyncio.Event()
+        self._projects_loaded.set()
+        self._loading_started: dict[str, float] = {}
+        self._first_open: Union[None, float] = None
+        # seconds spent in the startup phases: 'spawn', 'configure', 'project_load'
+        self.timings: dict[str, float] = {}
+        # project name -> seconds between projectLoadingStart and projectLoadingFinish
+        self.project_load_times: dict[str, float] = {}
+        self.subscribe_events(
+            ('projectLoadingStart', 'projectLoadingFinish'),
+            callback=self._on_project_loading
+        )
 
     @classmethod
-    async def start(cls) -> 'TSServerClient':
-        cmd = 'node' + ' ' + TSSERVER_PATH
-        proc = await asyncio.create_subprocess_shell(
-            cmd,
+    async def start(
+            cls,
+            launch_options: Union[None, TSServerLaunchOptions] = None,
+            cancellable: bool = False,
+            **kwargs
+    ) -> 'TSServerClient':
+        """
+        Launch tsserver, keyword arguments are passed on to TSServerComm.
+        :param launch_options: command line, environment and working directory,
+                               defaults from config.py if None.
+        :param cancellable: start tsserver with a cancellation pipe so that cancelled
+                            and timed out requests stop running server side.
+        """
+        launch_options = launch_options or TSServerLaunchOptions()
+        spawn_start = time.perf_counter()
+        argv = launch_options.argv()
+        if cancellable:
+            kwargs['cancellation'] = TSServerCancellation()
+            argv += ['--cancellationPipeName', kwargs['cancellation'].pipe_name]
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+            stderr=asyncio.subprocess.PIPE,
+            env=launch_options.environ(),
+            cwd=launch_options.cwd
         )
-        ts_server = cls(proc)
+        ts_server = cls(proc, **kwargs)
+        ts_server.timings['spawn'] = time.perf_counter() - spawn_start
         return ts_server
 
-    async def stop(self):
+    async def stop(self, timeout: float = 5.):
+        """
+        Ask tsserver to exit and wait for it, killing it after `timeout` seconds.
+        """
         proc = self._tsserver_proc
+        if self.is_alive and proc.returncode is None:
+            await self.send_request('exit', None, None)
+        # also reaps a tsserver that exited on its own
+        try:
+            await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
         proc.stdout.set_exception(TSServerStopLoopException())
-        await self.send_request('exit', None, None)
         # TODO: cleanup everything else
         for _, task in self._tasks.items():
             task.cancel()
+        if self._cancellation is not None:
+            self._cancellation.cleanup()
         self._tsserver_proc = None
 
     @classmethod
     @asynccontextmanager
     async def create_on_file(
             cls,
-            file_path: str
+            file_path: str,
+            wait_loaded: bool = False,
+            **kwargs
     ) -> AsyncIterator['TSServerClient']:
-        self = await cls.start()
+        """
+        :param wait_loaded: yield only once the project of `file_path` is loaded.
+        :param kwargs: passed on to `start`.
+        """
+        self = await cls.start(**kwargs)
         # TODO: send init requests to TSServer
         await self.cmd_configure()
         # await self.cmd_compiler_options_for_inferrd_project()
         await self.cmd_open(file_path)
+        if wait_loaded:
+            await self.wait_project_loaded(file_path)
         yield self
         await self.stop()
 
-    async def cmd_configure(self, **kwargs) -> bool:
+    def _on_project_loading(self, event: TSServerEvent):
+        project = (event.body or {}).get('projectName', '')
+        if event.event == 'projectLoadingStart':
+            self._loading_projects.add(project)
+            self._loading_started[project] = time.perf_counter()
+            self._projects_loaded.clear()
+        else:
+            self._loading_projects.discard(project)
+            started = self._loading_started.pop(project, None)
+            if started is not None:
+                self.project_load_times[project] = time.perf_counter() - started
+            if not self._loading_projects:
+                self._projects_loaded.set()
+
+    def _opened(self):
+        if self._first_open is None:
+            self._first_open = time.perf_counter()
+
+    async def wait_project_loaded(
+            self,
+            path: Union[None, str] = None,
+            timeout: Union[None, float] = None
+    ) -> Union[None, dict]:
+        """
+        Wait until tsserver has no project loading.
+        :param path: an open file, its project is loaded and its projectInfo
+                     requested first, so loads triggered by opening it are seen.
+        :param timeout: seconds, raises asyncio.TimeoutError.
+        :return: projectInfo of `path`, {'configFileName', 'languageServiceDisabled', ...}
+        """
+        started = self._first_open or time.perf_counter()
+
+        async def wait():
+            info = None
+            if path is not None:
+                info = await self.cmd_project_info(path)
+            await self._projects_loaded.wait()
+            return info
+
+        ret = await asyncio.wait_for(wait(), timeout)
+        self.timings.setdefault('project_load', time.perf_counter() - started)
+        return ret
+
+    @property
+    def loading_projects(self) -> set[str]:
+        """
+        Configured projects tsserver is currently loading.
+        """
+        return set(self._loading_projects)
+
+    def session(self) -> TSServerSession:
+        """
+        Snapshot of the settings and open files, see `restore_session`.
+        """
+        return self._session.copy()
+
+    async def restore_session(
+            self,
+            session: TSServerSession,
+            timeout: Union[None, float] = None
+    ) -> bool:
+        """
+        Bring a fresh tsserver to the state recorded in `session`:
+        configure, set the inferred project options and reopen all files
+        with a single updateOpen, documents with their current text.
+        Edits made with cmd_change to files that are not documents are lost.
+        """
+        ok = True
+        if session.configure is not None:
+            ok &= await self.cmd_configure(timeout, **session.configure)
+        if session.compiler_options is not None:
+            ok &= await self.cmd_compiler_options_for_inferrd_project(timeout, **session.compiler_options)
+        for path, doc in session.documents.items():
+            self._documents[path] = TSDocument(doc.path, doc.text, doc.version)
+        if session.open_files:
+            ok &= await self.cmd_update_open(open_files=session.open_arguments(), timeout=timeout)
+        return ok
+
+    @property
+    def result_cache(self) -> Union[None, TSServerResultCache]:
+        return self._result_cache
+
+    def enable_result_cache(self, max_entries: int = 1024) -> TSServerResultCache:
+        """
+        Cache the results of cmd_quick_info, cmd_goto_definition,
+        cmd_goto_type_definition, cmd_signature_help and cmd_references
+        until any file changes: their results can depend on every file of the project.
+        """
+        self._result_cache = TSServerResultCache(max_entries)
+        return self._result_cache
+
+    def disable_result_cache(self):
+        self._result_cache = None
+
+    @property
+    def positions(self) -> TSServerPositions:
+        """
+        Position indexes of the files this client works on, built from the
+        text of open documents or else read from disk, and dropped whenever
+        tsserver's view of the file changes.
+        """
+        if self._positions is None:
+            self._positions = TSServerPositions(self._position_text)
+        return self._positions
+
+    def _position_text(self, path: str) -> Tuple[str, int]:
+        doc = self._documents.get(path, None)
+        if doc is not None:
+            return doc.text, 0
+        return read_text(path)
+
+    def file_version(self, path: str) -> int:
+        return self._file_versions.get(path, 0)
+
+    def _file_changed(self, path: str):
+        """
+        Must be called whenever tsserver's view of `path` changes.
+        """
+        self._file_versions[path] = self._file_versions.get(path, 0) + 1
+        if self._result_cache is not None:
+            self._result_cache.invalidate_file(path)
+        if self._positions is not None:
+            self._positions.invalidate(path)
+
+    async def _send_cached_command(
+            self,
+            cmd: str,
+            arguments: dict,
+            timeout: Union[None, float] = None,
+            supersede: bool = False
+    ) -> Union[None, dict]:
+        cache = self._result_cache
+        supersede_key = (cmd, arguments['file']) if supersede else None
+        if cache is None:
+            resp = await self.send_command(cmd, arguments, timeout, supersede_key)
+            return resp.body if resp.success else None
+        key = cache.make_key(cmd, arguments, self.file_version(arguments['file']))
+        hit, ret = cache.get(key)
+        if hit:
+            return ret
+        generation = cache.generation
+        resp = await self.send_command(cmd, arguments, timeout, supersede_key)
+        ret = None
+        if resp.success:
+            ret = resp.body
+            cache.put(key, ret, generation)
+        return ret
+
+    def batch(
+            self,
+            max_in_flight: Union[None, int] = DEFAULT_MAX_IN_FLIGHT,
+            timeout: Union[None, float] = None
+    ) -> TSServerBatch:
+        """
+        Collect requests to send them pipelined, see TSServerBatch.
+        :param max_in_flight: maximum number of requests outstanding at tsserver.
+        :param timeout: for the whole batch.
+        """
+        return TSServerBatch(self, max_in_flight, timeout)
+
+    async def cmd_configure(self, timeout: Union[None, float] = None, **kwargs) -> bool:
         args = {
             "hostInfo": "tsserver-client-python",
             "preferences": {
@@ -62,15 +301,22 @@ class TSServerClient(TSServerComm):
             "watchOptions": {}
         }
         args.update(kwargs)
-        _, handler = await self.send_request(
+        configure_start = time.perf_counter()
+        resp = await self.send_command(
             cmd='configure',
-            expect_output='response',
-            arguments=args
+            arguments=args,
+            timeout=timeout
         )
-        resp = await handler.wait_output()
+        self.timings.setdefault('configure', time.perf_counter() - configure_start)
+        if resp.success:
+            self._session.configure = args
         return resp.success
 
-    async def cmd_compiler_options_for_inferrd_project(self, **kwargs) -> bool:
+    async def cmd_compiler_options_for_inferrd_project(
+            self,
+            timeout: Union[None, float] = None,
+            **kwargs
+    ) -> bool:
         args = {
             "options": {
                 "module": "ESNext",
@@ -88,12 +334,13 @@ class TSServerClient(TSServerComm):
             }
         }
         args.update(kwargs)
-        _, handler = await self.send_request(
+        resp = await self.send_command(
             cmd='compilerOptionsForInferredProjects',
-            expect_output='response',
-            arguments=args
+            arguments=args,
+            timeout=timeout
         )
-        resp = await handler.wait_output()
+        if resp.success:
+            self._session.compiler_options = args
         return resp.success
 
     async def cmd_open(
@@ -105,11 +352,14 @@ class TSServerClient(TSServerComm):
             'file': path
         }
         args.update(kwargs)
+        self._opened()
         await self.send_request(
             cmd='open',
             expect_output=None,
             arguments=args
         )
+        self._session.open_files[path] = args
+        self._file_changed(path)
         return None
 
     async def cmd_close(
@@ -126,11 +376,14 @@ class TSServerClient(TSServerComm):
             expect_output=None,
             arguments=args
         )
+        self._session.open_files.pop(path, None)
+        self._file_changed(path)
 
     async def cmd_reload(
             self,
             path: str,
             alternate_path: Union[None, str] = None,
+            timeout: Union[None, float] = None,
             **kwargs
     ) -> bool:
         args = {
@@ -138,22 +391,249 @@ class TSServerClient(TSServerComm):
             'tmpfile': alternate_path if alternate_path else path
         }
         args.update(kwargs)
-        _, handler = await self.send_request(
+        resp = await self.send_command(
             cmd='reload',
-            expect_output='response',
+            arguments=args,
+            timeout=timeout
+        )
+        self._file_changed(path)
+        return resp.success
+
+    async def cmd_change(
+            self,
+            path: str,
+            line: int,
+            offset: int,
+            end_line: int,
+            end_offset: int,
+            insert_string: str = '',
+            **kwargs
+    ) -> None:
+        """
+        Replace the range [(line, offset), (end_line, end_offset)) of an open file.
+        """
+        args = {
+            'file': path,
+            'line': line,
+            'offset': offset,
+            'endLine': end_line,
+            'endOffset': end_offset,
+            'insertString': insert_string
+        }
+        args.update(kwargs)
+        await self.send_request(
+            cmd='change',
+            expect_output=None,
             arguments=args
         )
-        resp = await handler.wait_output()
+        self._file_changed(path)
+
+    async def cmd_update_open(
+            self,
+            open_files: Union[None, list[dict]] = None,
+            changed_files: Union[None, list[dict]] = None,
+            closed_files: Union[None, list[str]] = None,
+            timeout: Union[None, float] = None,
+            **kwargs
+    ) -> bool:
+        """
+        Open, edit and close several files in a single request.
+        :param open_files: OpenRequestArgs, {'file', 'fileContent', 'scriptKindName', 'projectRootPath'}
+        :param changed_files: FileCodeEdits, {'fileName', 'textChanges': [CodeEdit]}
+        :param closed_files: paths
+        """
+        args = {}
+        if open_files:
+            args['openFiles'] = open_files
+        if changed_files:
+            args['changedFiles'] = changed_files
+        if closed_files:
+            args['closedFiles'] = closed_files
+        args.update(kwargs)
+        if open_files:
+            self._opened()
+        resp = await self.send_command(
+            cmd='updateOpen',
+            arguments=args,
+            timeout=timeout
+        )
+        for f in (open_files or []):
+            self._session.open_files[f['file']] = f
+            self._file_changed(f['file'])
+        for f in (changed_files or []):
+            self._file_changed(f['fileName'])
+        for path in (closed_files or []):
+            self._session.open_files.pop(path, None)
+            self._file_changed(path)
         return resp.success
 
+    def document(self, path: str) -> Union[None, TSDocument]:
+        return self._documents.get(path, None)
+
+    @property
+    def documents(self) -> dict[str, TSDocument]:
+        return dict(self._documents)
+
+    async def open_document(
+            self,
+            path: str,
+            text: Union[None, str] = None,
+            **kwargs
+    ) -> TSDocument:
+        """
+        Open a file with its content sent inline, tsserver will not read it from disk.
+        :param text: content of the file, read from `path` if None.
+        :param kwargs: extra open arguments, e.g. scriptKindName, projectRootPath.
+        """
+        if text is None:
+            with open(path, encoding='utf-8', newline='') as f:
+                text = f.read()
+        doc = TSDocument(path, text)
+        self._documents[path] = doc
+        await self.cmd_open(path, fileContent=text, **kwargs)
+        return doc
+
+    def _get_document(self, path: str) -> TSDocument:
+        doc = self._documents.get(path, None)
+        if doc is None:
+            raise ValueError(f'Document is not open: "{path}"')
+        return doc
+
+    async def edit_document(
+            self,
+            path: str,
+            line: int,
+            offset: int,
+            end_line: int,
+            end_offset: int,
+            new_text: str
+    ) -> TSDocument:
+        """
+        Replace a range of an open document, only the edit is sent to tsserver.
+        """
+        doc = self._get_document(path)
+        doc.apply_change(line, offset, end_line, end_offset, new_text)
+        await self.cmd_change(path, line, offset, end_line, end_offset, new_text)
+        return doc
+
+    async def update_document(
+            self,
+            path: str,
+            text: str
+    ) -> TSDocument:
+        """
+        Set the whole content of an open document,
+        tsserver receives the smallest single-range edit.
+        """
+        doc = self._get_document(path)
+        change = text_change(doc.text, text)
+        if change is None:
+            return doc
+        doc.text = text
+        doc.version += 1
+        await self.cmd_update_open(changed_files=[{
+            'fileName': path,
+            'textChanges': [change]
+        }])
+        return doc
+
+    async def close_document(self, path: str) -> None:
+        self._documents.pop(path, None)
+        await self.cmd_close(path)
+
+    async def sync_files(
+            self,
+            open_paths: Iterable[str] = (),
+            contents: Union[None, dict[str, str]] = None,
+            changed: Union[None, dict[str, str]] = None,
+            closed: Iterable[str] = (),
+            project_root_path: Union[None, str] = None,
+            timeout: Union[None, float] = None
+    ) -> bool:
+        """
+        Open, update and close many files with a single updateOpen request.
+        :param open_paths: files tsserver reads from disk.
+        :param contents: path -> text, files opened with their content sent
+                         inline, they become documents (see open_document).
+        :param changed: path -> new text of open documents, each is sent as
+                        its smallest single-range edit.
+        :param closed: files to close.
+        :param project_root_path: root of the project the opened files belong to,
+                                  used by tsserver to find inferred projects.
+        """
+        open_files = []
+        for path in open_paths:
+            open_files.append({'file': path})
+        for path, text in (contents or {}).items():
+            open_files.append({'file': path, 'fileContent': text})
+        if project_root_path is not None:
+            for f in open_files:
+                f['projectRootPath'] = project_root_path
+        changed_files = []
+        for path, text in (changed or {}).items():
+            doc = self._get_document(path)
+            change = text_change(doc.text, text)
+            if change is None:
+                continue
+            doc.text = text
+            doc.version += 1
+            changed_files.append({'fileName': path, 'textChanges': [change]})
+        closed = list(closed)
+        for path in closed:
+            self._documents.pop(path, None)
+        for path, text in (contents or {}).items():
+            self._documents[path] = TSDocument(path, text)
+        if not (open_files or changed_files or closed):
+            return True
+        return await self.cmd_update_open(
+            open_files=open_files,
+            changed_files=changed_files,
+            closed_files=closed,
+            timeout=timeout
+        )
+
+    async def open_files(
+            self,
+            paths: Iterable[str] = (),
+            contents: Union[None, dict[str, str]] = None,
+            project_root_path: Union[None, str] = None,
+            timeout: Union[None, float] = None
+    ) -> bool:
+        """
+        Open many files in one round trip, see `sync_files`.
+        """
+        return await self.sync_files(
+            open_paths=paths,
+            contents=contents,
+            project_root_path=project_root_path,
+            timeout=timeout
+        )
+
+    async def close_files(
+            self,
+            paths: Iterable[str],
+            timeout: Union[None, float] = None
+    ) -> bool:
+        """
+        Close many files in one round trip, see `sync_files`.
+        """
+        return await self.sync_files(closed=paths, timeout=timeout)
+
     async def cmd_completions(
             self,
             path: str,
             line: int,
             offset: int,
             prefix: int = '',
+            timeout: Union[None, float] = None,
+            supersede: bool = False,
             **kwargs
     ) -> Union[None, dict]:
+        """
+        :param timeout: seconds to wait for the response, raises asyncio.TimeoutError.
+        :param supersede: cancel a still pending completions request on the same file,
+                          e.g. when the user typed another character.
+        """
         args = {
             'file': path,
             'line': line,
@@ -161,46 +641,119 @@ class TSServerClient(TSServerComm):
             'prefix': prefix
         }
         args.update(kwargs)
-        _, handler = await self.send_request(
+        resp = await self.send_command(
             cmd='completions',
-            expect_output='response',
-            arguments=args
+            arguments=args,
+            timeout=timeout,
+            supersede_key=('completions', path) if supersede else None
         )
-        resp = await handler.wait_output()
         ret = None
         if resp.success:
             ret = resp.body
-        self._output_handler_registry.deregister_handler(handler)
         return ret
 
-    async def cmd_signature_help(
+    async def cmd_completion_info(
             self,
             path: str,
             line: int,
             offset: int,
-            prefix: str = '',
+            trigger_character: Union[None, str] = None,
+            timeout: Union[None, float] = None,
+            supersede: bool = False,
             **kwargs
     ) -> Union[None, dict]:
+        """
+        CompletionInfo request, entries are not filtered by the identifier
+        being typed, see completion.py for client-side filtering.
+        :param trigger_character: character that triggered completion, e.g. '.'
+        :return: CompletionInfo body, {'isGlobalCompletion', 'isMemberCompletion',
+                 'isNewIdentifierLocation', 'isIncomplete', 'optionalReplacementSpan',
+                 'entries': [{'name', 'kind', 'kindModifiers', 'sortText', 'source', 'data', ...}]}
+                 if success, else None.
+        """
+        args = {
+            'file': path,
+            'line': line,
+            'offset': offset
+        }
+        if trigger_character is not None:
+            args['triggerCharacter'] = trigger_character
+        args.update(kwargs)
+        resp = await self.send_command(
+            cmd='completionInfo',
+            arguments=args,
+            timeout=timeout,
+            supersede_key=('completionInfo', path) if supersede else None
+        )
+        ret = None
+        if resp.success:
+            ret = resp.body
+        return ret
+
+    async def cmd_completion_entry_details(
+            self,
+            path: str,
+            line: int,
+            offset: int,
+            entry_names: list[Union[str, dict]],
+            timeout: Union[None, float] = None,
+            **kwargs
+    ) -> Union[None, list]:
+        """
+        Details of several completion entries in one request.
+        :param entry_names: names, or {'name', 'source', 'data'} as found in
+                            completionInfo entries (needed for auto-imports).
+        :return: list of CompletionEntryDetails, {'name', 'kind', 'kindModifiers',
+                 'displayParts', 'documentation', 'tags', 'codeActions', ...},
+                 in the order of `entry_names` with unknown entries left out;
+                 None if the request failed.
+        """
         args = {
             'file': path,
             'line': line,
             'offset': offset,
-            'prefix': prefix
+            'entryNames': entry_names
         }
         args.update(kwargs)
-        _, handler = await self.send_request(
-            cmd='signatureHelp',
-            expect_output='response',
-            arguments=args
+        resp = await self.send_command(
+            cmd='completionEntryDetails',
+            arguments=args,
+            timeout=timeout
         )
-        resp = await handler.wait_output()
         ret = None
         if resp.success:
             ret = resp.body
-        self._output_handler_registry.deregister_handler(handler)
         return ret
 
-    async def cmd_organize_imports(self, path: str) -> Union[None, dict]:
+    async def cmd_signature_help(
+            self,
+            path: str,
+            line: int,
+            offset: int,
+            prefix: str = '',
+            timeout: Union[None, float] = None,
+            supersede: bool = False,
+            **kwargs
+    ) -> Union[None, dict]:
+        args = {
+            'file': path,
+            'line': line,
+            'offset': offset,
+            'prefix': prefix
+        }
+        args.update(kwargs)
+        return await self._send_cached_command(
+            cmd='signatureHelp',
+            arguments=args,
+            timeout=timeout,
+            supersede=supersede
+        )
+
+    async def cmd_organize_imports(
+            self,
+            path: str,
+            timeout: Union[None, float] = None
+    ) -> Union[None, dict]:
         args = {
             "scope": {
                 "type": "file",
@@ -209,16 +762,38 @@ class TSServerClient(TSServerComm):
                 }
             },
         }
-        _, handler = await self.send_request(
+        resp = await self.send_command(
             cmd='organizeImports',
-            expect_output='response',
-            arguments=args
+            arguments=args,
+            timeout=timeout
+        )
+        ret = None
+        if resp.success:
+            ret = resp.body
+        return ret
+
+    async def cmd_project_info(
+            self,
+            path: str,
+            need_file_name_list: bool = False,
+            timeout: Union[None, float] = None
+    ) -> Union[None, dict]:
+        """
+        :return: body of ProjectInfoResponse if success, else None:
+                 {'configFileName', 'fileNames', 'languageServiceDisabled'}
+        """
+        args = {
+            'file': path,
+            'needFileNameList': need_file_name_list
+        }
+        resp = await self.send_command(
+            cmd='projectInfo',
+            arguments=args,
+            timeout=timeout
         )
-        resp = await handler.wait_output()
         ret = None
         if resp.success:
             ret = resp.body
-        self._output_handler_registry.deregister_handler(handler)
         return ret
 
     async def cmd_references(
@@ -226,6 +801,7 @@ class TSServerClient(TSServerComm):
             path: str,
             line: int,
             offset: int,
+            timeout: Union[None, float] = None,
             **kwargs
     ) -> Union[None, dict]:
         args = {
@@ -234,23 +810,18 @@ class TSServerClient(TSServerComm):
             'offset': offset
         }
         args.update(kwargs)
-        _, handler = await self.send_request(
+        return await self._send_cached_command(
             cmd='references',
-            expect_output='response',
-            arguments=args
+            arguments=args,
+            timeout=timeout
         )
-        resp = await handler.wait_output()
-        ret = None
-        if resp.success:
-            ret = resp.body
-        self._output_handler_registry.deregister_handler(handler)
-        return ret
 
     async def cmd_goto_definition(
             self,
             path: str,
             line: int,
             offset: int,
+            timeout: Union[None, float] = None,
             **kwargs
     ) -> Union[None, dict]:
         args = {
@@ -259,23 +830,18 @@ class TSServerClient(TSServerComm):
             'offset': offset
         }
         args.update(kwargs)
-        _, handler = await self.send_request(
+        return await self._send_cached_command(
             cmd='definition',
-            expect_output='response',
-            arguments=args
+            arguments=args,
+            timeout=timeout
         )
-        resp = await handler.wait_output()
-        ret = None
-        if resp.success:
-            ret = resp.body
-        self._output_handler_registry.deregister_handler(handler)
-        return ret
 
     async def cmd_goto_type_definition(
             self,
             path: str,
             line: int,
             offset: int,
+            timeout: Union[None, float] = None,
             **kwargs
     ) -> Union[None, dict]:
         args = {
@@ -284,24 +850,146 @@ class TSServerClient(TSServerComm):
             'offset': offset
         }
         args.update(kwargs)
-        _, handler = await self.send_request(
+        return await self._send_cached_command(
             cmd='definition',
-            expect_output='response',
-            arguments=args
+            arguments=args,
+            timeout=timeout
         )
-        resp = await handler.wait_output()
-        ret = None
-        if resp.success:
-            ret = resp.body
-        self._output_handler_registry.deregister_handler(handler)
-        return ret
+
+    async def _stream_diagnostics(
+            self,
+            cmd: str,
+            args: dict,
+            kinds: Union[None, Iterable[str]],
+            files: Union[None, list[str]],
+            timeout: Union[None, float]
+    ) -> AsyncIterator[TSServerDiagnosticBatch]:
+        kinds = DIAGNOSTIC_KINDS if kinds is None else tuple(kinds)
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        req, handler = await self.send_request(
+            cmd=cmd,
+            expect_output='event',
+            arguments=args,
+            events=tuple(kind + 'Diag' for kind in kinds) + ('requestCompleted',),
+            files=files
+        )
+        self._latest_geterr_seq = req.seq
+        req_complete = False
+        try:
+            while not req_complete:
+                if deadline is None:
+                    resp: TSServerEvent = await handler.wait_output()
+                else:
+                    resp: TSServerEvent = await asyncio.wait_for(
+                        handler.wait_output(),
+                        max(0., deadline - loop.time())
+                    )
+                if resp.is_request_completed(req.seq):
+                    req_complete = True
+                else:
+                    yield TSServerDiagnosticBatch(
+                        file=resp.body.get('file', ''),
+                        kind=resp.event[:-4],
+                        diagnostics=resp.body.get('diagnostics', None) or []
+                    )
+        finally:
+            try:
+                if not req_complete:
+                    await self._abort_error_check(req.seq, handler)
+            finally:
+                self.finish_request(handler)
+
+    async def _abort_error_check(self, request_seq: int, handler: TSServerOutputHandler):
+        """
+        Stop the remaining work of an unfinished geterr / geterrForProject.
+        Without a cancellation pipe: tsserver runs one error check at a time and
+        starting a new one completes the previous, so an empty geterr aborts it
+        unless it was already superseded.
+        The handler is kept until the request's requestCompleted arrives, so
+        that diagnostics already on their way are dropped instead of reaching
+        the next error check. Its scheduler slot is released first, the empty
+        geterr may need it. The whole abort takes at most GETERR_ABORT_TIMEOUT
+        seconds.
+        """
+        if not self.is_alive:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + GETERR_ABORT_TIMEOUT
+        release, handler.release = handler.release, None
+        if release is not None:
+            release()
+        try:
+            if self._cancellation is not None:
+                self.cancel_request(request_seq)
+            elif self._latest_geterr_seq == request_seq:
+                req, _ = await asyncio.wait_for(
+                    self.send_request(
+                        cmd='geterr',
+                        expect_output=None,
+                        arguments={'files': [], 'delay': 0}
+                    ),
+                    max(0., deadline - loop.time())
+                )
+                self._latest_geterr_seq = req.seq
+            while True:
+                resp = await asyncio.wait_for(handler.wait_output(), max(0., deadline - loop.time()))
+                if resp.is_request_completed(request_seq):
+                    return
+        except (asyncio.TimeoutError, TSServerProcessException):
+            pass
+
+    def stream_errors(
+            self,
+            path_list: list[Union[str, dict]],
+            delay: int = 0,  # ms
+            kinds: Union[None, Iterable[str]] = None,
+            timeout: Union[None, float] = None,
+            **kwargs
+    ) -> AsyncIterator[TSServerDiagnosticBatch]:
+        """
+        Geterr, yielding the diagnostics of every file and kind as soon as
+        tsserver reports them. Closing the generator early (e.g. leaving an
+        `async with contextlib.aclosing(...)` block) aborts the remaining checks.
+        :param path_list: files to check, paths or FileRangesRequestArgs
+                          {'file', 'ranges'}.
+        :param delay: ms to wait before starting to check.
+        :param kinds: subset of ('syntax', 'semantic', 'suggestion') to yield, all if None.
+        :param timeout: seconds for the whole check, raises asyncio.TimeoutError.
+        """
+        args = {
+            'files': path_list,
+            'delay': delay
+        }
+        args.update(kwargs)
+        files = [f['file'] if isinstance(f, dict) else f for f in path_list]
+        return self._stream_diagnostics('geterr', args, kinds, files, timeout)
+
+    def stream_project_errors(
+            self,
+            path: str,
+            delay: int = 0,  # ms
+            kinds: Union[None, Iterable[str]] = None,
+            timeout: Union[None, float] = None,
+            **kwargs
+    ) -> AsyncIterator[TSServerDiagnosticBatch]:
+        """
+        Like `stream_errors`, for every file in the project of `path`.
+        """
+        args = {
+            'file': path,
+            'delay': delay
+        }
+        args.update(kwargs)
+        return self._stream_diagnostics('geterrForProject', args, kinds, None, timeout)
 
     async def cmd_get_errors(
             self,
-            path_list: list[str],
+            path_list: list[Union[str, dict]],
             delay: int = 0,  # ms
+            timeout: Union[None, float] = None,
             **kwargs
-    ) -> Union[None, dict]:
+    ) -> Union[None, TSServerDiagnosticTable]:
         """
         Geterr request; value of command field is "geterr". Wait for
         delay milliseconds and then, if during the wait no change or
@@ -313,77 +1001,32 @@ class TSServerClient(TSServerComm):
         file that is currently visible, in most-recently-used order.
         :param path_list:
         :param delay:
-        :return:
+        :return: TSServerDiagnosticTable of every diagnostic with its 'file'
+                 and 'diag' kind, None if there are none.
         """
-
-        args = {
-            'files': path_list,
-            'delay': delay
-        }
-        args.update(kwargs)
-        req, handler = await self.send_request(
-            cmd='geterr',
-            expect_output='event',
-            arguments=args
-        )
-        ret = []
-        req_complete = False
-        while not req_complete:
-            resp: TSServerEvent = await handler.wait_output()
-            if (resp.event in ('syntaxDiag', 'semanticDiag', 'suggestionDiag') and
-                    (diagnostics := resp.body.get('diagnostics', None))):
-                etc = {
-                    'file': resp.body.get('file', ''),
-                    'diag': resp.event[:-4]
-                }
-                ret += [diag | etc for diag in diagnostics]
-            elif resp.is_request_completed(req.seq):
-                req_complete = True
-            else:
-                pass
-        self._output_handler_registry.deregister_handler(handler)
+        ret = TSServerDiagnosticTable()
+        async for batch in self.stream_errors(path_list, delay, timeout=timeout, **kwargs):
+            ret.add_batch(batch)
         return ret if ret else None
 
     async def cmd_get_errors_for_project(
             self,
             path: str,
             delay: int = 0,  # ms
+            timeout: Union[None, float] = None,
             **kwargs
-    ) -> Union[None, dict]:
+    ) -> Union[None, TSServerDiagnosticTable]:
         """
         It works similarly with 'Geterr', only
         it request for every file in this project.
         :param path: str, the path to the file requesting project error list.
         :param delay: int, Delay in milliseconds to wait before starting to compute
                       errors for the files in the file list.
-        :return: body dict of GetErrForProjectResponse if success, else None.
+        :return: TSServerDiagnosticTable, see cmd_get_errors, None if there are no diagnostics.
         """
-        args = {
-            'file': path,
-            'delay': delay
-        }
-        args.update(**kwargs)
-        req, handler = await self.send_request(
-            cmd='geterrForProject',
-            expect_output='event',
-            arguments=args
-        )
-        ret = []
-        req_complete = False
-        while not req_complete:
-            resp: TSServerEvent = await handler.wait_output()
-            if (resp.event in ('syntaxDiag', 'semanticDiag', 'suggestionDiag') and
-                    (diagnostics := resp.body.get('diagnostics', None))):
-                etc = {
-                    'file': resp.body.get('file', ''),
-                    'diag': resp.event[:-4]
-                }
-                ret += [diag | etc for diag in diagnostics]
-            elif resp.is_request_completed(req.seq):
-                req_complete = True
-            else:
-                pass
-        self._output_handler_registry.deregister_handler(handler)
+        ret = TSServerDiagnosticTable()
+        async for batch in self.stream_project_errors(path, delay, timeout=timeout, **kwargs):
+            ret.add_batch(batch)
         return ret if ret else None
 
     async def cmd_quick_info(
@@ -391,6 +1034,8 @@ class TSServerClient(TSServerComm):
             path: str,
             line: int,
             offset: int,
+            timeout: Union[None, float] = None,
+            supersede: bool = False,
             **kwargs
     ) -> Union[None, dict]:
         args = {
@@ -399,14 +1044,9 @@ class TSServerClient(TSServerComm):
             'offset': offset
         }
         args.update(kwargs)
-        _, handler = await self.send_request(
+        return await self._send_cached_command(
             cmd='quickinfo',
-            expect_output='response',
-            arguments=args
+            arguments=args,
+            timeout=timeout,
+            supersede=supersede
         )
-        resp = await handler.wait_output()
-        ret = None
-        if resp.success:
-            ret = resp.body
-        self._output_handler_registry.deregister_handler(handler)
-        return ret
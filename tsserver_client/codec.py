@@ -0,0 +1,83 @@
+import json
+from .config import JSON_CODEC
+from typing import Union
+
+
+class JSONCodec:
+    """
+    Stdlib json codec, always available.
+    Codecs turn python objects into UTF-8 bytes and back; `loads` also
+    accepts memoryview so frames can be decoded without extra copies where
+    the backend allows it.
+    """
+    name: str = 'json'
+    decode_errors: tuple = (json.JSONDecodeError, UnicodeDecodeError)
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+    def loads(self, data: Union[bytes, memoryview]):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self.decode_errors = (orjson.JSONDecodeError, UnicodeDecodeError)
+
+    def dumps(self, obj) -> bytes:
+        return self._orjson.dumps(obj)
+
+    def loads(self, data: Union[bytes, memoryview]):
+        return self._orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self.decode_errors = (msgspec.DecodeError, UnicodeDecodeError)
+
+    def dumps(self, obj) -> bytes:
+        return self._encoder.encode(obj)
+
+    def loads(self, data: Union[bytes, memoryview]):
+        return self._decoder.decode(data)
+
+
+_CODECS = {
+    'orjson': OrjsonCodec,
+    'msgspec': MsgspecCodec,
+    'json': JSONCodec
+}
+
+
+def get_codec(codec: Union[None, str, JSONCodec] = None) -> JSONCodec:
+    """
+    :param codec: a codec instance, a codec name ('json', 'orjson', 'msgspec')
+                  or 'auto' to pick the fastest installed one.
+                  None falls back to `JSON_CODEC` in config.py.
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    name = codec or JSON_CODEC
+    if name != 'auto':
+        if name not in _CODECS:
+            raise ValueError(f'Unknown JSON codec: "{name}"')
+        return _CODECS[name]()
+    for codec_cls in _CODECS.values():
+        try:
+            return codec_cls()
+        except ImportError:
+            continue
+
+
+default_codec: JSONCodec = get_codec()
@@ -1,12 +1,28 @@
+import re
 import json
+import posixpath
+import time
 import asyncio
+import logging
 from dataclasses import dataclass, field
+from .codec import JSONCodec, get_codec, default_codec
+from .framing import TSServerFrameReader
+from .cancellation import TSServerCancellation
+from .scheduler import TSServerScheduler, priority_of, PRIORITIES
+from .metrics import TSServerMetrics
+from .recording import TSServerRecorder
+from .stderr import TSServerStderrBuffer, drain_stderr, DEFAULT_STDERR_MAX_BYTES
 from typing import (
+    Callable,
+    Hashable,
+    Iterable,
     Literal,
     Union,
     Tuple
 )
 
+logger = logging.getLogger(__name__)
+
 
 class TSServerStopLoopException(Exception):
     ...
@@ -20,7 +36,11 @@ class TSServerMessageParseException(Exception):
     ...
 
 
-@dataclass
+class TSServerRequestCancelledException(Exception):
+    ...
+
+
+@dataclass(slots=True)
 class TSServerRequest:
     seq: int
     type: str = field(init=False, default='request')
@@ -36,18 +56,78 @@ class TSServerRequest:
         }) + '\n'
 
     def __bytes__(self):
-        return bytes(str(self), 'utf-8')
+        return self.encode()
 
+    def encode(self, codec: Union[None, JSONCodec] = None) -> bytes:
+        return (codec or default_codec).dumps({
+            'seq': self.seq,
+            'type': self.type,
+            'command': self.command,
+            'arguments': self.arguments
+        }) + b'\n'
 
-@dataclass
+
+# prefix of a message as serialized by tsserver, anchored at the start so
+# nothing inside the body can be mistaken for a header field
+_OUTPUT_HEADER_RE = re.compile(
+    rb'\s*\{\s*"seq"\s*:\s*(-?\d+)\s*,\s*"type"\s*:\s*"(?:'
+    rb'event"\s*,\s*"event"\s*:\s*"([^"\\]*)"|'
+    rb'response"\s*,\s*"command"\s*:\s*"([^"\\]*)"\s*,\s*'
+    rb'"request_seq"\s*:\s*(\d+)\s*,\s*"success"\s*:\s*(true|false))'
+)
+_REQUEST_SEQ_RE = re.compile(rb'"request_seq"\s*:\s*(\d+)')
+
+# returned by `_decode_output` for messages skipped by lazy decoding
+_DROPPED = object()
+
+
+@dataclass(slots=True)
+class TSServerOutputHeader:
+    seq: int
+    type: Literal['event', 'response']
+    event: Union[None, str] = None
+    command: Union[None, str] = None
+    request_seq: Union[None, int] = None
+    success: Union[None, bool] = None
+
+
+@dataclass(slots=True)
 class TSServerOutputBody:
     seq: int
     type: Literal['event', 'response']
 
     @staticmethod
-    def from_bytes(b_str: bytes) -> Union['TSServerResponse', 'TSServerEvent', None]:
+    def peek_header(b_str: Union[bytes, memoryview]) -> Union[None, TSServerOutputHeader]:
+        """
+        Read the header fields of a message without decoding it.
+        :return: None if the message does not start the way tsserver serializes it.
+        """
+        match = _OUTPUT_HEADER_RE.match(b_str)
+        if match is None:
+            return None
+        seq, event, command, request_seq, success = match.groups()
+        if event is not None:
+            return TSServerOutputHeader(
+                seq=int(seq),
+                type='event',
+                event=event.decode('utf-8')
+            )
+        return TSServerOutputHeader(
+            seq=int(seq),
+            type='response',
+            command=command.decode('utf-8'),
+            request_seq=int(request_seq),
+            success=success == b'true'
+        )
+
+    @staticmethod
+    def from_bytes(
+            b_str: Union[bytes, memoryview],
+            codec: Union[None, JSONCodec] = None
+    ) -> Union['TSServerResponse', 'TSServerEvent', None]:
+        codec = codec or default_codec
         try:
-            body_dict = json.loads(b_str)
+            body_dict = codec.loads(b_str)
             body_type = body_dict.get('type', None)
             if body_type == 'response':
                 return TSServerResponse(
@@ -69,15 +149,14 @@ class TSServerOutputBody:
                 raise TSServerMessageParseException
         except (
                 IOError,
-                UnicodeDecodeError,
-                json.JSONDecodeError,
+                *codec.decode_errors,
                 TSServerMessageParseException
         ) as e:
-            print(e)
+            logger.warning('Cannot parse tsserver message: %s', e)
             return None
 
 
-@dataclass
+@dataclass(slots=True)
 class TSServerResponse(TSServerOutputBody):
     type: str = field(default='response', init=False)
     command: str
@@ -86,9 +165,44 @@ class TSServerResponse(TSServerOutputBody):
     message: None | str
     body: any
     metadata: any
-
-
-@dataclass
+    # the undecoded message, only kept for responses built by `lazy`
+    raw: Union[None, bytes, memoryview] = field(default=None, repr=False, compare=False)
+    _codec: Union[None, JSONCodec] = field(default=None, init=False, repr=False, compare=False)
+
+    _LAZY_FIELDS = ('message', 'body', 'metadata')
+
+    @classmethod
+    def lazy(
+            cls,
+            raw: Union[bytes, memoryview],
+            header: TSServerOutputHeader,
+            codec: Union[None, JSONCodec] = None
+    ) -> 'TSServerResponse':
+        """
+        Build a response from its peeked header only, `message`, `body`
+        and `metadata` are decoded from `raw` on first access.
+        """
+        self = cls.__new__(cls)
+        self.seq = header.seq
+        self.type = 'response'
+        self.command = header.command
+        self.request_seq = header.request_seq
+        self.success = header.success
+        self.raw = raw
+        self._codec = codec or default_codec
+        return self
+
+    def __getattr__(self, name: str):
+        # only reached for the unset lazy fields of a response built by `lazy`
+        if name in TSServerResponse._LAZY_FIELDS and self._codec is not None:
+            body_dict = self._codec.loads(self.raw)
+            for lazy_field in TSServerResponse._LAZY_FIELDS:
+                setattr(self, lazy_field, body_dict.get(lazy_field, None))
+            return getattr(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+
+@dataclass(slots=True)
 class TSServerEvent(TSServerOutputBody):
     type: str = field(default='event', init=False)
     event: str
@@ -101,75 +215,276 @@ class TSServerEvent(TSServerOutputBody):
         return False
 
 
-@dataclass
+def _norm_path(path: str) -> str:
+    # tsserver reports file names as toNormalizedPath does: forward slashes,
+    # '.', '..' and repeated slashes resolved
+    return posixpath.normpath(path.replace('\\', '/'))
+
+
+@dataclass(eq=False)
 class TSServerOutputHandler:
-    request_seq: int
+    """
+    Queue of events delivered to one consumer.
+    :param request_seq: seq of the request this handler belongs to, None for
+                        subscribers not bound to a request. A handler only
+                        receives the 'requestCompleted' event of its own request.
+    :param events: names of the events to receive, None for every event.
+    :param files: if given, events carrying a 'file' in their body are only
+                  received for these files.
+    :param callback: if given, called with every event instead of queueing it.
+    `wait_output` raises the exception passed to `fail`, e.g. when tsserver dies.
+    """
+    request_seq: Union[None, int]
+    events: Union[None, frozenset[str]] = None
+    files: Union[None, frozenset[str]] = None
+    release: Union[None, Callable[[], None]] = field(default=None, repr=False)
+    callback: Union[None, Callable[[TSServerEvent], None]] = field(default=None, repr=False)
     _output_buf: asyncio.Queue[Union[TSServerResponse | TSServerEvent]] = field(init=False,
                                                                                 default_factory=asyncio.Queue)
+    _exception: Union[None, BaseException] = field(init=False, default=None, repr=False)
+
+    def push(self, output_body: Union[TSServerResponse | TSServerEvent]):
+        if self.callback is not None:
+            try:
+                self.callback(output_body)
+            except Exception:
+                # a failing subscriber must not stop the reader
+                logger.exception('Event callback failed on %r', getattr(output_body, 'event', None))
+        else:
+            self._output_buf.put_nowait(output_body)
 
-    async def push(self, output_body: Union[TSServerResponse | TSServerEvent]):
-        await self._output_buf.put(output_body)
+    def fail(self, exc: BaseException):
+        if self._exception is None:
+            self._exception = exc
+            self._output_buf.put_nowait(None)
 
     async def wait_output(self) -> Union[TSServerResponse | TSServerEvent]:
-        return await self._output_buf.get()
+        output = await self._output_buf.get()
+        if output is None:
+            self._output_buf.put_nowait(None)  # keep failing later waits
+            raise self._exception
+        return output
 
 
 @dataclass
 class OutputHandlerRegistry:
-    _response_handlers: dict[int, TSServerOutputHandler] = field(default_factory=dict)
-    _event_handlers: dict[int, TSServerOutputHandler] = field(default_factory=dict)
+    _pending_responses: dict[int, asyncio.Future] = field(default_factory=dict)
+    # event name -> handlers
+    _event_handlers: dict[str, dict[TSServerOutputHandler, None]] = field(default_factory=dict)
+    # (event name, file) -> handlers
+    _file_event_handlers: dict[Tuple[str, str], dict[TSServerOutputHandler, None]] = field(default_factory=dict)
+    # request_seq -> handler waiting for its 'requestCompleted'
+    _completion_handlers: dict[int, TSServerOutputHandler] = field(default_factory=dict)
+    # handlers receiving every event
+    _global_handlers: dict[TSServerOutputHandler, None] = field(default_factory=dict)
+    # event name -> number of keys in _file_event_handlers for that event
+    _file_events: dict[str, int] = field(default_factory=dict)
+
+    def create_response_future(self, request_seq: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending_responses[request_seq] = future
+        return future
+
+    def discard_response_future(self, request_seq: int):
+        self._pending_responses.pop(request_seq, None)
+
+    def pop_response_future(self, request_seq: int) -> Union[None, asyncio.Future]:
+        return self._pending_responses.pop(request_seq, None)
+
+    def fail_pending(self, exc: BaseException):
+        pending = self._pending_responses
+        self._pending_responses = {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        handlers = dict.fromkeys(self._global_handlers)
+        handlers.update(dict.fromkeys(self._completion_handlers.values()))
+        for index in (self._event_handlers, self._file_event_handlers):
+            for hs in index.values():
+                handlers.update(hs)
+        for handler in handlers:
+            if handler.callback is None:
+                handler.fail(exc)
+
+    def _index_keys(self, handler: TSServerOutputHandler) -> list[Tuple[dict, object]]:
+        if handler.events is None:
+            return [(self._global_handlers, None)]
+        keys = []
+        for event in handler.events:
+            if event == 'requestCompleted':
+                if handler.request_seq is not None:
+                    keys.append((self._completion_handlers, handler.request_seq))
+            elif handler.files is not None:
+                keys += [(self._file_event_handlers, (event, _norm_path(f))) for f in handler.files]
+            else:
+                keys.append((self._event_handlers, event))
+        return keys
 
     def register_handler(
             self,
-            trigger_by: Literal['response', 'event', 'all'],
             handler: TSServerOutputHandler
     ):
-        request_seq = handler.request_seq
-        if trigger_by in ('response', 'all'):
-            self._response_handlers.update({request_seq: handler})
-        if trigger_by in ('event', 'all'):
-            self._event_handlers.update({request_seq: handler})
+        for index, key in self._index_keys(handler):
+            if index is self._global_handlers:
+                index[handler] = None
+            elif index is self._completion_handlers:
+                index[key] = handler
+            else:
+                if index is self._file_event_handlers and key not in index:
+                    self._file_events[key[0]] = self._file_events.get(key[0], 0) + 1
+                index.setdefault(key, {})[handler] = None
 
     def deregister_handler(
             self,
             handler: TSServerOutputHandler
     ):
-        request_seq = handler.request_seq
-        self._response_handlers.pop(request_seq, None)
-        self._event_handlers.pop(request_seq, None)
-
-    async def on_output(
+        for index, key in self._index_keys(handler):
+            if index is self._global_handlers:
+                index.pop(handler, None)
+            elif index is self._completion_handlers:
+                if index.get(key, None) is handler:
+                    del index[key]
+            else:
+                handlers = index.get(key, None)
+                if handlers is not None:
+                    handlers.pop(handler, None)
+                    if not handlers:
+                        del index[key]
+                        if index is self._file_event_handlers:
+                            self._file_events[key[0]] -= 1
+                            if not self._file_events[key[0]]:
+                                del self._file_events[key[0]]
+
+    def has_event_subscribers(self, event: str) -> bool:
+        if self._global_handlers or event in self._event_handlers:
+            return True
+        if event == 'requestCompleted':
+            return bool(self._completion_handlers)
+        return event in self._file_events
+
+    def is_response_pending(self, request_seq: int) -> bool:
+        return request_seq in self._pending_responses
+
+    def on_output(
             self,
             output_body: Union['TSServerResponse', 'TSServerEvent']
     ):
         if output_body.type == 'response':
-            request_seq = output_body.request_seq
-            handler: TSServerOutputHandler | None = self._response_handlers.get(request_seq, None)
-            if handler:
-                await handler.push(output_body)
+            future = self._pending_responses.pop(output_body.request_seq, None)
+            if future is not None and not future.done():
+                future.set_result(output_body)
 
         elif output_body.type == 'event':
-            for _, handler in self._event_handlers.items():
-                await handler.push(output_body)
-                # handler.trigger.set()
+            event = output_body.event
+            if event == 'requestCompleted':
+                handler = self._completion_handlers.get(output_body.body['request_seq'], None)
+                if handler is not None:
+                    handler.push(output_body)
+            else:
+                handlers = self._event_handlers.get(event, None)
+                if handlers:
+                    for handler in handlers:
+                        handler.push(output_body)
+                if self._file_event_handlers and isinstance(output_body.body, dict):
+                    file = output_body.body.get('file', None)
+                    if file is not None:
+                        handlers = self._file_event_handlers.get((event, file), None)
+                        if handlers:
+                            for handler in handlers:
+                                handler.push(output_body)
+            for handler in self._global_handlers:
+                handler.push(output_body)
 
         else:
             raise RuntimeError(f'Error: Unknown Output Type: "{output_body.type}"')
 
 
 class TSServerComm:
-    _CONTENT_LENGTH_HEADER = b'Content-Length: '
-
     def __init__(
             self,
-            ts_server_proc: asyncio.subprocess.Process
+            ts_server_proc: asyncio.subprocess.Process,
+            codec: Union[None, str, JSONCodec] = None,
+            lazy_decode: bool = False,
+            cancellation: Union[None, TSServerCancellation] = None,
+            scheduler: Union[None, TSServerScheduler] = None,
+            stderr_max_bytes: int = DEFAULT_STDERR_MAX_BYTES,
+            on_stderr: Union[None, Callable[[str], None]] = None,
+            metrics: Union[None, TSServerMetrics] = None,
+            recorder: Union[None, TSServerRecorder] = None
     ):
+        """
+        :param ts_server_proc: the running tsserver process.
+        :param codec: JSON codec instance or name, see `codec.get_codec`.
+        :param lazy_decode: peek at the header of every message instead of decoding it:
+                            events nobody subscribed to and responses nobody waits
+                            for are dropped unparsed, response bodies are decoded
+                            on first access.
+        :param cancellation: set if tsserver was started with its --cancellationPipeName,
+                             cancelled or timed out requests are then aborted server side.
+        :param scheduler: orders requests by priority class before they are written,
+                          see TSServerScheduler.
+        :param stderr_max_bytes: how much of the latest stderr output to keep, see `stderr_tail`.
+        :param on_stderr: called with every line tsserver writes to stderr.
+        :param metrics: records latencies, gauges and byte counts, see TSServerMetrics.
+        :param recorder: writes every request and message to a recording,
+                         see recording.py and replay.py.
+        """
         self._tsserver_proc: asyncio.subprocess.Process | None = ts_server_proc
+        self._codec: JSONCodec = get_codec(codec)
+        self._lazy_decode: bool = lazy_decode
+        self._cancellation: Union[None, TSServerCancellation] = cancellation
+        self._scheduler: Union[None, TSServerScheduler] = scheduler
+        self._superseding: dict[object, int] = {}  # supersede key -> request_seq
+        # seqs written to tsserver whose response (or requestCompleted) is still awaited
+        self._written: set[int] = set()
+        self._metrics: Union[None, TSServerMetrics] = metrics
+        self._recorder: Union[None, TSServerRecorder] = recorder
+        if metrics is not None and scheduler is not None:
+            metrics.queued = lambda: sum(scheduler.queued(p) for p in PRIORITIES)
         self._seq: int = 0
         self._output_handler_registry: OutputHandlerRegistry = OutputHandlerRegistry()
+        self._exit_exception: Union[None, TSServerProcessException] = None
+        self._stderr: TSServerStderrBuffer = TSServerStderrBuffer(stderr_max_bytes)
         self._tasks: dict[str: asyncio.Task] = dict({
             'watching_response': asyncio.create_task(self._monitor_output())
         })
+        if ts_server_proc.stderr is not None:
+            self._tasks['draining_stderr'] = asyncio.create_task(
+                drain_stderr(ts_server_proc.stderr, self._stderr, on_stderr)
+            )
+
+    def stderr_tail(self, n_lines: Union[None, int] = None) -> str:
+        """
+        The latest output of tsserver on stderr, bounded by `stderr_max_bytes`.
+        """
+        return self._stderr.tail(n_lines)
+
+    @property
+    def metrics(self) -> Union[None, TSServerMetrics]:
+        return self._metrics
+
+    @property
+    def process(self) -> Union[None, asyncio.subprocess.Process]:
+        return self._tsserver_proc
+
+    @property
+    def is_alive(self) -> bool:
+        """
+        False once tsserver stopped or its output stream closed.
+        """
+        return self._tsserver_proc is not None and self._exit_exception is None
+
+    def _check_alive(self):
+        if self._exit_exception is not None:
+            raise TSServerProcessException(*self._exit_exception.args)
+        if self._tsserver_proc is None:
+            raise TSServerProcessException('tsserver is stopped')
+
+    def _process_exception(self, message: str) -> TSServerProcessException:
+        tail = self._stderr.tail(20)
+        if tail:
+            message += '\nstderr:\n' + tail
+        return TSServerProcessException(message)
 
     @property
     def _inc_seq(self):
@@ -177,12 +492,31 @@ class TSServerComm:
         self._seq += 1
         return seq
 
+    def _request_priority(self, cmd: str):
+        if self._scheduler is None:
+            return None
+        return priority_of(cmd)
+
     async def send_request(
             self,
             cmd: str,
-            expect_output: Union[None, Literal['response', 'event', 'all']],
-            arguments: Union[None, dict] = None
+            expect_output: Union[None, Literal['event']],
+            arguments: Union[None, dict] = None,
+            events: Union[None, Iterable[str]] = None,
+            files: Union[None, Iterable[str]] = None
     ) -> Tuple[TSServerRequest, Union[None, TSServerOutputHandler]]:
+        """
+        Send a request whose outcome arrives as events (or not at all).
+        Use `send_command` for requests answered by a response.
+        :param events: event names the returned handler subscribes to, None for all.
+        :param files: restrict file-bound events to these files.
+        :return: the request and, if `expect_output`, its handler which must be
+                 passed to `finish_request` once the outcome has been received.
+        """
+        self._check_alive()
+        priority = self._request_priority(cmd)
+        if priority is not None:
+            await self._acquire_slot(cmd, priority)
         request = TSServerRequest(
             seq=self._inc_seq,
             command=cmd,
@@ -190,38 +524,318 @@ class TSServerComm:
         )
         output_handler = None
         if expect_output:
-            output_handler = TSServerOutputHandler(request.seq)
-            self._output_handler_registry.register_handler(
-                trigger_by=expect_output,
-                handler=output_handler
+            output_handler = TSServerOutputHandler(
+                request_seq=request.seq,
+                events=None if events is None else frozenset(events),
+                files=None if files is None else frozenset(files),
+                release=None if priority is None else (lambda: self._scheduler.release(priority))
             )
-        self._tsserver_proc.stdin.write(bytes(request))
-        await self._tsserver_proc.stdin.drain()
+            self._output_handler_registry.register_handler(output_handler)
+        try:
+            data = request.encode(self._codec)
+            self._tsserver_proc.stdin.write(data)
+            if output_handler is not None:
+                self._written.add(request.seq)
+            if self._recorder is not None:
+                self._record(self._recorder.record_request, data)
+            if self._metrics is not None:
+                self._metrics.request_sent(request.seq, cmd, len(data), bool(expect_output))
+            await self._tsserver_proc.stdin.drain()
+        except BaseException:
+            if output_handler is not None:
+                self.finish_request(output_handler)
+            elif priority is not None:
+                self._scheduler.release(priority)
+            raise
+        if output_handler is None and priority is not None:
+            self._scheduler.release(priority)
         return request, output_handler
 
-    async def _monitor_output(self):
+    async def _acquire_slot(self, cmd: str, priority):
+        if self._metrics is None:
+            return await self._scheduler.acquire(priority)
+        t = time.perf_counter()
+        await self._scheduler.acquire(priority)
+        self._metrics.record_latency('queue', cmd, time.perf_counter() - t)
+
+    def finish_request(self, handler: TSServerOutputHandler):
+        """
+        Stop receiving events for a request sent by `send_request`.
+        """
+        self._output_handler_registry.deregister_handler(handler)
+        self._written.discard(handler.request_seq)
+        release, handler.release = handler.release, None
+        if release is not None:
+            release()
+
+    async def send_command(
+            self,
+            cmd: str,
+            arguments: Union[None, dict] = None,
+            timeout: Union[None, float] = None,
+            supersede_key: Union[None, Hashable] = None
+    ) -> TSServerResponse:
+        """
+        Send a request and wait for its response.
+        The pending future is removed from the registry on completion,
+        timeout (raises asyncio.TimeoutError) or cancellation, and the request
+        is cancelled server side if tsserver has a cancellation pipe.
+        :param supersede_key: a request still pending with the same key is cancelled,
+                              its caller gets TSServerRequestCancelledException.
+        """
+        self._check_alive()
+        request = TSServerRequest(
+            seq=self._inc_seq,
+            command=cmd,
+            arguments=arguments
+        )
+        registry = self._output_handler_registry
+        future = registry.create_response_future(request.seq)
+        if supersede_key is not None:
+            superseded = self._superseding.get(supersede_key, None)
+            self._superseding[supersede_key] = request.seq
+            if superseded is not None:
+                self.cancel_request(superseded)
+        priority = self._request_priority(cmd)
+        acquired = False
         try:
-            is_running = lambda: (
-                    self._tsserver_proc and
-                    self._tsserver_proc.stdout and
-                    not self._tsserver_proc.stdout.at_eof()
-            )
+            if priority is not None:
+                await self._acquire_slot(cmd, priority)
+                acquired = True
+            if not future.done():  # else superseded while queued
+                data = request.encode(self._codec)
+                self._tsserver_proc.stdin.write(data)
+                self._written.add(request.seq)
+                if self._recorder is not None:
+                    self._record(self._recorder.record_request, data)
+                if self._metrics is not None:
+                    self._metrics.request_sent(request.seq, cmd, len(data))
+                await self._tsserver_proc.stdin.drain()
+            if timeout is None:
+                return await future
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError, TSServerRequestCancelledException):
+            self.cancel_request(request.seq)
+            raise
+        finally:
+            if acquired:
+                self._scheduler.release(priority)
+            registry.discard_response_future(request.seq)
+            self._written.discard(request.seq)
+            if supersede_key is not None and self._superseding.get(supersede_key, None) == request.seq:
+                del self._superseding[supersede_key]
+
+    def cancel_request(self, request_seq: int):
+        """
+        Abort a request: its pending response future fails with
+        TSServerRequestCancelledException and, if tsserver has a cancellation
+        pipe and the request was written but not answered yet, tsserver is
+        signalled to stop working on it.
+        """
+        future = self._output_handler_registry.pop_response_future(request_seq)
+        # a future cancelled by its caller or a timeout was not answered
+        answered = future is not None and future.done() and not future.cancelled()
+        if future is not None and not future.done():
+            future.set_exception(TSServerRequestCancelledException(f'Request {request_seq} cancelled'))
+        if self._metrics is not None:
+            self._metrics.request_cancelled(request_seq)
+        # nothing would ever clear the signal of a request tsserver never saw
+        if (
+                self._cancellation is not None
+                and self._tsserver_proc is not None
+                and request_seq in self._written
+                and not answered
+        ):
+            self._cancellation.cancel(request_seq)
+
+    def _clear_cancellation(self, b_body: bytes):
+        # a cancelled request is finished once its response or requestCompleted shows up
+        header = TSServerOutputBody.peek_header(b_body)
+        if header is None:
+            return
+        if header.type == 'response':
+            self._cancellation.clear(header.request_seq)
+        elif header.event == 'requestCompleted':
+            match = _REQUEST_SEQ_RE.search(b_body)
+            if match is not None:
+                self._cancellation.clear(int(match.group(1)))
+
+    async def send_commands(
+            self,
+            commands: list[Tuple[str, Union[None, dict]]],
+            max_in_flight: Union[None, int] = None,
+            timeout: Union[None, float] = None
+    ) -> list[Union[TSServerResponse, BaseException]]:
+        """
+        Pipeline many requests: consecutive requests are serialized into a single
+        write, and at most `max_in_flight` of them are outstanding at any time.
+        With a scheduler, every write waits until no interactive request is pending.
+        :param commands: (command, arguments) pairs.
+        :param max_in_flight: window size, None sends everything at once.
+        :param timeout: for the whole batch, unfinished items time out.
+        :return: the responses in request order, with the exception in place of
+                 every item that failed or timed out.
+        """
+        self._check_alive()
+        registry = self._output_handler_registry
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        requests = [
+            TSServerRequest(seq=self._inc_seq, command=cmd, arguments=arguments)
+            for cmd, arguments in commands
+        ]
+        futures = [registry.create_response_future(req.seq) for req in requests]
+        window = max_in_flight or len(requests)
+        slot_freed = asyncio.Event()
+        in_flight = 0
+
+        def on_done(_):
+            nonlocal in_flight
+            in_flight -= 1
+            slot_freed.set()
+
+        def remaining():
+            return None if deadline is None else max(0., deadline - loop.time())
+
+        sent = 0
+        try:
+            while sent < len(requests):
+                if in_flight >= window:
+                    slot_freed.clear()
+                    await asyncio.wait_for(slot_freed.wait(), remaining())
+                    continue
+                if self._scheduler is not None:
+                    await self._scheduler.wait_interactive_idle()
+                end = min(len(requests), sent + window - in_flight)
+                data = b''.join(req.encode(self._codec) for req in requests[sent:end])
+                self._tsserver_proc.stdin.write(data)
+                self._written.update(req.seq for req in requests[sent:end])
+                if self._recorder is not None:
+                    self._record(self._recorder.record_request, data)
+                if self._metrics is not None:
+                    self._metrics.requests_sent([(req.seq, req.command) for req in requests[sent:end]], len(data))
+                for future in futures[sent:end]:
+                    future.add_done_callback(on_done)
+                in_flight += end - sent
+                sent = end
+                await self._tsserver_proc.stdin.drain()
+            if futures:
+                await asyncio.wait(futures, timeout=remaining())
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            self._written.difference_update(req.seq for req in requests)
+            raise
+        finally:
+            for req in requests:
+                registry.discard_response_future(req.seq)
+
+        results = []
+        try:
+            for req, future in zip(requests, futures):
+                if not future.done():
+                    future.cancel()
+                    self.cancel_request(req.seq)
+                    results.append(asyncio.TimeoutError())
+                elif future.cancelled():
+                    results.append(asyncio.CancelledError())
+                else:
+                    results.append(future.exception() or future.result())
+        finally:
+            self._written.difference_update(req.seq for req in requests)
+        return results
+
+    def subscribe_events(
+            self,
+            events: Union[None, Iterable[str]] = None,
+            callback: Union[None, Callable[[TSServerEvent], None]] = None
+    ) -> TSServerOutputHandler:
+        """
+        Subscribe to events not bound to any request,
+        e.g. 'projectLoadingFinish' or 'telemetry'. None subscribes to every event.
+        Events are queued on the returned handler, or passed to `callback`.
+        Call `unsubscribe_events` with the returned handler when done.
+        """
+        handler = TSServerOutputHandler(
+            request_seq=None,
+            events=None if events is None else frozenset(events),
+            callback=callback
+        )
+        self._output_handler_registry.register_handler(handler)
+        return handler
 
-            body_length = 0
-            while is_running():
-                if body_length == 0:  # expecting a line of header
-                    b_header = await self._tsserver_proc.stdout.readline()
-                    b_header = b_header.strip()
-                    if b_header and b_header.startswith(TSServerComm._CONTENT_LENGTH_HEADER):
-                        body_length = int(b_header[len(TSServerComm._CONTENT_LENGTH_HEADER):])
-                elif body_length >= 0:  # expecting to read a body
-                    b_body = await self._tsserver_proc.stdout.read(body_length + 1)  # plus 1 for '\n'
-                    body_length = 0
-                    output_body = TSServerOutputBody.from_bytes(b_body)
-                    if output_body:
-                        await self._output_handler_registry.on_output(output_body)
+    def unsubscribe_events(self, handler: TSServerOutputHandler):
+        self._output_handler_registry.deregister_handler(handler)
+
+    def _decode_output(
+            self,
+            b_body: bytes
+    ) -> Union[None, TSServerResponse, TSServerEvent]:
+        if not self._lazy_decode:
+            return TSServerOutputBody.from_bytes(b_body, self._codec)
+        header = TSServerOutputBody.peek_header(b_body)
+        registry = self._output_handler_registry
+        if header is None:
+            return TSServerOutputBody.from_bytes(b_body, self._codec)
+        if header.type == 'response':
+            if not registry.is_response_pending(header.request_seq):
+                return _DROPPED
+            return TSServerResponse.lazy(b_body, header, self._codec)
+        if not registry.has_event_subscribers(header.event):
+            return _DROPPED
+        return TSServerOutputBody.from_bytes(b_body, self._codec)
+
+    def _record_frame(self, b_body: bytes, output_body, seconds: float):
+        metrics = self._metrics
+        request_seq = None
+        if output_body is None or output_body is _DROPPED:
+            header = TSServerOutputBody.peek_header(b_body)
+            name = 'unknown' if header is None else (header.event or header.type)
+            if header is not None and header.type == 'response':
+                request_seq = header.request_seq
+            elif name == 'requestCompleted':
+                match = _REQUEST_SEQ_RE.search(b_body)
+                request_seq = None if match is None else int(match.group(1))
+        elif output_body.type == 'response':
+            name = 'response'
+            request_seq = output_body.request_seq
+            metrics.record_latency('parse', output_body.command, seconds)
+        else:
+            name = output_body.event
+            if name == 'requestCompleted':
+                request_seq = output_body.body['request_seq']
+            metrics.record_latency('parse', name, seconds)
+        metrics.frame_read(name, len(b_body))
+        if request_seq is not None:
+            metrics.request_done(request_seq)
+        if output_body is None:
+            metrics.parse_failed()
+
+    def _record(self, record: Callable[[bytes], None], data: bytes):
+        try:
+            record(data)
+        except Exception:
+            # like metrics observers, a failing recording must never change the outcome of a request
+            logger.exception('Recording tsserver traffic failed, recording stopped')
+            self._recorder = None
+
+    async def _monitor_output(self):
+        exit_message = 'tsserver output stream closed'
+        try:
+            reader = TSServerFrameReader(self._tsserver_proc.stdout)
+            async for b_body in reader:
+                if self._recorder is not None:
+                    self._record(self._recorder.record_frame, b_body)
+                if self._cancellation is not None and self._cancellation.pending:
+                    self._clear_cancellation(b_body)
+                if self._metrics is None:
+                    output_body = self._decode_output(b_body)
                 else:
-                    continue
+                    t = time.perf_counter()
+                    output_body = self._decode_output(b_body)
+                    self._record_frame(b_body, output_body, time.perf_counter() - t)
+                if output_body is not None and output_body is not _DROPPED:
+                    self._output_handler_registry.on_output(output_body)
 
         except (
                 BrokenPipeError,
@@ -230,4 +844,15 @@ class TSServerComm:
                 TSServerProcessException
         ):
             pass
+        except Exception as e:
+            # a bug of ours, the client cannot go on without its reader
+            logger.exception('Reading tsserver output failed')
+            if self._tsserver_proc.returncode is None:
+                self._tsserver_proc.kill()
+            exit_message = f'reading tsserver output failed: {e!r}'
+        finally:
+            self._exit_exception = self._process_exception(exit_message)
+            self._output_handler_registry.fail_pending(self._exit_exception)
+            if self._metrics is not None:
+                self._metrics.reset_pending()
         return
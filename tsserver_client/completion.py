@@ -0,0 +1,240 @@
+import asyncio
+from dataclasses import dataclass, field
+from .client import TSServerClient
+from .positions import _utf16_len
+from typing import Tuple, Union
+
+DETAILS_BATCH_SIZE = 16
+
+# how well an entry matches the typed prefix, best first
+MATCH_PREFIX = 0  # case-sensitive prefix
+MATCH_PREFIX_IGNORE_CASE = 1
+MATCH_SUBSTRING = 2  # case-insensitive
+MATCH_SUBSEQUENCE = 3  # case-insensitive, e.g. 'gEBI' for getElementById
+
+
+def _is_identifier_char(ch: str) -> bool:
+    return ch.isalnum() or ch in '_$'
+
+
+def match_class(prefix: str, prefix_lower: str, name: str, name_lower: str) -> Union[None, int]:
+    """
+    :return: one of the MATCH_* classes, None if `name` does not match `prefix`.
+    """
+    if name.startswith(prefix):
+        return MATCH_PREFIX
+    if name_lower.startswith(prefix_lower):
+        return MATCH_PREFIX_IGNORE_CASE
+    if prefix_lower in name_lower:
+        return MATCH_SUBSTRING
+    chars = iter(name_lower)
+    if all(ch in chars for ch in prefix_lower):
+        return MATCH_SUBSEQUENCE
+    return None
+
+
+@dataclass
+class TSServerCompletionList:
+    """
+    Completion entries for the identifier being typed, best match first.
+    :param info: completionInfo body without its entries, e.g. 'isMemberCompletion'.
+    :param from_cache: False if a completionInfo request was sent for this list.
+    """
+    entries: list[dict]
+    prefix: str
+    line: int
+    offset: int
+    info: dict = field(default_factory=dict)
+    from_cache: bool = False
+
+
+class TSServerCompletionSession:
+    """
+    Completions in one file, as an identifier is typed. The entries of
+    completionInfo are fetched once for an identifier and filtered and ranked
+    here as its prefix grows or shrinks; tsserver is asked again only when
+    the identifier start moves (another line, another word, after a '.')
+    or when its last answer was marked isIncomplete.
+
+        session = TSServerCompletionSession(client, path)
+        completions = await session.complete(line, offset)
+        details = await session.details(k=5)
+
+    Entries are ranked by match class (see MATCH_*), then tsserver's sortText.
+    Edits outside the identifier do not refresh the cached entries, call
+    `invalidate` after them if needed.
+    """
+
+    def __init__(
+            self,
+            client: TSServerClient,
+            path: str,
+            timeout: Union[None, float] = None,
+            details_batch_size: int = DETAILS_BATCH_SIZE
+    ):
+        self.client: TSServerClient = client
+        self.path: str = path
+        self.timeout: Union[None, float] = timeout
+        self.details_batch_size: int = details_batch_size
+        self.requests: int = 0  # completionInfo requests sent
+        self.current: Union[None, TSServerCompletionList] = None
+        self._boundary: Union[None, Tuple[int, int]] = None  # (line, offset) where the identifier starts
+        self._info: dict = {}
+        self._incomplete: bool = False
+        # (filter text, lowered, sortText, entry) of every cached entry
+        self._entries: list[Tuple[str, str, str, dict]] = []
+        self._last_prefix: Union[None, str] = None
+        self._last_matches: list[Tuple[str, str, str, dict]] = []
+        self._details: dict[Tuple[str, str], Union[None, dict]] = {}
+
+    def invalidate(self):
+        self._boundary = None
+        self._entries = []
+        self._last_prefix = None
+        self._last_matches = []
+        self._details.clear()
+
+    def _typed_prefix(self, line: int, offset: int) -> str:
+        # identifier characters left of the caret, in the text tsserver has
+        index = self.client.positions.get(self.path)
+        text = index.text
+        end = index.index_of(line, offset)
+        start = end
+        line_start = index.line_starts[line - 1]
+        while start > line_start and _is_identifier_char(text[start - 1]):
+            start -= 1
+        return text[start:end]
+
+    async def _fetch(self, line: int, offset: int, trigger_character: Union[None, str]):
+        body = await self.client.cmd_completion_info(
+            self.path,
+            line,
+            offset,
+            trigger_character=trigger_character,
+            timeout=self.timeout,
+            supersede=True
+        )
+        self.requests += 1
+        entries = (body or {}).get('entries', None) or []
+        self._info = {k: v for k, v in (body or {}).items() if k != 'entries'}
+        # a failed request is retried on the next keystroke
+        self._incomplete = body is None or bool(body.get('isIncomplete', False))
+        self._entries = []
+        for entry in entries:
+            text = entry.get('filterText', None) or entry['name']
+            self._entries.append((text, text.lower(), entry.get('sortText', ''), entry))
+        self._last_prefix = None
+        self._last_matches = []
+        self._details.clear()
+
+    def _filter(self, prefix: str) -> list[dict]:
+        # every match of a longer prefix is a (subsequence) match of a shorter one
+        if self._last_prefix is not None and prefix.lower().startswith(self._last_prefix.lower()):
+            candidates = self._last_matches
+        else:
+            candidates = self._entries
+        prefix_lower = prefix.lower()
+        ranked = []
+        for item in candidates:
+            cls = match_class(prefix, prefix_lower, item[0], item[1]) if prefix else MATCH_PREFIX
+            if cls is not None:
+                ranked.append((cls, item[2], item[1], item))
+        ranked.sort(key=lambda r: r[:3])
+        self._last_prefix = prefix
+        self._last_matches = [r[3] for r in ranked]
+        return [item[3] for item in self._last_matches]
+
+    async def complete(
+            self,
+            line: int,
+            offset: int,
+            prefix: Union[None, str] = None,
+            trigger_character: Union[None, str] = None,
+            limit: Union[None, int] = None
+    ) -> TSServerCompletionList:
+        """
+        Entries for the caret at (line, offset).
+        :param prefix: the part of the identifier left of the caret, read from
+                       the file (the open document, or else the file on disk) if None.
+        :param trigger_character: passed to completionInfo when it is sent.
+        :param limit: return only the best `limit` entries.
+        """
+        if prefix is None:
+            prefix = self._typed_prefix(line, offset)
+        boundary = (line, offset - _utf16_len(prefix))
+        from_cache = boundary == self._boundary and not self._incomplete
+        if not from_cache:
+            await self._fetch(line, offset, trigger_character)
+            self._boundary = boundary
+        entries = self._filter(prefix)
+        self.current = TSServerCompletionList(
+            entries=entries[:limit] if limit is not None else entries,
+            prefix=prefix,
+            line=line,
+            offset=offset,
+            info=self._info,
+            from_cache=from_cache
+        )
+        return self.current
+
+    @staticmethod
+    def _entry_key(entry: dict) -> Tuple[str, str]:
+        return entry['name'], entry.get('source', None) or ''
+
+    @staticmethod
+    def _entry_id(entry: dict) -> Union[str, dict]:
+        if 'source' not in entry and 'data' not in entry:
+            return entry['name']
+        entry_id = {'name': entry['name']}
+        for key in ('source', 'data'):
+            if key in entry:
+                entry_id[key] = entry[key]
+        return entry_id
+
+    async def _fetch_details(self, entries: list[dict], line: int, offset: int):
+        ret = await self.client.cmd_completion_entry_details(
+            self.path,
+            line,
+            offset,
+            [self._entry_id(entry) for entry in entries],
+            timeout=self.timeout
+        )
+        if ret is None:
+            return  # failed, asked again next time
+        # details come back in request order, entries tsserver does not know are left out
+        pending = [self._entry_key(entry) for entry in entries]
+        for details in ret:
+            for i, key in enumerate(pending):
+                if key[0] == details.get('name', None):
+                    self._details[key] = details
+                    del pending[i]
+                    break
+        for key in pending:
+            self._details[key] = None
+
+    async def details(
+            self,
+            k: int = 10,
+            entries: Union[None, list[dict]] = None
+    ) -> list[Union[None, dict]]:
+        """
+        completionEntryDetails of the best `k` entries of the last `complete`
+        (or of `entries`), in their order; None for entries tsserver has no
+        details for. Only entries not fetched before are requested, in
+        concurrent requests of at most `details_batch_size` entries.
+        """
+        if self.current is None:
+            raise RuntimeError('complete must be called before details')
+        entries = entries if entries is not None else self.current.entries[:k]
+        missing, seen = [], set()
+        for entry in entries:
+            key = self._entry_key(entry)
+            if key not in self._details and key not in seen:
+                seen.add(key)
+                missing.append(entry)
+        size = max(1, self.details_batch_size)
+        await asyncio.gather(*(
+            self._fetch_details(missing[i:i + size], self.current.line, self.current.offset)
+            for i in range(0, len(missing), size)
+        ))
+        return [self._details.get(self._entry_key(entry), None) for entry in entries]
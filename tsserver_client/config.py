@@ -1,6 +1,17 @@
 import os
+import shlex
 
 TSSERVER_PATH = os.getenv(
     'TSSERVER_PATH',
     '/usr/share/code/resources/app/extensions/node_modules/typescript/lib/tsserver.js'
 )
+
+# node executable and its flags, e.g. TSSERVER_NODE_FLAGS="--max-old-space-size=8192"
+NODE_PATH = os.getenv('TSSERVER_NODE_PATH', 'node')
+NODE_FLAGS = shlex.split(os.getenv('TSSERVER_NODE_FLAGS', ''))
+
+# extra tsserver options, e.g. TSSERVER_ARGS="--disableAutomaticTypingAcquisition"
+TSSERVER_ARGS = shlex.split(os.getenv('TSSERVER_ARGS', ''))
+
+# one of 'auto', 'json', 'orjson', 'msgspec'
+JSON_CODEC = os.getenv('TSSERVER_JSON_CODEC', 'auto')
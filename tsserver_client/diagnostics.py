@@ -0,0 +1,207 @@
+from array import array
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Literal, Union
+
+DIAGNOSTIC_KINDS = ('syntax', 'semantic', 'suggestion')
+DIAGNOSTIC_EVENTS = tuple(kind + 'Diag' for kind in DIAGNOSTIC_KINDS)
+
+DIAGNOSTIC_CATEGORIES = ('error', 'warning', 'suggestion', 'message')
+_CATEGORY_INDEX = {category: i for i, category in enumerate(DIAGNOSTIC_CATEGORIES)}
+_KIND_INDEX = {kind: i for i, kind in enumerate(DIAGNOSTIC_KINDS)}
+
+# keys of a tsserver diagnostic stored in the columns, in tsserver's order
+_COLUMN_KEYS = ('start', 'end', 'text', 'code', 'category')
+
+_INT_MIN, _INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+# name -> array typecode, one entry per diagnostic
+_COLUMNS = {
+    'file_index': 'i',
+    'kind': 'b',
+    'start_line': 'i',
+    'start_offset': 'i',
+    'end_line': 'i',
+    'end_offset': 'i',
+    'code': 'i',
+    'category': 'b'  # -1: the diagnostic did not fit the columns, see `_extra`
+}
+
+
+@dataclass
+class TSServerDiagnosticBatch:
+    """
+    Diagnostics of one kind for one file, as carried by a single
+    syntaxDiag / semanticDiag / suggestionDiag event.
+    """
+    file: str
+    kind: Literal['syntax', 'semantic', 'suggestion']
+    diagnostics: list[dict]
+
+
+class TSServerDiagnostic(Mapping):
+    """
+    Read-only view of one row of a TSServerDiagnosticTable, with the keys of
+    the tsserver diagnostic plus its 'file' and 'diag' kind. `start` and `end`
+    are built on access; use dict(diag) for a mutable copy.
+    """
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table: 'TSServerDiagnosticTable', row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str):
+        return self._table.value(self._row, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.keys(self._row))
+
+    def __len__(self) -> int:
+        return len(self._table.keys(self._row))
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class TSServerDiagnosticTable(Sequence):
+    """
+    Geterr diagnostics stored by column: file paths are interned in `files`,
+    positions, codes, kinds and categories are kept in compact arrays and
+    only the text (deduplicated) and the rare extra keys (relatedInformation,
+    reportsUnnecessary, ...) as objects.
+
+    Indexing and iterating give TSServerDiagnostic views, which read like the
+    `diag | {'file': ..., 'diag': ...}` dicts returned before.
+    """
+
+    def __init__(self):
+        self.files: list[str] = []
+        self._file_ids: dict[str, int] = {}
+        self._texts: dict[str, str] = {}
+        for name, typecode in _COLUMNS.items():
+            setattr(self, name, array(typecode))
+        self.text: list[str] = []
+        # row -> keys not in the columns, or the whole diagnostic if category is -1
+        self._extra: dict[int, dict] = {}
+
+    def _file_id(self, path: str) -> int:
+        file_id = self._file_ids.get(path, None)
+        if file_id is None:
+            file_id = self._file_ids[path] = len(self.files)
+            self.files.append(path)
+        return file_id
+
+    def _append(self, file_id: int, kind: int, diag: dict):
+        try:
+            start, end = diag['start'], diag['end']
+            values = (
+                start['line'], start['offset'], end['line'], end['offset'],
+                diag['code'], _CATEGORY_INDEX[diag['category']]
+            )
+            text = diag['text']
+            fits = all(type(v) is int and _INT_MIN <= v <= _INT_MAX for v in values) and type(text) is str
+        except (KeyError, TypeError):
+            fits = False
+        if not fits:
+            values = (0, 0, 0, 0, 0, -1)
+            text = ''
+        row = len(self.text)
+        self.file_index.append(file_id)
+        self.kind.append(kind)
+        self.start_line.append(values[0])
+        self.start_offset.append(values[1])
+        self.end_line.append(values[2])
+        self.end_offset.append(values[3])
+        self.code.append(values[4])
+        self.category.append(values[5])
+        self.text.append(self._texts.setdefault(text, text))
+        if not fits:
+            self._extra[row] = dict(diag)
+        elif len(diag) > len(_COLUMN_KEYS):
+            self._extra[row] = {k: v for k, v in diag.items() if k not in _COLUMN_KEYS}
+
+    def add_batch(self, batch: TSServerDiagnosticBatch):
+        file_id = self._file_id(batch.file)
+        kind = _KIND_INDEX[batch.kind]
+        for diag in batch.diagnostics:
+            self._append(file_id, kind, diag)
+
+    def extend(self, other: 'TSServerDiagnosticTable'):
+        """
+        Append the rows of another table.
+        """
+        offset = len(self)
+        file_ids = [self._file_id(path) for path in other.files]
+        self.file_index.extend(file_ids[i] for i in other.file_index)
+        for name in _COLUMNS:
+            if name != 'file_index':
+                getattr(self, name).extend(getattr(other, name))
+        self.text.extend(self._texts.setdefault(text, text) for text in other.text)
+        self._extra.update((offset + row, extra) for row, extra in other._extra.items())
+
+    def select(self, rows: Iterable[int]) -> 'TSServerDiagnosticTable':
+        """
+        New table holding the given rows, in the given order.
+        """
+        rows = list(rows)
+        ret = TSServerDiagnosticTable()
+        ret.files = list(self.files)
+        ret._file_ids = dict(self._file_ids)
+        for name, typecode in _COLUMNS.items():
+            column = getattr(self, name)
+            setattr(ret, name, array(typecode, [column[row] for row in rows]))
+        ret.text = [self.text[row] for row in rows]
+        ret._texts = {text: text for text in ret.text}
+        ret._extra = {i: self._extra[row] for i, row in enumerate(rows) if row in self._extra}
+        return ret
+
+    def keys(self, row: int) -> tuple:
+        extra = self._extra.get(row, None)
+        if extra is None:
+            return _COLUMN_KEYS + ('file', 'diag')
+        if self.category[row] < 0:
+            return tuple(extra) + ('file', 'diag')
+        return _COLUMN_KEYS + tuple(extra) + ('file', 'diag')
+
+    def value(self, row: int, key: str):
+        """
+        Value of `key` in the diagnostic at `row`, raises KeyError if it has none.
+        """
+        if key == 'file':
+            return self.files[self.file_index[row]]
+        if key == 'diag':
+            return DIAGNOSTIC_KINDS[self.kind[row]]
+        if self.category[row] < 0 or key not in _COLUMN_KEYS:
+            return self._extra.get(row, {})[key]
+        if key == 'start':
+            return {'line': self.start_line[row], 'offset': self.start_offset[row]}
+        if key == 'end':
+            return {'line': self.end_line[row], 'offset': self.end_offset[row]}
+        if key == 'text':
+            return self.text[row]
+        if key == 'code':
+            return self.code[row]
+        return DIAGNOSTIC_CATEGORIES[self.category[row]]
+
+    def to_dicts(self) -> list[dict]:
+        return [dict(diag) for diag in self]
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return self.select(range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('diagnostic index out of range')
+        return TSServerDiagnostic(self, index)
+
+    def __iter__(self) -> Iterator[TSServerDiagnostic]:
+        for row in range(len(self)):
+            yield TSServerDiagnostic(self, row)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({len(self)} diagnostics in {len(self.files)} files)'
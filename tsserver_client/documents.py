@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from .positions import TSServerPositionIndex
+from typing import Union, Tuple
+
+
+def position_of(text: str, index: int) -> Tuple[int, int]:
+    """
+    Convert a character index into tsserver's 1-based (line, offset),
+    offsets counted in UTF-16 code units.
+    """
+    return TSServerPositionIndex(text).position_of(index)
+
+
+def index_of(text: str, line: int, offset: int) -> int:
+    """
+    Convert tsserver's 1-based (line, offset) into a character index.
+    """
+    return TSServerPositionIndex(text).index_of(line, offset)
+
+
+def text_change(old: str, new: str) -> Union[None, dict]:
+    """
+    Smallest single-range edit turning `old` into `new`,
+    as a tsserver CodeEdit: {'start', 'end', 'newText'}. None if equal.
+    """
+    if old == new:
+        return None
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    # never split a '\r\n' pair, tsserver counts it as one line break
+    if prefix and old[prefix - 1] == '\r' and old[prefix:prefix + 1] == '\n':
+        prefix -= 1
+    end = len(old) - suffix
+    if suffix and end and old[end - 1] == '\r' and old[end] == '\n':
+        suffix -= 1
+    index = TSServerPositionIndex(old)
+    start_line, start_offset = index.position_of(prefix)
+    end_line, end_offset = index.position_of(len(old) - suffix)
+    return {
+        'start': {'line': start_line, 'offset': start_offset},
+        'end': {'line': end_line, 'offset': end_offset},
+        'newText': new[prefix:len(new) - suffix]
+    }
+
+
+@dataclass
+class TSDocument:
+    """
+    Text of a file as last sent to tsserver.
+    """
+    path: str
+    text: str
+    version: int = 0
+
+    def apply_change(
+            self,
+            line: int,
+            offset: int,
+            end_line: int,
+            end_offset: int,
+            new_text: str
+    ) -> str:
+        index = TSServerPositionIndex(self.text)
+        start = index.index_of(line, offset)
+        end = index.index_of(end_line, end_offset)
+        self.text = self.text[:start] + new_text + self.text[end:]
+        self.version += 1
+        return self.text
@@ -0,0 +1,180 @@
+import asyncio
+from .client import TSServerClient
+from .comm import TSServerRequest, TSServerResponse, TSServerOutputHandler
+from .launch import TSServerLaunchOptions
+from typing import (
+    Hashable,
+    Iterable,
+    Literal,
+    Tuple,
+    Union
+)
+
+# always answered by the syntax server
+SYNTAX_ALWAYS_COMMANDS = frozenset({
+    'navtree',
+    'getOutliningSpans',
+    'jsxClosingTag',
+    'selectionRange',
+    'format',
+    'formatonkey',
+    'docCommentTemplate',
+    'linkedEditingRange'
+})
+
+# answered by a partialSemantic syntax server while the semantic server is
+# loading projects; a syntactic one rejects all of them
+SYNTAX_ALLOWED_COMMANDS = frozenset({
+    'completions',
+    'completionInfo',
+    'completionEntryDetails',
+    'definition',
+    'definitionAndBoundSpan',
+    'documentHighlights',
+    'implementation',
+    'navto',
+    'quickinfo',
+    'references',
+    'rename',
+    'signatureHelp'
+})
+
+# TSServerComm arguments bound to one process, never shared with the syntax server
+PER_PROCESS_ARGUMENTS = ('metrics', 'recorder', 'scheduler', 'on_stderr')
+
+SYNTAX_ALLOWED_COMMANDS_BY_MODE = {
+    'partialSemantic': SYNTAX_ALLOWED_COMMANDS,
+    'syntactic': frozenset()
+}
+
+# keep both servers' view of the files and settings identical; 'reload' is
+# rejected by the syntax server, which reopens the file instead
+SHARED_COMMANDS = frozenset({
+    'open',
+    'close',
+    'change',
+    'updateOpen',
+    'configure',
+    'compilerOptionsForInferredProjects'
+})
+
+
+class TSServerDualClient(TSServerClient):
+    """
+    TSServerClient backed by two tsserver processes, the way editors run them:
+    a full semantic server, and a syntax server started with
+    `--serverMode partialSemantic` (or `syntactic`) that has no project to load.
+
+    Syntax-only commands always go to the syntax server, commands it can also
+    answer go there while the semantic server is still loading projects,
+    everything else goes to the semantic server. File and configuration
+    requests are sent to both; if only the syntax server fails one, its
+    failed response is returned.
+    """
+
+    def __init__(
+            self,
+            ts_server_proc: asyncio.subprocess.Process,
+            syntax_server: Union[None, TSServerClient] = None,
+            server_mode: Literal['partialSemantic', 'syntactic'] = 'partialSemantic',
+            **kwargs
+    ):
+        super().__init__(ts_server_proc, **kwargs)
+        self._syntax_server: Union[None, TSServerClient] = syntax_server
+        self._server_mode: str = server_mode
+
+    @classmethod
+    async def start(
+            cls,
+            launch_options: Union[None, TSServerLaunchOptions] = None,
+            cancellable: bool = False,
+            server_mode: Literal['partialSemantic', 'syntactic'] = 'partialSemantic',
+            syntax_kwargs: Union[None, dict] = None,
+            **kwargs
+    ) -> 'TSServerDualClient':
+        """
+        :param server_mode: mode of the syntax server.
+        :param syntax_kwargs: arguments of the syntax server only, e.g. its own
+                              `metrics` or `recorder`. Those in PER_PROCESS_ARGUMENTS
+                              are only given to the semantic server otherwise.
+        Other arguments are used for both servers, see TSServerClient.start.
+        """
+        launch_options = launch_options or TSServerLaunchOptions()
+        syntax_options = launch_options.replace(
+            tsserver_args=[*launch_options.tsserver_args, '--serverMode', server_mode]
+        )
+        syntax_kwargs = {
+            **{k: v for k, v in kwargs.items() if k not in PER_PROCESS_ARGUMENTS},
+            **(syntax_kwargs or {})
+        }
+        syntax_server, self = await asyncio.gather(
+            TSServerClient.start(syntax_options, cancellable, **syntax_kwargs),
+            super().start(launch_options, cancellable, **kwargs)
+        )
+        self._syntax_server = syntax_server
+        self._server_mode = server_mode
+        return self
+
+    async def stop(self, timeout: float = 5.):
+        await asyncio.gather(self._syntax_server.stop(timeout), super().stop(timeout))
+
+    @property
+    def syntax_server(self) -> TSServerClient:
+        return self._syntax_server
+
+    def _route(self, cmd: str) -> Literal['syntax', 'semantic', 'both']:
+        if cmd in SHARED_COMMANDS:
+            return 'both'
+        if cmd in SYNTAX_ALWAYS_COMMANDS:
+            return 'syntax'
+        if cmd in SYNTAX_ALLOWED_COMMANDS_BY_MODE[self._server_mode] and self._loading_projects:
+            return 'syntax'
+        return 'semantic'
+
+    async def send_request(
+            self,
+            cmd: str,
+            expect_output: Union[None, Literal['event']],
+            arguments: Union[None, dict] = None,
+            events: Union[None, Iterable[str]] = None,
+            files: Union[None, Iterable[str]] = None
+    ) -> Tuple[TSServerRequest, Union[None, TSServerOutputHandler]]:
+        route = self._route(cmd)
+        if route == 'both':
+            await self._syntax_server.send_request(cmd, None, arguments)
+        elif route == 'syntax':
+            return await self._syntax_server.send_request(cmd, expect_output, arguments, events, files)
+        return await super().send_request(cmd, expect_output, arguments, events, files)
+
+    async def send_command(
+            self,
+            cmd: str,
+            arguments: Union[None, dict] = None,
+            timeout: Union[None, float] = None,
+            supersede_key: Union[None, Hashable] = None
+    ) -> TSServerResponse:
+        if cmd == 'reload':
+            resp = await super().send_command(cmd, arguments, timeout, supersede_key)
+            if resp.success:
+                await self._reopen_in_syntax_server(arguments)
+            return resp
+        route = self._route(cmd)
+        if route == 'both':
+            resp, syntax_resp = await asyncio.gather(
+                super().send_command(cmd, arguments, timeout, supersede_key),
+                self._syntax_server.send_command(cmd, arguments, timeout, supersede_key)
+            )
+            return resp if not resp.success or syntax_resp.success else syntax_resp
+        if route == 'syntax':
+            return await self._syntax_server.send_command(cmd, arguments, timeout, supersede_key)
+        return await super().send_command(cmd, arguments, timeout, supersede_key)
+
+    async def _reopen_in_syntax_server(self, arguments: dict):
+        # the syntax server gets the reloaded text by closing and reopening the file
+        path = arguments['file']
+        with open(arguments.get('tmpfile', None) or path, encoding='utf-8', newline='') as f:
+            text = f.read()
+        open_args = dict(self._session.open_files.get(path, None) or {'file': path})
+        open_args['fileContent'] = text
+        await self._syntax_server.send_request('close', None, {'file': path})
+        await self._syntax_server.send_request('open', None, open_args)
@@ -0,0 +1,248 @@
+"""
+Scripted stand-in for tsserver, speaking its stdio protocol: one JSON request
+per line in, `Content-Length` framed messages out.
+
+Every request is answered in order on a single thread, like tsserver does.
+Responses echo the request arguments, padded to `--body-size` bytes; geterr
+and geterrForProject emit syntaxDiag / semanticDiag / suggestionDiag per file
+followed by requestCompleted; completionInfo returns `--completions` entries
+and completions those starting with the prefix; the first open of a file emits
+projectLoadingStart / projectLoadingFinish. Cancellation files of
+`--cancellationPipeName` are honoured, and `--serverMode` rejects the
+commands tsserver rejects in that mode.
+
+    python -m tsserver_client.fake_server [--latency MS] [--body-size BYTES] ...
+
+Use `launch_options` to have TSServerClient start it in place of node.
+"""
+import os
+import sys
+import posixpath
+import json
+import time
+import random
+import argparse
+
+_WORDS = ('get', 'set', 'create', 'update', 'is', 'has', 'to', 'parse', 'render', 'handle')
+_NOUNS = ('Element', 'Value', 'Item', 'Node', 'Path', 'User', 'Config', 'Index', 'Range', 'Event')
+
+# commands tsserver does not answer
+NO_RESPONSE_COMMANDS = frozenset({'open', 'close', 'change', 'geterr', 'geterrForProject'})
+
+# commands rejected per --serverMode, as by tsserver's session
+_PARTIAL_SEMANTIC_INVALID = frozenset({
+    'reload', 'reloadProjects', 'geterrForProject', 'semanticDiagnosticsSync', 'suggestionDiagnosticsSync',
+    'getCodeFixes', 'getCombinedCodeFix', 'getApplicableRefactors', 'getEditsForRefactor',
+    'organizeImports', 'getEditsForFileRename', 'prepareCallHierarchy'
+})
+INVALID_COMMANDS = {
+    'semantic': frozenset(),
+    'partialSemantic': _PARTIAL_SEMANTIC_INVALID,
+    'syntactic': _PARTIAL_SEMANTIC_INVALID | {
+        'definition', 'definitionAndBoundSpan', 'typeDefinition', 'implementation', 'references', 'rename',
+        'quickinfo', 'completionInfo', 'completions', 'completionEntryDetails', 'signatureHelp', 'navto',
+        'documentHighlights'
+    }
+}
+
+
+def frame(message: dict) -> bytes:
+    """
+    `message` framed as tsserver writes it to stdout.
+    """
+    data = json.dumps(message).encode('utf-8')
+    return b'Content-Length: %d\r\n\r\n' % (len(data) + 1) + data + b'\n'
+
+
+def script_launch_options(script: str, args: list[str], **kwargs) -> 'TSServerLaunchOptions':
+    """
+    TSServerLaunchOptions running `script` with the Python running this, in place of node.
+    """
+    # imported here, the module also runs as a plain script
+    from .launch import TSServerLaunchOptions
+    return TSServerLaunchOptions(
+        node_path=sys.executable,
+        node_flags=[],
+        tsserver_path=os.path.abspath(script),
+        tsserver_args=args,
+        **kwargs
+    )
+
+
+def launch_options(*args: str, **kwargs) -> 'TSServerLaunchOptions':
+    """
+    TSServerLaunchOptions starting the fake server with the Python running this.
+    :param args: command line options of the fake server, e.g. '--latency', '2'.
+    :param kwargs: other TSServerLaunchOptions fields.
+    """
+    return script_launch_options(__file__, list(args), **kwargs)
+
+
+class FakeTSServer:
+    def __init__(self, opts: argparse.Namespace, out=None):
+        self.opts = opts
+        self.out = out or sys.stdout.buffer
+        self.opened: dict[str, None] = {}
+        self.loaded: bool = False
+        self.random = random.Random(opts.seed)
+        self.padding: str = 'x' * opts.body_size
+        self.diagnostics: list[dict] = [
+            {
+                'start': {'line': i + 1, 'offset': 1},
+                'end': {'line': i + 1, 'offset': 5},
+                'text': f'Fake diagnostic {i}.',
+                'code': 2304,
+                'category': 'error'
+            }
+            for i in range(opts.diagnostics)
+        ]
+        self.completions: list[dict] = [
+            {
+                'name': self.random.choice(_WORDS) + self.random.choice(_NOUNS) + (str(i) if i >= 100 else ''),
+                'kind': 'function',
+                'kindModifiers': '',
+                'sortText': '11'
+            }
+            for i in range(opts.completions)
+        ]
+        self.pipe: str = opts.cancellationPipeName[:-1] if opts.cancellationPipeName else None
+
+    def send(self, message: dict):
+        self.out.write(frame(message))
+
+    def event(self, name: str, body: dict):
+        self.send({'seq': 0, 'type': 'event', 'event': name, 'body': body})
+
+    def cancelled(self, seq: int) -> bool:
+        return self.pipe is not None and os.path.exists(self.pipe + str(seq))
+
+    def wait(self):
+        delay = self.opts.latency + self.random.uniform(0, self.opts.jitter)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def handle(self, request: dict) -> bool:
+        cmd = request.get('command')
+        seq = request.get('seq', 0)
+        args = request.get('arguments') or {}
+        if cmd == 'exit':
+            return False
+        for _ in range(self.opts.event_storm):
+            self.event('telemetry', {'telemetryEventName': 'fake', 'payload': {'seq': seq}})
+        if cmd == 'open':
+            self.open(args['file'])
+        elif cmd == 'updateOpen':
+            for f in args.get('openFiles') or []:
+                self.open(f['file'])
+            for path in args.get('closedFiles') or []:
+                self.opened.pop(path, None)
+        elif cmd == 'close':
+            self.opened.pop(args.get('file'), None)
+        elif cmd in ('geterr', 'geterrForProject'):
+            self.geterr(seq, cmd, args)
+        if cmd in NO_RESPONSE_COMMANDS:
+            return True
+        if cmd in INVALID_COMMANDS[self.opts.serverMode]:
+            self.send({
+                'seq': 0, 'type': 'response', 'command': cmd, 'request_seq': seq, 'success': False,
+                'message': f'Request: {cmd} not allowed in LanguageServiceMode.{self.opts.serverMode}'
+            })
+            return True
+        self.wait()
+        if self.cancelled(seq):
+            self.send({
+                'seq': 0, 'type': 'response', 'command': cmd, 'request_seq': seq,
+                'success': False, 'message': 'Request cancelled'
+            })
+            return True
+        if cmd == 'projectInfo':
+            body = {
+                'configFileName': '/fake/tsconfig.json',
+                'languageServiceDisabled': False
+            }
+            if args.get('needFileNameList'):
+                body['fileNames'] = list(self.opened)
+        elif cmd == 'completionInfo':
+            body = {
+                'isGlobalCompletion': True,
+                'isMemberCompletion': False,
+                'isNewIdentifierLocation': False,
+                'entries': self.completions
+            }
+        elif cmd == 'completions':
+            prefix = args.get('prefix') or ''
+            body = [e for e in self.completions if e['name'].startswith(prefix)]
+        elif cmd == 'completionEntryDetails':
+            body = [self.details(name) for name in args.get('entryNames') or []]
+        else:
+            body = {'echo': args, 'padding': self.padding}
+        self.send({
+            'seq': 0, 'type': 'response', 'command': cmd, 'request_seq': seq,
+            'success': True, 'body': body
+        })
+        return True
+
+    def details(self, entry) -> dict:
+        name = entry['name'] if isinstance(entry, dict) else entry
+        return {
+            'name': name,
+            'kind': 'function',
+            'kindModifiers': '',
+            'displayParts': [{'text': f'function {name}(): void', 'kind': 'text'}],
+            'documentation': [{'text': self.padding, 'kind': 'text'}],
+            'tags': []
+        }
+
+    def open(self, path: str):
+        self.opened[path] = None
+        if not self.loaded:
+            self.loaded = True
+            self.event('projectLoadingStart', {'projectName': '/fake/tsconfig.json', 'reason': 'open'})
+            if self.opts.project_load > 0:
+                time.sleep(self.opts.project_load / 1000)
+            self.event('projectLoadingFinish', {'projectName': '/fake/tsconfig.json'})
+
+    def geterr(self, seq: int, cmd: str, args: dict):
+        files = args.get('files') if cmd == 'geterr' else list(self.opened) or [args.get('file')]
+        for path in files:
+            if isinstance(path, dict):  # {'file', 'ranges'} or {'file', 'projectFileName'}
+                path = path['file']
+            # tsserver reports normalized file names
+            path = posixpath.normpath(path.replace('\\', '/'))
+            for kind in ('syntaxDiag', 'semanticDiag', 'suggestionDiag'):
+                if self.cancelled(seq):
+                    break
+                self.wait()
+                self.event(kind, {'file': path, 'diagnostics': self.diagnostics})
+            self.out.flush()
+        self.event('requestCompleted', {'request_seq': seq})
+
+    def serve(self, stream=None):
+        for line in (stream or sys.stdin.buffer):
+            line = line.strip()
+            if not line:
+                continue
+            if not self.handle(json.loads(line)):
+                break
+            self.out.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scripted stand-in for tsserver.')
+    parser.add_argument('--latency', type=float, default=0., help='ms before every response and diagnostic event')
+    parser.add_argument('--jitter', type=float, default=0., help='random extra ms, up to this')
+    parser.add_argument('--body-size', type=int, default=0, help='padding added to every response body, bytes')
+    parser.add_argument('--diagnostics', type=int, default=1, help='diagnostics per file and kind')
+    parser.add_argument('--completions', type=int, default=0, help='entries of completionInfo')
+    parser.add_argument('--event-storm', type=int, default=0, help='telemetry events sent before every response')
+    parser.add_argument('--project-load', type=float, default=0., help='ms the first open takes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cancellationPipeName', default=None)
+    parser.add_argument('--serverMode', choices=tuple(INVALID_COMMANDS), default='semantic')
+    # other tsserver options, e.g. from TSServerLaunchOptions, are ignored
+    opts, _ = parser.parse_known_args(argv)
+    FakeTSServer(opts).serve()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Union
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class TSServerFrameReader:
+    """
+    Splits tsserver's stdout into `Content-Length` framed message bodies.
+
+    Stdout is consumed in large chunks into a single buffer, frames are cut
+    out of it with memoryview slicing, and a body larger than what is buffered
+    is completed with one `readexactly` call, so a message never costs more
+    than one await and large bodies are never returned short.
+    """
+    _CONTENT_LENGTH_HEADER = b'Content-Length: '
+    _HEADER_END = b'\r\n\r\n'
+
+    def __init__(
+            self,
+            stream: asyncio.StreamReader,
+            chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        self._stream: asyncio.StreamReader = stream
+        self._chunk_size: int = chunk_size
+        self._buf: bytearray = bytearray()
+        self._pos: int = 0  # start of the unconsumed part of _buf
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        frame = await self.read_frame()
+        if frame is None:
+            raise StopAsyncIteration
+        return frame
+
+    async def read_frame(self) -> Union[None, bytes]:
+        """
+        :return: the next message body, None once the stream reached EOF.
+        """
+        while True:
+            frame, missing = self._next_frame()
+            if frame is not None:
+                return frame
+            if self._pos:
+                del self._buf[:self._pos]
+                self._pos = 0
+            try:
+                if missing > self._chunk_size:
+                    chunk = await self._stream.readexactly(missing)
+                else:
+                    chunk = await self._stream.read(self._chunk_size)
+            except asyncio.IncompleteReadError:
+                return None
+            if not chunk:
+                return None
+            self._buf += chunk
+
+    def _next_frame(self) -> tuple[Union[None, bytes], int]:
+        """
+        :return: (body, 0) if a whole frame is buffered,
+                 else (None, number of bytes known to be missing).
+        """
+        buf = self._buf
+        while True:
+            header_end = buf.find(self._HEADER_END, self._pos)
+            if header_end < 0:
+                return None, 0
+            body_start = header_end + len(self._HEADER_END)
+            length = self._content_length(header_end)
+            if length is None:  # not a frame header, skip it
+                self._pos = body_start
+                continue
+            body_end = body_start + length
+            if body_end > len(buf):
+                return None, body_end - len(buf)
+            with memoryview(buf) as view:
+                frame = bytes(view[body_start:body_end])
+            self._pos = body_end
+            return frame, 0
+
+    def _content_length(self, header_end: int) -> Union[None, int]:
+        idx = self._buf.find(self._CONTENT_LENGTH_HEADER, self._pos, header_end)
+        if idx < 0:
+            return None
+        line_end = self._buf.find(b'\r\n', idx, header_end)
+        if line_end < 0:
+            line_end = header_end
+        try:
+            return int(self._buf[idx + len(self._CONTENT_LENGTH_HEADER):line_end])
+        except ValueError:
+            return None
@@ -0,0 +1,53 @@
+import os
+import dataclasses
+from dataclasses import dataclass, field
+from .config import NODE_PATH, NODE_FLAGS, TSSERVER_PATH, TSSERVER_ARGS
+from typing import Union
+
+
+@dataclass
+class TSServerLaunchOptions:
+    """
+    How to start a tsserver process, defaults come from config.py.
+    The command line is `node_path *node_flags tsserver_path *tsserver_args`
+    followed by the options set through the named fields below.
+    """
+    node_path: str = NODE_PATH
+    node_flags: list[str] = field(default_factory=lambda: list(NODE_FLAGS))
+    tsserver_path: str = TSSERVER_PATH
+    tsserver_args: list[str] = field(default_factory=lambda: list(TSSERVER_ARGS))
+    env: Union[None, dict[str, str]] = None  # added to the current environment
+    cwd: Union[None, str] = None
+    # node
+    max_old_space_size: Union[None, int] = None  # MB
+    # tsserver
+    disable_automatic_typing_acquisition: bool = False
+    use_inferred_project_per_project_root: bool = False
+    locale: Union[None, str] = None
+    log_file: Union[None, str] = None
+    log_verbosity: Union[None, str] = None  # terse, normal, requestTime, verbose
+
+    def replace(self, **changes) -> 'TSServerLaunchOptions':
+        return dataclasses.replace(self, **changes)
+
+    def argv(self) -> list[str]:
+        node_args = list(self.node_flags)
+        if self.max_old_space_size is not None:
+            node_args.append(f'--max-old-space-size={self.max_old_space_size}')
+        tsserver_args = list(self.tsserver_args)
+        if self.disable_automatic_typing_acquisition:
+            tsserver_args.append('--disableAutomaticTypingAcquisition')
+        if self.use_inferred_project_per_project_root:
+            tsserver_args.append('--useInferredProjectPerProjectRoot')
+        if self.locale is not None:
+            tsserver_args += ['--locale', self.locale]
+        if self.log_file is not None:
+            tsserver_args += ['--logFile', self.log_file]
+        if self.log_verbosity is not None:
+            tsserver_args += ['--logVerbosity', self.log_verbosity]
+        return [self.node_path, *node_args, self.tsserver_path, *tsserver_args]
+
+    def environ(self) -> Union[None, dict[str, str]]:
+        if self.env is None:
+            return None
+        return {**os.environ, **self.env}
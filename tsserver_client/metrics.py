@@ -0,0 +1,180 @@
+import time
+import logging
+from bisect import bisect_left
+from typing import Callable, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the latency buckets in seconds: 50us, 100us, 200us ... ~105s
+LATENCY_BUCKETS = tuple(0.00005 * 2 ** i for i in range(22))
+
+LATENCY_KINDS = ('response', 'queue', 'parse')
+
+
+class TSServerLatencyHistogram:
+    """
+    Latency distribution with exponential buckets, see LATENCY_BUCKETS.
+    """
+
+    def __init__(self):
+        self.counts: list[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count: int = 0
+        self.total: float = 0.
+        self.min: Union[None, float] = None
+        self.max: Union[None, float] = None
+
+    def add(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> Union[None, float]:
+        """
+        Upper bound of the bucket holding the q-th percentile (0 < q <= 100),
+        capped by the largest value seen.
+        """
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99)
+        }
+
+
+class TSServerMetrics:
+    """
+    Instrumentation of a TSServerComm, pass it as its `metrics` argument.
+
+    Latencies are recorded per command (or event name for 'parse'):
+    'response' from writing a request to reading its response (or the
+    requestCompleted event of event-based requests), 'queue' waiting for a
+    scheduler slot, 'parse' decoding a message; with lazy decoding, bodies
+    decoded on first access are not included.
+
+    Observers are called as observer(metric, name, value) with metric one of
+    LATENCY_KINDS (value in seconds), 'bytes_out', 'bytes_in' (value in bytes),
+    'cancelled' or 'parse_failure'. Exceptions they raise are logged and ignored.
+    """
+
+    def __init__(self):
+        self.latencies: dict[Tuple[str, str], TSServerLatencyHistogram] = {}
+        self.requests: dict[str, int] = {}
+        self.cancelled: dict[str, int] = {}
+        self.frames: dict[str, int] = {}  # 'response' or event name -> frames read
+        self.bytes_out: int = 0
+        self.bytes_in: int = 0
+        self.parse_failures: int = 0
+        self.queued: Callable[[], int] = lambda: 0
+        self._sent: dict[int, Tuple[str, float]] = {}  # request_seq -> (command, time written)
+        self._observers: list[Callable[[str, str, float], None]] = []
+
+    def add_observer(self, observer: Callable[[str, str, float], None]):
+        self._observers.append(observer)
+
+    def remove_observer(self, observer: Callable[[str, str, float], None]):
+        self._observers.remove(observer)
+
+    def _notify(self, metric: str, name: str, value: float):
+        for observer in self._observers:
+            try:
+                observer(metric, name, value)
+            except Exception:
+                # instrumentation must never change the outcome of a request
+                logger.exception('Metrics observer failed on %s %s', metric, name)
+
+    def record_latency(self, kind: str, name: str, seconds: float):
+        hist = self.latencies.get((kind, name), None)
+        if hist is None:
+            hist = self.latencies[(kind, name)] = TSServerLatencyHistogram()
+        hist.add(seconds)
+        if self._observers:
+            self._notify(kind, name, seconds)
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Requests written whose response has not arrived yet.
+        """
+        return len(self._sent)
+
+    def request_sent(self, request_seq: int, command: str, n_bytes: int, awaits_reply: bool = True):
+        if awaits_reply:
+            self._sent[request_seq] = (command, time.perf_counter())
+        self.requests[command] = self.requests.get(command, 0) + 1
+        self.bytes_out += n_bytes
+        if self._observers:
+            self._notify('bytes_out', command, n_bytes)
+
+    def requests_sent(self, requests: list[Tuple[int, str]], n_bytes: int):
+        now = time.perf_counter()
+        for request_seq, command in requests:
+            self._sent[request_seq] = (command, now)
+            self.requests[command] = self.requests.get(command, 0) + 1
+        self.bytes_out += n_bytes
+        if self._observers:
+            self._notify('bytes_out', '', n_bytes)
+
+    def request_done(self, request_seq: int):
+        sent = self._sent.pop(request_seq, None)
+        if sent is not None:
+            self.record_latency('response', sent[0], time.perf_counter() - sent[1])
+
+    def request_cancelled(self, request_seq: int):
+        sent = self._sent.pop(request_seq, None)
+        if sent is not None:
+            self.cancelled[sent[0]] = self.cancelled.get(sent[0], 0) + 1
+            if self._observers:
+                self._notify('cancelled', sent[0], 0)
+
+    def frame_read(self, name: str, n_bytes: int):
+        self.frames[name] = self.frames.get(name, 0) + 1
+        self.bytes_in += n_bytes
+        if self._observers:
+            self._notify('bytes_in', name, n_bytes)
+
+    def parse_failed(self):
+        self.parse_failures += 1
+        if self._observers:
+            self._notify('parse_failure', '', 0)
+
+    def reset_pending(self):
+        # the process is gone, nothing in flight will be answered
+        self._sent.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Copy of all counters and gauges, with histograms summarized:
+        {'latency': {kind: {name: {'count', 'mean', 'min', 'max', 'p50', 'p90', 'p99'}}}, ...}
+        """
+        latency = {kind: {} for kind in LATENCY_KINDS}
+        for (kind, name), hist in sorted(self.latencies.items()):
+            latency.setdefault(kind, {})[name] = hist.snapshot()
+        return {
+            'latency': latency,
+            'requests': dict(self.requests),
+            'cancelled': dict(self.cancelled),
+            'frames': dict(self.frames),
+            'in_flight': self.in_flight,
+            'queued': self.queued(),
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'parse_failures': self.parse_failures
+        }
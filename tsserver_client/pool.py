@@ -0,0 +1,273 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from .client import TSServerClient
+from .diagnostics import TSServerDiagnosticTable
+from .launch import TSServerLaunchOptions
+from typing import (
+    Awaitable,
+    Callable,
+    Iterable,
+    Union,
+    AsyncIterator
+)
+
+PROJECT_CONFIG_FILES = ('tsconfig.json', 'jsconfig.json')
+
+
+def find_project_root(path: str) -> Union[None, str]:
+    """
+    Walk up from the directory of `path` and return the first directory
+    containing a tsconfig.json or jsconfig.json, None if there is none.
+    """
+    cur = os.path.dirname(os.path.abspath(path))
+    while True:
+        if any(os.path.isfile(os.path.join(cur, f)) for f in PROJECT_CONFIG_FILES):
+            return cur
+        parent = os.path.dirname(cur)
+        if parent == cur:
+            return None
+        cur = parent
+
+
+class TSServerPool:
+    """
+    A pool of tsserver processes exposing the `cmd_*` surface of TSServerClient.
+
+    Every file is routed to a worker by its project root (the nearest directory
+    holding a tsconfig.json / jsconfig.json), so each project is loaded by exactly
+    one tsserver. A project seen for the first time, or a file belonging to no
+    configured project, is assigned to the least loaded worker and sticks to it.
+    """
+
+    def __init__(
+            self,
+            clients: list[TSServerClient]
+    ):
+        if not clients:
+            raise ValueError('TSServerPool needs at least one client')
+        self._clients: list[TSServerClient] = clients
+        self._loads: list[int] = [0] * len(clients)  # in-flight requests per worker
+        self._assigned: list[int] = [0] * len(clients)  # routing keys per worker
+        self._workers: dict[str, int] = {}  # routing key -> worker index
+        self._roots: dict[str, Union[None, str]] = {}  # directory -> project root
+
+    @classmethod
+    async def start(
+            cls,
+            size: Union[None, int] = None,
+            client_factory: Union[None, Callable[[], Awaitable[TSServerClient]]] = None,
+            launch_options: Union[None, TSServerLaunchOptions] = None
+    ) -> 'TSServerPool':
+        """
+        :param size: number of tsserver processes, defaults to the number of CPUs.
+        :param client_factory: coroutine function returning a started client,
+                               defaults to TSServerClient.start.
+        :param launch_options: used by the default client factory.
+        """
+        size = size or os.cpu_count() or 1
+        factory = client_factory or (lambda: TSServerClient.start(launch_options))
+        clients = await asyncio.gather(*(factory() for _ in range(size)))
+        return cls(list(clients))
+
+    async def stop(self):
+        await asyncio.gather(*(client.stop() for client in self._clients))
+
+    @classmethod
+    @asynccontextmanager
+    async def create_on_files(
+            cls,
+            file_paths: list[str],
+            size: Union[None, int] = None,
+            client_factory: Union[None, Callable[[], Awaitable[TSServerClient]]] = None,
+            launch_options: Union[None, TSServerLaunchOptions] = None
+    ) -> AsyncIterator['TSServerPool']:
+        self = await cls.start(size, client_factory, launch_options)
+        await self.cmd_configure()
+        await self.open_files(file_paths)
+        yield self
+        await self.stop()
+
+    @property
+    def clients(self) -> list[TSServerClient]:
+        return list(self._clients)
+
+    def _routing_key(self, path: str) -> str:
+        directory = os.path.dirname(os.path.abspath(path))
+        if directory not in self._roots:
+            self._roots[directory] = find_project_root(path)
+        root = self._roots[directory]
+        # files outside of any configured project are grouped by directory,
+        # matching how tsserver builds inferred projects
+        return root if root is not None else directory
+
+    def worker_index(self, path: str) -> int:
+        key = self._routing_key(path)
+        idx = self._workers.get(key, None)
+        if idx is None:
+            idx = min(
+                range(len(self._clients)),
+                key=lambda i: (self._loads[i], self._assigned[i])
+            )
+            self._workers[key] = idx
+            self._assigned[idx] += 1
+        return idx
+
+    def client_for(self, path: str) -> TSServerClient:
+        return self._clients[self.worker_index(path)]
+
+    async def _call_worker(self, idx: int, method: str, *args, **kwargs):
+        self._loads[idx] += 1
+        try:
+            return await getattr(self._clients[idx], method)(*args, **kwargs)
+        finally:
+            self._loads[idx] -= 1
+
+    async def _call(self, path: str, method: str, *args, **kwargs):
+        return await self._call_worker(self.worker_index(path), method, path, *args, **kwargs)
+
+    async def _broadcast(self, method: str, *args, **kwargs) -> list:
+        return await asyncio.gather(*(
+            self._call_worker(idx, method, *args, **kwargs)
+            for idx in range(len(self._clients))
+        ))
+
+    async def cmd_configure(self, **kwargs) -> bool:
+        return all(await self._broadcast('cmd_configure', **kwargs))
+
+    async def cmd_compiler_options_for_inferrd_project(self, **kwargs) -> bool:
+        return all(await self._broadcast('cmd_compiler_options_for_inferrd_project', **kwargs))
+
+    async def cmd_open(self, path: str, **kwargs) -> None:
+        return await self._call(path, 'cmd_open', **kwargs)
+
+    async def cmd_close(self, path: str, **kwargs) -> None:
+        return await self._call(path, 'cmd_close', **kwargs)
+
+    def _shard(self, paths: Iterable[str]) -> dict[int, list[str]]:
+        shards: dict[int, list[str]] = {}
+        for path in paths:
+            shards.setdefault(self.worker_index(path), []).append(path)
+        return shards
+
+    async def open_files(
+            self,
+            paths: Iterable[str] = (),
+            contents: Union[None, dict[str, str]] = None,
+            **kwargs
+    ) -> bool:
+        """
+        One updateOpen per worker, for the files routed to it.
+        """
+        contents = contents or {}
+        shards = self._shard(list(paths) + list(contents))
+        results = await asyncio.gather(*(
+            self._call_worker(
+                idx, 'open_files',
+                [p for p in files if p not in contents],
+                {p: contents[p] for p in files if p in contents},
+                **kwargs
+            )
+            for idx, files in sorted(shards.items())
+        ))
+        return all(results)
+
+    async def close_files(self, paths: Iterable[str], **kwargs) -> bool:
+        shards = self._shard(paths)
+        results = await asyncio.gather(*(
+            self._call_worker(idx, 'close_files', files, **kwargs)
+            for idx, files in sorted(shards.items())
+        ))
+        return all(results)
+
+    async def cmd_reload(
+            self,
+            path: str,
+            alternate_path: Union[None, str] = None,
+            **kwargs
+    ) -> bool:
+        return await self._call(path, 'cmd_reload', alternate_path, **kwargs)
+
+    async def cmd_completions(
+            self,
+            path: str,
+            line: int,
+            offset: int,
+            prefix: str = '',
+            **kwargs
+    ) -> Union[None, dict]:
+        return await self._call(path, 'cmd_completions', line, offset, prefix, **kwargs)
+
+    async def cmd_completion_info(
+            self,
+            path: str,
+            line: int,
+            offset: int,
+            **kwargs
+    ) -> Union[None, dict]:
+        return await self._call(path, 'cmd_completion_info', line, offset, **kwargs)
+
+    async def cmd_completion_entry_details(
+            self,
+            path: str,
+            line: int,
+            offset: int,
+            entry_names: list[Union[str, dict]],
+            **kwargs
+    ) -> Union[None, list]:
+        return await self._call(path, 'cmd_completion_entry_details', line, offset, entry_names, **kwargs)
+
+    async def cmd_signature_help(
+            self,
+            path: str,
+            line: int,
+            offset: int,
+            prefix: str = '',
+            **kwargs
+    ) -> Union[None, dict]:
+        return await self._call(path, 'cmd_signature_help', line, offset, prefix, **kwargs)
+
+    async def cmd_organize_imports(self, path: str, **kwargs) -> Union[None, dict]:
+        return await self._call(path, 'cmd_organize_imports', **kwargs)
+
+    async def cmd_references(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return await self._call(path, 'cmd_references', line, offset, **kwargs)
+
+    async def cmd_goto_definition(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return await self._call(path, 'cmd_goto_definition', line, offset, **kwargs)
+
+    async def cmd_goto_type_definition(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return await self._call(path, 'cmd_goto_type_definition', line, offset, **kwargs)
+
+    async def cmd_quick_info(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return await self._call(path, 'cmd_quick_info', line, offset, **kwargs)
+
+    async def cmd_get_errors(
+            self,
+            path_list: list[str],
+            delay: int = 0,  # ms
+            **kwargs
+    ) -> Union[None, TSServerDiagnosticTable]:
+        """
+        Geterr across the pool: the file list is split by worker, every
+        worker checks its own files concurrently and the results are merged
+        in worker order.
+        """
+        shards = self._shard(path_list)
+        results = await asyncio.gather(*(
+            self._call_worker(idx, 'cmd_get_errors', paths, delay, **kwargs)
+            for idx, paths in sorted(shards.items())
+        ))
+        ret = TSServerDiagnosticTable()
+        for result in results:
+            if result:
+                ret.extend(result)
+        return ret if ret else None
+
+    async def cmd_get_errors_for_project(
+            self,
+            path: str,
+            delay: int = 0,  # ms
+            **kwargs
+    ) -> Union[None, TSServerDiagnosticTable]:
+        return await self._call(path, 'cmd_get_errors_for_project', delay, **kwargs)
@@ -0,0 +1,281 @@
+import re
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from .diagnostics import TSServerDiagnosticTable
+from typing import Callable, Iterable, Literal, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# key added to annotated positions, per unit
+ANNOTATION_KEYS = {'char': 'index', 'byte': 'byte'}
+
+_UTF8_BOM = '\ufeff'
+
+# line terminators recognized by tsserver (ts.computeLineStarts)
+_LINE_BREAK_RE = re.compile('\r\n|[\r\n\u2028\u2029]')
+
+
+def line_starts(text: str) -> list[int]:
+    """
+    :return: character index of the start of every line.
+    """
+    return [0] + [m.end() for m in _LINE_BREAK_RE.finditer(text)]
+
+
+def _utf16_len(s: str) -> int:
+    if s.isascii():
+        return len(s)
+    return len(s.encode('utf-16-le')) // 2
+
+
+def _utf8_len(ch: str) -> int:
+    o = ord(ch)
+    return 1 if o < 0x80 else 2 if o < 0x800 else 3 if o < 0x10000 else 4
+
+
+class TSServerPositionIndex:
+    """
+    Line starts of one file's text, converting tsserver's 1-based
+    (line, offset), offsets in UTF-16 code units, to and from character
+    indices ('char') or UTF-8 byte offsets ('byte').
+
+    Lines holding only ASCII convert with arithmetic; the column tables of
+    other lines are built on first use.
+    :param byte_base: added to byte offsets, e.g. 3 for a file starting with
+                      a UTF-8 BOM that is not part of `text`.
+    """
+
+    def __init__(self, text: str, byte_base: int = 0):
+        self.text: str = text
+        self.byte_base: int = byte_base
+        self.line_starts: list[int] = line_starts(text)
+        self._ascii: bool = text.isascii()
+        self._byte_starts: Union[None, list[int]] = None
+        # line (0-based) -> None if ASCII, else (UTF-16 units, UTF-8 bytes) before every character
+        self._columns: dict[int, Union[None, Tuple[array, array]]] = {}
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_starts)
+
+    def _line_end(self, line: int) -> int:
+        return self.line_starts[line + 1] if line + 1 < len(self.line_starts) else len(self.text)
+
+    @property
+    def byte_starts(self) -> list[int]:
+        """
+        UTF-8 byte offset of the start of every line, without `byte_base`.
+        """
+        if self._byte_starts is None:
+            if self._ascii:
+                self._byte_starts = self.line_starts
+            else:
+                starts, total = [], 0
+                for line, start in enumerate(self.line_starts):
+                    starts.append(total)
+                    segment = self.text[start:self._line_end(line)]
+                    total += len(segment) if segment.isascii() else sum(map(_utf8_len, segment))
+                self._byte_starts = starts
+        return self._byte_starts
+
+    def _line_columns(self, line: int) -> Union[None, Tuple[array, array]]:
+        if self._ascii:
+            return None
+        try:
+            return self._columns[line]
+        except KeyError:
+            pass
+        segment = self.text[self.line_starts[line]:self._line_end(line)]
+        columns = None
+        if not segment.isascii():
+            columns = (
+                array('i', accumulate((2 if ord(ch) > 0xFFFF else 1 for ch in segment), initial=0)),
+                array('i', accumulate(map(_utf8_len, segment), initial=0))
+            )
+        self._columns[line] = columns
+        return columns
+
+    def index_of(self, line: int, offset: int, unit: Literal['char', 'byte'] = 'char') -> int:
+        """
+        Convert tsserver's 1-based (line, offset) into a character index or
+        byte offset, offsets past the end of a line are clamped to it.
+        """
+        if not 1 <= line <= len(self.line_starts):
+            raise ValueError(f'Line {line} out of range')
+        line -= 1
+        start = self.line_starts[line]
+        length = self._line_end(line) - start
+        columns = self._line_columns(line)
+        if columns is None:
+            col = max(0, min(offset - 1, length))
+        else:
+            col = min(bisect_left(columns[0], offset - 1), length)
+        if unit == 'char':
+            return start + col
+        return self.byte_base + self.byte_starts[line] + (col if columns is None else columns[1][col])
+
+    def position_of(self, index: int, unit: Literal['char', 'byte'] = 'char') -> Tuple[int, int]:
+        """
+        Convert a character index or byte offset into tsserver's 1-based
+        (line, offset). A byte offset inside a character maps to that character.
+        """
+        if unit == 'char':
+            index = max(0, min(index, len(self.text)))
+            line = bisect_right(self.line_starts, index) - 1
+            col = index - self.line_starts[line]
+            columns = self._line_columns(line)
+        else:
+            index = max(0, index - self.byte_base)
+            line = bisect_right(self.byte_starts, index) - 1
+            columns = self._line_columns(line)
+            col = index - self.byte_starts[line]
+            if columns is not None:
+                col = bisect_right(columns[1], col) - 1
+        col = min(col, self._line_end(line) - self.line_starts[line])
+        return line + 1, (col if columns is None else columns[0][col]) + 1
+
+    def indices_of(
+            self,
+            positions: Iterable[Tuple[int, int]],
+            unit: Literal['char', 'byte'] = 'char'
+    ) -> list[int]:
+        return [self.index_of(line, offset, unit) for line, offset in positions]
+
+    def positions_of(
+            self,
+            indices: Iterable[int],
+            unit: Literal['char', 'byte'] = 'char'
+    ) -> list[Tuple[int, int]]:
+        return [self.position_of(index, unit) for index in indices]
+
+
+def read_text(path: str) -> Tuple[str, int]:
+    """
+    Read a file the way tsserver does: UTF-8, line breaks kept, BOM dropped.
+    :return: (text, byte_base)
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        text = f.read()
+    if text.startswith(_UTF8_BOM):
+        return text[1:], 3
+    return text, 0
+
+
+class TSServerPositions:
+    """
+    Position indexes of many files, built on first use and kept until the
+    file is invalidated; the least recently used are dropped past `max_files`.
+    :param get_text: path -> (text, byte_base), defaults to reading the file;
+                     TSServerClient.positions prefers the text of open documents.
+    """
+
+    def __init__(
+            self,
+            get_text: Union[None, Callable[[str], Tuple[str, int]]] = None,
+            max_files: int = 256
+    ):
+        if max_files <= 0:
+            raise ValueError('max_files must be positive')
+        self.max_files: int = max_files
+        self._get_text: Callable[[str], Tuple[str, int]] = get_text or read_text
+        self._indexes: OrderedDict[str, TSServerPositionIndex] = OrderedDict()
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def get(self, path: str) -> TSServerPositionIndex:
+        index = self._indexes.get(path, None)
+        if index is None:
+            index = self._indexes[path] = TSServerPositionIndex(*self._get_text(path))
+            while len(self._indexes) > self.max_files:
+                self._indexes.popitem(last=False)
+        else:
+            self._indexes.move_to_end(path)
+        return index
+
+    def invalidate(self, path: str):
+        self._indexes.pop(path, None)
+
+    def clear(self):
+        self._indexes.clear()
+
+    def index_of(self, path: str, line: int, offset: int, unit: Literal['char', 'byte'] = 'char') -> int:
+        return self.get(path).index_of(line, offset, unit)
+
+    def position_of(self, path: str, index: int, unit: Literal['char', 'byte'] = 'char') -> Tuple[int, int]:
+        return self.get(path).position_of(index, unit)
+
+    def annotate(
+            self,
+            result,
+            path: Union[None, str] = None,
+            unit: Literal['char', 'byte'] = 'char'
+    ):
+        """
+        Add the character index ('index') or byte offset ('byte') to every
+        {'line', 'offset'} position of a tsserver result, in place. A position
+        belongs to the file named by the closest enclosing 'file' or
+        'fileName', or to `path`. Positions of files that cannot be read are
+        left as they are and the files are logged.
+        :return: `result`
+        """
+        key = ANNOTATION_KEYS[unit]
+        failed: set[str] = set()
+        stack = [(result, path)]
+        while stack:
+            node, file = stack.pop()
+            if isinstance(node, list):
+                stack.extend((item, file) for item in node)
+                continue
+            if not isinstance(node, dict):
+                continue
+            file = node.get('file', None) or node.get('fileName', None) or file
+            if type(node.get('line', None)) is int and type(node.get('offset', None)) is int:
+                if file is None or file in failed:
+                    continue
+                try:
+                    node[key] = self.get(file).index_of(node['line'], node['offset'], unit)
+                except (OSError, UnicodeDecodeError, ValueError) as e:
+                    logger.warning('Cannot index positions of %s: %s', file, e)
+                    failed.add(file)
+                continue
+            stack.extend((value, file) for value in node.values() if isinstance(value, (dict, list)))
+        return result
+
+    def diagnostic_indices(
+            self,
+            table: TSServerDiagnosticTable,
+            unit: Literal['char', 'byte'] = 'char'
+    ) -> Tuple[array, array]:
+        """
+        Start and end character indices (or byte offsets) of every row of a
+        diagnostic table, -1 for rows without a position or whose file
+        cannot be read.
+        """
+        starts, ends = array('q'), array('q')
+        indexes: dict[int, Union[None, TSServerPositionIndex]] = {}
+        for row in range(len(table)):
+            file_id = table.file_index[row]
+            if file_id not in indexes:
+                try:
+                    indexes[file_id] = self.get(table.files[file_id])
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.warning('Cannot index positions of %s: %s', table.files[file_id], e)
+                    indexes[file_id] = None
+            index = indexes[file_id]
+            if index is None or table.category[row] < 0:
+                starts.append(-1)
+                ends.append(-1)
+                continue
+            try:
+                start = index.index_of(table.start_line[row], table.start_offset[row], unit)
+                end = index.index_of(table.end_line[row], table.end_offset[row], unit)
+            except ValueError:
+                # the file changed since the diagnostics were computed
+                start = end = -1
+            starts.append(start)
+            ends.append(end)
+        return starts, ends
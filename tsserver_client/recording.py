@@ -0,0 +1,256 @@
+"""
+Recording of the traffic between a client and tsserver, and a mock tsserver
+answering from a recording.
+
+A recording is an append-only binary file: the magic `TSREC1\\n`, then
+records of a 13-byte header (kind: uint8, time: float64 seconds since the
+session started, length: uint32, little endian) followed by `length` bytes.
+Every session opened on the file starts with a SESSION record holding
+JSON metadata; REQUEST records hold what was written to tsserver's stdin
+(one or more request lines), FRAME records the body of one message read
+from its stdout.
+
+    python tsserver_client/recording.py RECORDING [--speed X] [--session N]
+
+serves a recording on stdio; use `launch_options` to have TSServerClient
+start it in place of node.
+"""
+import os
+import sys
+import json
+import time
+import struct
+import argparse
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterator, Tuple, Union
+if __package__:
+    from .fake_server import NO_RESPONSE_COMMANDS, frame, script_launch_options
+else:  # run as a plain script, see launch_options
+    from fake_server import NO_RESPONSE_COMMANDS, frame, script_launch_options
+
+MAGIC = b'TSREC1\n'
+RECORD_HEADER = struct.Struct('<BdI')
+
+SESSION = 0
+REQUEST = 1
+FRAME = 2
+
+
+@dataclass
+class TSServerRecord:
+    kind: int
+    time: float
+    data: bytes
+
+
+class TSServerRecorder:
+    """
+    Appends the traffic of one session to a recording,
+    pass it as the `recorder` argument of TSServerComm.
+    """
+
+    def __init__(self, path: str, buffering: int = 1 << 16):
+        self.path: str = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'ab', buffering=buffering)
+        if new:
+            self._file.write(MAGIC)
+        self._start: float = time.perf_counter()
+        self._write(SESSION, json.dumps({'started': time.time(), 'pid': os.getpid()}).encode('utf-8'))
+
+    def __enter__(self) -> 'TSServerRecorder':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _write(self, kind: int, data: Union[bytes, memoryview]):
+        self._file.write(RECORD_HEADER.pack(kind, time.perf_counter() - self._start, len(data)))
+        self._file.write(data)
+
+    def record_request(self, data: bytes):
+        self._write(REQUEST, data)
+
+    def record_frame(self, data: Union[bytes, memoryview]):
+        self._write(FRAME, data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_recording(path: str) -> Iterator[TSServerRecord]:
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'Not a tsserver recording: "{path}"')
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return  # end of file, or a record cut short by a crash
+            kind, t, length = RECORD_HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield TSServerRecord(kind, t, data)
+
+
+def read_sessions(path: str) -> list[list[TSServerRecord]]:
+    """
+    Records of every session, each list starting with its SESSION record.
+    """
+    sessions = []
+    for record in read_recording(path):
+        if record.kind == SESSION or not sessions:
+            sessions.append([])
+        sessions[-1].append(record)
+    return sessions
+
+
+def split_requests(record: TSServerRecord) -> list[dict]:
+    return [json.loads(line) for line in record.data.splitlines() if line.strip()]
+
+
+@dataclass
+class TSServerExchange:
+    """
+    A recorded request and the messages read after it until the next request,
+    `frames` are (seconds after the request, message).
+    """
+    request: dict
+    time: float
+    frames: list[Tuple[float, dict]] = field(default_factory=list)
+
+
+def exchanges(records: list[TSServerRecord]) -> list[TSServerExchange]:
+    """
+    Pair the requests of a session with the messages that followed them.
+    Responses and requestCompleted events go to their own request, other
+    events to the latest request sent before them.
+    """
+    ret: list[TSServerExchange] = []
+    by_seq: dict[int, TSServerExchange] = {}
+    for record in records:
+        if record.kind == REQUEST:
+            for request in split_requests(record):
+                exchange = TSServerExchange(request, record.time)
+                ret.append(exchange)
+                by_seq[request.get('seq')] = exchange
+        elif record.kind == FRAME:
+            message = json.loads(record.data)
+            request_seq = message.get('request_seq', None)
+            if message.get('event') == 'requestCompleted':
+                request_seq = (message.get('body') or {}).get('request_seq', None)
+            exchange = by_seq.get(request_seq, None) or (ret[-1] if ret else None)
+            if exchange is not None:
+                exchange.frames.append((max(0., record.time - exchange.time), message))
+    return ret
+
+
+def _request_key(request: dict) -> str:
+    return json.dumps([request.get('command'), request.get('arguments')], sort_keys=True)
+
+
+class MockTSServer:
+    """
+    Answers requests from a recording: an incoming request gets the messages
+    recorded after the first unused recorded request with the same command and
+    arguments (or, failing that, the same command), its seq patched in.
+    :param speed: 1 replays the recorded delays, 2 twice as fast,
+                  None sends everything at once.
+    """
+
+    def __init__(
+            self,
+            records: list[TSServerRecord],
+            speed: Union[None, float] = 1.,
+            out=None
+    ):
+        self.speed: Union[None, float] = speed
+        self.out = out or sys.stdout.buffer
+        self._by_key: dict[str, deque[TSServerExchange]] = {}
+        self._by_command: dict[str, deque[TSServerExchange]] = {}
+        for exchange in exchanges(records):
+            self._by_key.setdefault(_request_key(exchange.request), deque()).append(exchange)
+            self._by_command.setdefault(exchange.request.get('command'), deque()).append(exchange)
+        self._used: set[int] = set()
+
+    def _take(self, queue: Union[None, deque]) -> Union[None, TSServerExchange]:
+        while queue:
+            exchange = queue.popleft()
+            if id(exchange) not in self._used:
+                self._used.add(id(exchange))
+                return exchange
+        return None
+
+    def send(self, message: dict):
+        self.out.write(frame(message))
+        self.out.flush()
+
+    def handle(self, request: dict) -> bool:
+        cmd = request.get('command')
+        if cmd == 'exit':
+            return False
+        exchange = (
+                self._take(self._by_key.get(_request_key(request), None))
+                or self._take(self._by_command.get(cmd, None))
+        )
+        if exchange is None:
+            if cmd not in NO_RESPONSE_COMMANDS:
+                self.send({
+                    'seq': 0, 'type': 'response', 'command': cmd, 'request_seq': request.get('seq'),
+                    'success': False, 'message': 'Not in the recording'
+                })
+            return True
+        recorded_seq = exchange.request.get('seq')
+        sent = 0.
+        for delay, message in exchange.frames:
+            if self.speed:
+                time.sleep(max(0., delay / self.speed - sent))
+                sent = delay / self.speed
+            if message.get('type') == 'response' and message.get('request_seq') == recorded_seq:
+                message = message | {'request_seq': request.get('seq')}
+            elif message.get('event') == 'requestCompleted':
+                message = message | {'body': {'request_seq': request.get('seq')}}
+            self.send(message)
+        return True
+
+    def serve(self, stream=None):
+        for line in (stream or sys.stdin.buffer):
+            line = line.strip()
+            if line and not self.handle(json.loads(line)):
+                break
+
+
+def launch_options(
+        recording: str,
+        speed: Union[None, float] = 1.,
+        session: int = 0,
+        **kwargs
+) -> 'TSServerLaunchOptions':
+    """
+    TSServerLaunchOptions starting a MockTSServer on `recording`.
+    :param kwargs: other TSServerLaunchOptions fields.
+    """
+    args = [os.path.abspath(recording), '--session', str(session)]
+    args += ['--speed', str(speed)] if speed else ['--max-speed']
+    return script_launch_options(__file__, args, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a tsserver recording on stdio.')
+    parser.add_argument('recording')
+    parser.add_argument('--session', type=int, default=0)
+    parser.add_argument('--speed', type=float, default=1.)
+    parser.add_argument('--max-speed', action='store_true')
+    # other tsserver options, e.g. from TSServerLaunchOptions, are ignored
+    opts, _ = parser.parse_known_args(argv)
+    records = read_sessions(opts.recording)[opts.session]
+    MockTSServer(records, None if opts.max_speed else opts.speed).serve()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Replay the requests of a recording (see recording.py) to a tsserver and
+compare its latencies with the recorded ones.
+
+    python -m tsserver_client.replay RECORDING [--session N] [--speed X | --max-speed] [--mock] [--json OUT]
+
+Without --mock the tsserver configured in config.py (or by the TSSERVER_*
+environment variables) is started; the files of the recording must exist.
+"""
+import json
+import time
+import asyncio
+import argparse
+from .client import TSServerClient
+from .launch import TSServerLaunchOptions
+from .metrics import TSServerMetrics, TSServerLatencyHistogram
+from .recording import TSServerExchange, exchanges, read_sessions, launch_options as mock_launch_options
+from typing import Union
+
+
+def _completion_delay(exchange: TSServerExchange) -> Union[None, float]:
+    seq = exchange.request.get('seq')
+    for delay, message in exchange.frames:
+        if message.get('type') == 'response' and message.get('request_seq') == seq:
+            return delay
+        if message.get('event') == 'requestCompleted' and (message.get('body') or {}).get('request_seq') == seq:
+            return delay
+    return None
+
+
+def _expects(exchange: TSServerExchange) -> Union[None, str]:
+    seq = exchange.request.get('seq')
+    for _, message in exchange.frames:
+        if message.get('type') == 'response' and message.get('request_seq') == seq:
+            return 'response'
+        if message.get('event') == 'requestCompleted' and (message.get('body') or {}).get('request_seq') == seq:
+            return 'event'
+    return None
+
+
+async def _send(client: TSServerClient, exchange: TSServerExchange, timeout: Union[None, float]):
+    cmd = exchange.request.get('command')
+    args = exchange.request.get('arguments', None)
+    expects = _expects(exchange)
+    if expects == 'response':
+        return await client.send_command(cmd, args, timeout)
+    if expects is None:
+        await client.send_request(cmd, None, args)
+        return None
+    req, handler = await client.send_request(cmd, 'event', args, events=('requestCompleted',))
+    try:
+        while not (await asyncio.wait_for(handler.wait_output(), timeout)).is_request_completed(req.seq):
+            pass
+    finally:
+        client.finish_request(handler)
+
+
+async def replay(
+        path: str,
+        session: int = 0,
+        launch_options: Union[None, TSServerLaunchOptions] = None,
+        speed: Union[None, float] = 1.,
+        timeout: Union[None, float] = 60.,
+        **kwargs
+) -> dict:
+    """
+    Send the requests of a recorded session to a new tsserver, in order.
+    :param speed: 1 keeps the recorded pace, 2 twice as fast, None sends every
+                  request right away (they are still written in order).
+    :param timeout: per request, seconds.
+    :param kwargs: passed on to TSServerClient.start.
+    :return: {'commands': {command: {'recorded': latency summary, 'replayed': latency summary}},
+              'recorded_elapsed', 'replayed_elapsed', 'requests', 'failures'}
+    """
+    records = read_sessions(path)[session]
+    todo = [e for e in exchanges(records) if e.request.get('command') != 'exit']
+    recorded: dict[str, TSServerLatencyHistogram] = {}
+    for exchange in todo:
+        delay = _completion_delay(exchange)
+        if delay is not None:
+            recorded.setdefault(exchange.request.get('command'), TSServerLatencyHistogram()).add(delay)
+
+    metrics = TSServerMetrics()
+    client = await TSServerClient.start(launch_options, metrics=metrics, **kwargs)
+    tasks = []
+    start = time.perf_counter()
+    try:
+        first = todo[0].time if todo else 0.
+        for exchange in todo:
+            if speed:
+                await asyncio.sleep(max(0., (exchange.time - first) / speed - (time.perf_counter() - start)))
+            tasks.append(asyncio.create_task(_send(client, exchange, timeout)))
+            await asyncio.sleep(0)  # let it write before the next one
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        elapsed = time.perf_counter() - start
+        await client.stop()
+
+    commands = {}
+    for cmd in sorted(set(recorded) | {name for kind, name in metrics.latencies if kind == 'response'}):
+        replayed = metrics.latencies.get(('response', cmd), None)
+        commands[cmd] = {
+            'recorded': recorded[cmd].snapshot() if cmd in recorded else None,
+            'replayed': replayed.snapshot() if replayed is not None else None
+        }
+    return {
+        'commands': commands,
+        'recorded_elapsed': (todo[-1].time - todo[0].time) if todo else 0.,
+        'replayed_elapsed': elapsed,
+        'requests': len(todo),
+        'failures': sum(isinstance(r, BaseException) for r in results)
+    }
+
+
+def _ms(summary: Union[None, dict], key: str) -> str:
+    if summary is None or summary[key] is None:
+        return '-'
+    return f'{summary[key] * 1000:.2f}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a tsserver recording.')
+    parser.add_argument('recording')
+    parser.add_argument('--session', type=int, default=0)
+    parser.add_argument('--speed', type=float, default=1.)
+    parser.add_argument('--max-speed', action='store_true')
+    parser.add_argument('--mock', action='store_true', help='replay to a mock tsserver serving the recording')
+    parser.add_argument('--json', default=None, help='write the report to this file')
+    opts = parser.parse_args(argv)
+    speed = None if opts.max_speed else opts.speed
+    options = mock_launch_options(opts.recording, speed, opts.session) if opts.mock else None
+    report = asyncio.run(replay(opts.recording, opts.session, options, speed))
+    print(f'{report["requests"]} requests, {report["failures"]} failed, '
+          f'{report["recorded_elapsed"]:.3f} s recorded, {report["replayed_elapsed"]:.3f} s replayed')
+    print(f'{"command":<36} {"count":>6} {"rec p50":>9} {"p50 ms":>9} {"rec p99":>9} {"p99 ms":>9}')
+    for cmd, summary in report['commands'].items():
+        rec, rep = summary['recorded'], summary['replayed']
+        count = (rep or rec)['count']
+        print(f'{cmd:<36} {count:>6} {_ms(rec, "p50"):>9} {_ms(rep, "p50"):>9} {_ms(rec, "p99"):>9} {_ms(rep, "p99"):>9}')
+    if opts.json:
+        with open(opts.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
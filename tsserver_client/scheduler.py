@@ -0,0 +1,175 @@
+import asyncio
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Hashable, Literal, Union
+
+Priority = Literal['interactive', 'normal', 'bulk']
+PRIORITIES: tuple[Priority, ...] = ('interactive', 'normal', 'bulk')
+
+COMMAND_PRIORITIES: dict[str, Union[None, Priority]] = {
+    'completions': 'interactive',
+    'completionInfo': 'interactive',
+    'completionEntryDetails': 'interactive',
+    'quickinfo': 'interactive',
+    'signatureHelp': 'interactive',
+    'geterr': 'bulk',
+    'geterrForProject': 'bulk',
+    # requests changing tsserver's state are never reordered
+    'open': None,
+    'close': None,
+    'change': None,
+    'updateOpen': None,
+    'reload': None,
+    'configure': None,
+    'compilerOptionsForInferredProjects': None,
+    'exit': None
+}
+
+DEFAULT_LIMITS: dict[Priority, int] = {
+    'interactive': 8,
+    'normal': 4,
+    'bulk': 1
+}
+
+_current_caller: contextvars.ContextVar[Hashable] = contextvars.ContextVar('tsserver_caller', default=None)
+_current_priority: contextvars.ContextVar[Union[None, Priority]] = contextvars.ContextVar(
+    'tsserver_priority', default=None
+)
+
+
+@contextmanager
+def request_context(
+        caller: Hashable = None,
+        priority: Union[None, Priority] = None
+):
+    """
+    Tag the requests issued inside the block, e.g.
+
+        with request_context(caller='indexer', priority='bulk'):
+            await client.cmd_references(...)
+
+    :param caller: requests of different callers are queued fairly (round robin).
+    :param priority: overrides COMMAND_PRIORITIES for these requests.
+    """
+    caller_token = _current_caller.set(caller)
+    priority_token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(priority_token)
+        _current_caller.reset(caller_token)
+
+
+def priority_of(cmd: str) -> Union[None, Priority]:
+    """
+    :return: the priority class of a command, None if it must not be scheduled.
+    """
+    if cmd in COMMAND_PRIORITIES and COMMAND_PRIORITIES[cmd] is None:
+        return None
+    return _current_priority.get() or COMMAND_PRIORITIES.get(cmd, 'normal')
+
+
+class TSServerScheduler:
+    """
+    Decides when requests are written to tsserver.
+
+    Each priority class has its own limit of requests in flight. Within a class,
+    waiting requests are served round robin across callers (see `request_context`),
+    and bulk requests are held back while interactive ones are waiting or running.
+    """
+
+    def __init__(
+            self,
+            limits: Union[None, dict[Priority, int]] = None,
+            hold_bulk: bool = True
+    ):
+        self._limits: dict[Priority, int] = dict(DEFAULT_LIMITS)
+        self._limits.update(limits or {})
+        self._hold_bulk: bool = hold_bulk
+        self._in_flight: dict[Priority, int] = {p: 0 for p in PRIORITIES}
+        # priority -> caller -> waiting futures
+        self._waiting: dict[Priority, OrderedDict[Hashable, deque[asyncio.Future]]] = {
+            p: OrderedDict() for p in PRIORITIES
+        }
+        self._queued: dict[Priority, int] = {p: 0 for p in PRIORITIES}
+        self._interactive_idle: asyncio.Event = asyncio.Event()
+        self._interactive_idle.set()
+
+    def in_flight(self, priority: Priority) -> int:
+        return self._in_flight[priority]
+
+    def queued(self, priority: Priority) -> int:
+        return self._queued[priority]
+
+    def _can_run(self, priority: Priority) -> bool:
+        if self._in_flight[priority] >= self._limits[priority]:
+            return False
+        if priority == 'bulk' and self._hold_bulk:
+            return not (self._in_flight['interactive'] or self._queued['interactive'])
+        return True
+
+    def _update_interactive_idle(self):
+        if self._in_flight['interactive'] or self._queued['interactive']:
+            self._interactive_idle.clear()
+        else:
+            self._interactive_idle.set()
+
+    async def acquire(self, priority: Priority):
+        """
+        Wait for a slot of `priority`, must be paired with `release`.
+        """
+        if not self._queued[priority] and self._can_run(priority):
+            self._in_flight[priority] += 1
+            self._update_interactive_idle()
+            return
+        future = asyncio.get_running_loop().create_future()
+        caller = _current_caller.get()
+        self._waiting[priority].setdefault(caller, deque()).append(future)
+        self._queued[priority] += 1
+        self._update_interactive_idle()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():  # granted, then cancelled
+                self.release(priority)
+            else:
+                self._drop_waiter(priority, caller, future)
+            raise
+
+    def release(self, priority: Priority):
+        self._in_flight[priority] -= 1
+        self._dispatch()
+
+    def _drop_waiter(self, priority: Priority, caller: Hashable, future: asyncio.Future):
+        queue = self._waiting[priority].get(caller, None)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self._queued[priority] -= 1
+            if not queue:
+                del self._waiting[priority][caller]
+        self._dispatch()
+
+    def _dispatch(self):
+        for priority in PRIORITIES:
+            waiting = self._waiting[priority]
+            while waiting and self._can_run(priority):
+                caller, queue = next(iter(waiting.items()))
+                future = queue.popleft()
+                self._queued[priority] -= 1
+                if queue:
+                    waiting.move_to_end(caller)
+                else:
+                    del waiting[caller]
+                if future.done():
+                    continue
+                future.set_result(None)
+                self._in_flight[priority] += 1
+        self._update_interactive_idle()
+
+    async def wait_interactive_idle(self):
+        """
+        Wait until no interactive request is waiting or running.
+        """
+        if self._hold_bulk:
+            await self._interactive_idle.wait()
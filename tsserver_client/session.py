@@ -0,0 +1,43 @@
+import copy
+from dataclasses import dataclass, field
+from .documents import TSDocument
+from typing import Union
+
+
+@dataclass
+class TSServerSession:
+    """
+    What a client told tsserver that a fresh tsserver must be told again:
+    the last configure and compilerOptionsForInferredProjects arguments,
+    the open files and the documents managed by the client.
+    :param open_files: path -> arguments of the open request.
+    :param documents: path -> document, its current text replaces any fileContent
+                      recorded in `open_files`.
+    """
+    configure: Union[None, dict] = None
+    compiler_options: Union[None, dict] = None
+    open_files: dict[str, dict] = field(default_factory=dict)
+    documents: dict[str, TSDocument] = field(default_factory=dict)
+
+    def copy(self) -> 'TSServerSession':
+        return TSServerSession(
+            configure=copy.deepcopy(self.configure),
+            compiler_options=copy.deepcopy(self.compiler_options),
+            open_files={path: dict(args) for path, args in self.open_files.items()},
+            documents={
+                path: TSDocument(doc.path, doc.text, doc.version)
+                for path, doc in self.documents.items()
+            }
+        )
+
+    def open_arguments(self) -> list[dict]:
+        """
+        OpenRequestArgs reopening every file, for an updateOpen request.
+        """
+        ret = []
+        for path, args in self.open_files.items():
+            doc = self.documents.get(path, None)
+            if doc is not None:
+                args = args | {'fileContent': doc.text}
+            ret.append(args)
+        return ret
@@ -0,0 +1,192 @@
+import os
+import time
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from .client import TSServerClient
+from .diagnostics import TSServerDiagnosticTable, DIAGNOSTIC_KINDS
+from .launch import TSServerLaunchOptions
+from typing import Iterable, Tuple, Union
+
+
+@dataclass
+class TSServerShardReport:
+    """
+    What one worker did, all durations in seconds.
+    :param start: spawning and configuring tsserver.
+    :param load: opening the shard's files until the project was loaded.
+    :param check: geterr over the shard.
+    """
+    index: int
+    files: list[str]
+    diagnostics: int = 0
+    start: float = 0.
+    load: float = 0.
+    check: float = 0.
+    pid: Union[None, int] = None
+
+
+@dataclass
+class TSServerShardedDiagnostics:
+    """
+    :param diagnostics: geterr diagnostics with their 'file' and 'diag' kind,
+                        ordered by file (in the order files were given), kind
+                        and position, whatever the sharding.
+    :param shards: one report per shard.
+    :param elapsed: wall time of the whole run, seconds.
+    """
+    diagnostics: TSServerDiagnosticTable = field(default_factory=TSServerDiagnosticTable)
+    shards: list[TSServerShardReport] = field(default_factory=list)
+    elapsed: float = 0.
+
+
+def _file_cost(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 1
+
+
+def shard_files(files: list[str], n_shards: int) -> list[list[str]]:
+    """
+    Split `files` into at most `n_shards` lists of about the same total size,
+    largest files first onto the least loaded shard. Shards keep the input order.
+    """
+    n_shards = max(1, min(n_shards, len(files)))
+    order = {path: i for i, path in enumerate(files)}
+    loads = [0] * n_shards
+    shards: list[list[str]] = [[] for _ in range(n_shards)]
+    for path in sorted(files, key=_file_cost, reverse=True):
+        idx = loads.index(min(loads))
+        shards[idx].append(path)
+        loads[idx] += _file_cost(path)
+    return [sorted(shard, key=order.__getitem__) for shard in shards if shard]
+
+
+async def project_files(
+        path: str,
+        launch_options: Union[None, TSServerLaunchOptions] = None,
+        include_node_modules: bool = False,
+        **kwargs
+) -> list[str]:
+    """
+    Source files of the project `path` belongs to, from projectInfo.
+    :param include_node_modules: keep files under node_modules, e.g. typescript's lib files.
+    :param kwargs: passed on to TSServerClient.start.
+    """
+    client = await TSServerClient.start(launch_options, **kwargs)
+    try:
+        await client.cmd_configure()
+        await client.cmd_open(path)
+        info = await client.cmd_project_info(path, need_file_name_list=True)
+    finally:
+        await client.stop()
+    files = (info or {}).get('fileNames', None) or []
+    if not include_node_modules:
+        files = [f for f in files if '/node_modules/' not in f.replace('\\', '/')]
+    return sorted(files)
+
+
+async def _check_shard_async(
+        index: int,
+        files: list[str],
+        launch_options: Union[None, TSServerLaunchOptions],
+        delay: int,
+        timeout: Union[None, float],
+        client_kwargs: dict
+) -> Tuple[TSServerDiagnosticTable, TSServerShardReport]:
+    report = TSServerShardReport(index=index, files=files, pid=os.getpid())
+    t = time.perf_counter()
+    client = await TSServerClient.start(launch_options, **client_kwargs)
+    try:
+        await client.cmd_configure()
+        report.start = time.perf_counter() - t
+        t = time.perf_counter()
+        await client.open_files(files)
+        await client.wait_project_loaded(files[0], timeout=timeout)
+        report.load = time.perf_counter() - t
+        t = time.perf_counter()
+        diagnostics = await client.cmd_get_errors(files, delay, timeout=timeout) or TSServerDiagnosticTable()
+        report.check = time.perf_counter() - t
+    finally:
+        # stop reaps tsserver before asyncio.run closes the loop
+        await client.stop()
+    report.diagnostics = len(diagnostics)
+    return diagnostics, report
+
+
+def _check_shard(*args) -> Tuple[TSServerDiagnosticTable, TSServerShardReport]:
+    # entry point of the worker processes
+    return asyncio.run(_check_shard_async(*args))
+
+
+def _diagnostic_order(file_order: dict[str, int]):
+    kind_order = {kind: i for i, kind in enumerate(DIAGNOSTIC_KINDS)}
+
+    def key(diag: dict):
+        start = diag.get('start', None) or {}
+        return (
+            file_order.get(diag['file'], len(file_order)),
+            diag['file'],
+            kind_order.get(diag['diag'], len(kind_order)),
+            start.get('line', 0),
+            start.get('offset', 0),
+            diag.get('code', 0)
+        )
+    return key
+
+
+async def check_sharded(
+        files: Union[None, Iterable[str]] = None,
+        project_file: Union[None, str] = None,
+        workers: Union[None, int] = None,
+        launch_options: Union[None, TSServerLaunchOptions] = None,
+        delay: int = 0,  # ms
+        timeout: Union[None, float] = None,
+        executor: Union[None, Executor] = None,
+        **kwargs
+) -> TSServerShardedDiagnostics:
+    """
+    Geterr over many files, split across worker processes running
+    their own tsserver each.
+    :param files: files to check.
+    :param project_file: if `files` is None, check every file of this file's
+                         project, see `project_files`.
+    :param workers: number of worker processes, defaults to the number of CPUs.
+    :param timeout: per shard, for loading the project and for checking it.
+    :param executor: runs the shards, a ProcessPoolExecutor of `workers` by default.
+    :param kwargs: passed on to TSServerClient.start in every worker,
+                   must be picklable.
+    """
+    t = time.perf_counter()
+    if files is None:
+        if project_file is None:
+            raise ValueError('files or project_file is required')
+        files = await project_files(project_file, launch_options, **kwargs)
+    files = list(dict.fromkeys(files))
+    ret = TSServerShardedDiagnostics()
+    if not files:
+        return ret
+    workers = workers or os.cpu_count() or 1
+    shards = shard_files(files, workers)
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=len(shards))
+    loop = asyncio.get_running_loop()
+    try:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, _check_shard, idx, shard, launch_options, delay, timeout, kwargs)
+            for idx, shard in enumerate(shards)
+        ))
+    finally:
+        if own_executor:
+            await loop.run_in_executor(None, functools.partial(executor.shutdown, cancel_futures=True))
+    merged = TSServerDiagnosticTable()
+    for diagnostics, report in results:
+        merged.extend(diagnostics)
+        ret.shards.append(report)
+    key = _diagnostic_order({path: i for i, path in enumerate(files)})
+    ret.diagnostics = merged.select(sorted(range(len(merged)), key=lambda row: key(merged[row])))
+    ret.elapsed = time.perf_counter() - t
+    return ret
@@ -0,0 +1,140 @@
+import asyncio
+from contextlib import asynccontextmanager
+from .client import TSServerClient
+from .launch import TSServerLaunchOptions
+from typing import (
+    Awaitable,
+    Callable,
+    Union,
+    AsyncIterator
+)
+
+
+async def _configure(client: TSServerClient):
+    await client.cmd_configure()
+
+
+class TSServerSpares:
+    """
+    Keeps `size` started and configured clients ready to be handed out,
+    so that getting a client costs neither the process spawn nor the
+    configure round trip. Every client handed out is replaced in the
+    background, and belongs to the caller, who must stop it.
+    """
+
+    def __init__(
+            self,
+            size: int = 1,
+            client_factory: Union[None, Callable[[], Awaitable[TSServerClient]]] = None,
+            launch_options: Union[None, TSServerLaunchOptions] = None,
+            setup: Union[None, Callable[[TSServerClient], Awaitable[None]]] = _configure
+    ):
+        """
+        :param size: number of clients kept ready.
+        :param client_factory: coroutine function returning a started client,
+                               defaults to TSServerClient.start.
+        :param launch_options: used by the default client factory.
+        :param setup: coroutine function run on every new client before it is
+                      handed out, sends configure by default.
+        """
+        if size <= 0:
+            raise ValueError('size must be positive')
+        self.size: int = size
+        self._factory: Callable[[], Awaitable[TSServerClient]] = (
+                client_factory or (lambda: TSServerClient.start(launch_options))
+        )
+        self._setup: Union[None, Callable[[TSServerClient], Awaitable[None]]] = setup
+        # ready clients, or the exception a refill failed with
+        self._ready: asyncio.Queue[Union[TSServerClient, BaseException]] = asyncio.Queue()
+        self._refills: set[asyncio.Task] = set()
+
+    @classmethod
+    async def start(
+            cls,
+            size: int = 1,
+            client_factory: Union[None, Callable[[], Awaitable[TSServerClient]]] = None,
+            launch_options: Union[None, TSServerLaunchOptions] = None,
+            setup: Union[None, Callable[[TSServerClient], Awaitable[None]]] = _configure
+    ) -> 'TSServerSpares':
+        """
+        Start the spares and wait until all of them are ready.
+        """
+        self = cls(size, client_factory, launch_options, setup)
+        for _ in range(size):
+            self._refill()
+        await asyncio.gather(*self._refills)
+        return self
+
+    async def stop(self):
+        for task in list(self._refills):
+            task.cancel()
+        await asyncio.gather(*self._refills, return_exceptions=True)
+        clients = []
+        while not self._ready.empty():
+            item = self._ready.get_nowait()
+            if isinstance(item, TSServerClient):
+                clients.append(item)
+        await asyncio.gather(*(client.stop() for client in clients), return_exceptions=True)
+
+    @property
+    def available(self) -> int:
+        """
+        Number of clients ready to be handed out right away.
+        """
+        return self._ready.qsize()
+
+    def _refill(self):
+        task = asyncio.create_task(self._make_client())
+        self._refills.add(task)
+        task.add_done_callback(self._refills.discard)
+
+    async def _make_client(self):
+        try:
+            client = await self._factory()
+        except Exception as e:
+            self._ready.put_nowait(e)
+            return
+        try:
+            if self._setup is not None:
+                await self._setup(client)
+        except BaseException as e:
+            # also when cancelled by `stop`, the client is nobody else's to stop
+            await client.stop()
+            if not isinstance(e, Exception):
+                raise
+            self._ready.put_nowait(e)
+            return
+        self._ready.put_nowait(client)
+
+    async def acquire(self) -> TSServerClient:
+        """
+        Hand out a ready client, waiting for one if none is left.
+        Raises the exception a replacement failed to start with.
+        """
+        while True:
+            item = await self._ready.get()
+            self._refill()
+            if isinstance(item, BaseException):
+                raise item
+            if item.is_alive:
+                return item
+            await item.stop()
+
+    @asynccontextmanager
+    async def client_on_file(
+            self,
+            file_path: str,
+            wait_loaded: bool = True
+    ) -> AsyncIterator[TSServerClient]:
+        """
+        Like TSServerClient.create_on_file, with a spare client.
+        :param wait_loaded: yield only once the project of `file_path` is loaded.
+        """
+        client = await self.acquire()
+        try:
+            await client.cmd_open(file_path)
+            if wait_loaded:
+                await client.wait_project_loaded(file_path)
+            yield client
+        finally:
+            await client.stop()
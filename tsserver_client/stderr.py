@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STDERR_MAX_BYTES = 64 * 1024
+
+
+class TSServerStderrBuffer:
+    """
+    Ring buffer keeping the most recent lines written to stderr,
+    at most `max_bytes` in total.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_STDERR_MAX_BYTES):
+        self.max_bytes: int = max_bytes
+        self._lines: deque[bytes] = deque()
+        self._size: int = 0
+        self._partial: bytearray = bytearray()
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """
+        :return: the lines completed by `chunk`.
+        """
+        self._partial += chunk
+        *lines, rest = self._partial.split(b'\n')
+        if len(rest) > self.max_bytes:  # unterminated line, keep its end only
+            lines.append(rest)
+            rest = b''
+        self._partial = bytearray(rest)
+        for line in lines:
+            self._append(bytes(line))
+        return lines
+
+    def _append(self, line: bytes):
+        line = line[-self.max_bytes:]
+        self._lines.append(line)
+        self._size += len(line) + 1
+        # the newest line stays, even when it fills the buffer on its own
+        while self._size > self.max_bytes and len(self._lines) > 1:
+            self._size -= len(self._lines.popleft()) + 1
+
+    def tail(self, n_lines: Union[None, int] = None) -> str:
+        lines = list(self._lines)
+        if self._partial:
+            lines.append(bytes(self._partial))
+        if n_lines is not None:
+            lines = lines[-n_lines:]
+        return b'\n'.join(lines).decode('utf-8', errors='replace')
+
+
+async def drain_stderr(
+        stream: asyncio.StreamReader,
+        buffer: TSServerStderrBuffer,
+        callback: Union[None, Callable[[str], None]] = None,
+        chunk_size: int = 64 * 1024
+):
+    """
+    Read `stream` until EOF so the child never blocks on a full stderr pipe.
+    """
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            return
+        lines = buffer.feed(chunk)
+        if callback is not None:
+            for line in lines:
+                try:
+                    callback(line.decode('utf-8', errors='replace').rstrip('\r'))
+                except Exception:
+                    # keep draining, a stalled stderr pipe blocks tsserver
+                    logger.exception('on_stderr callback failed')
@@ -0,0 +1,294 @@
+import asyncio
+import logging
+from .client import TSServerClient
+from .comm import TSServerProcessException
+from .diagnostics import TSServerDiagnosticTable
+from .documents import TSDocument
+from .launch import TSServerLaunchOptions
+from typing import (
+    Awaitable,
+    Callable,
+    Iterable,
+    Union
+)
+
+logger = logging.getLogger(__name__)
+
+
+def process_rss(pid: int) -> Union[None, int]:
+    """
+    Resident set size of a process in bytes, None where /proc is not available.
+    """
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii', errors='replace') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+class TSServerSupervisor:
+    """
+    Keeps a TSServerClient running, exposing its `cmd_*` and document surface.
+
+    tsserver is replaced by a fresh one when its process exits, when its
+    resident memory exceeds `max_rss`, or after `max_requests` calls. The new
+    tsserver is spawned while the old one still serves, then receives the
+    recorded session (see TSServerClient.session) before calls are switched
+    over, so callers only notice a short pause. A call that fails because
+    tsserver died is retried once on the new tsserver, except edits that
+    were already applied to a document.
+
+    Event subscriptions and other state kept on a client object are not
+    carried over, `client` may change after every await.
+    """
+
+    def __init__(
+            self,
+            client: TSServerClient,
+            client_factory: Callable[[], Awaitable[TSServerClient]],
+            max_rss: Union[None, int] = None,
+            max_requests: Union[None, int] = None,
+            check_interval: float = 5.,
+            drain_timeout: float = 10.
+    ):
+        """
+        :param client: the running client.
+        :param client_factory: coroutine function returning a started client.
+        :param max_rss: restart once tsserver uses more memory than this, in bytes.
+        :param max_requests: restart after this many calls.
+        :param check_interval: seconds between memory checks.
+        :param drain_timeout: seconds a planned restart waits for calls in flight
+                              on the old tsserver, those still running afterwards
+                              fail and are retried.
+        """
+        self._client: TSServerClient = client
+        self._factory: Callable[[], Awaitable[TSServerClient]] = client_factory
+        self.max_rss: Union[None, int] = max_rss
+        self.max_requests: Union[None, int] = max_requests
+        self.check_interval: float = check_interval
+        self.drain_timeout: float = drain_timeout
+        self.restarts: int = 0
+        self.last_restart_reason: Union[None, str] = None
+        self._requests: int = 0
+        self._in_flight: dict[TSServerClient, int] = {}
+        self._drained: asyncio.Condition = asyncio.Condition()
+        self._available: asyncio.Event = asyncio.Event()
+        self._available.set()
+        self._restart_lock: asyncio.Lock = asyncio.Lock()
+        self._background: set[asyncio.Task] = set()
+        self._planned: Union[None, asyncio.Task] = None
+        self._watching: asyncio.Task = asyncio.create_task(self._watch())
+
+    @classmethod
+    async def start(
+            cls,
+            client_factory: Union[None, Callable[[], Awaitable[TSServerClient]]] = None,
+            launch_options: Union[None, TSServerLaunchOptions] = None,
+            **kwargs
+    ) -> 'TSServerSupervisor':
+        """
+        :param client_factory: coroutine function returning a started client,
+                               defaults to TSServerClient.start.
+        :param launch_options: used by the default client factory.
+        :param kwargs: passed on to __init__.
+        """
+        factory = client_factory or (lambda: TSServerClient.start(launch_options))
+        return cls(await factory(), factory, **kwargs)
+
+    async def stop(self):
+        self._watching.cancel()
+        for task in list(self._background):
+            task.cancel()
+        await self._client.stop()
+
+    @property
+    def client(self) -> TSServerClient:
+        return self._client
+
+    def rss(self) -> Union[None, int]:
+        proc = self._client.process
+        return None if proc is None else process_rss(proc.pid)
+
+    async def restart(self, reason: str = 'requested'):
+        await self._replace(self._client, reason)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._on_background_done)
+        return task
+
+    def _on_background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error('Supervisor task failed', exc_info=task.exception())
+
+    async def _watch(self):
+        while True:
+            client = self._client
+            proc = client.process
+            if proc is None:
+                return
+            reason = None
+            try:
+                await asyncio.wait_for(asyncio.shield(proc.wait()), self.check_interval)
+                reason = f'exited with code {proc.returncode}'
+            except asyncio.TimeoutError:
+                if self.max_rss is not None:
+                    rss = process_rss(proc.pid)
+                    if rss is not None and rss > self.max_rss:
+                        reason = f'memory: {rss} bytes'
+            if reason is None:
+                continue
+            try:
+                await self._replace(client, reason)
+            except Exception:
+                # tsserver could not be started, try again later
+                logger.exception('Restarting tsserver (%s) failed', reason)
+                await asyncio.sleep(self.check_interval)
+
+    async def _replace(self, client: TSServerClient, reason: str):
+        async with self._restart_lock:
+            if self._client is not client:  # already replaced
+                return
+            new_client = await self._factory()
+            self._available.clear()
+            try:
+                if client.is_alive:
+                    async with self._drained:
+                        try:
+                            await asyncio.wait_for(
+                                self._drained.wait_for(lambda: not self._in_flight.get(client, 0)),
+                                self.drain_timeout
+                            )
+                        except asyncio.TimeoutError:
+                            pass
+                try:
+                    await new_client.restore_session(client.session())
+                except BaseException:
+                    await new_client.stop()
+                    raise
+                self._client = new_client
+                self._requests = 0
+                self.restarts += 1
+                self.last_restart_reason = reason
+            finally:
+                self._available.set()
+        self._spawn(self._retire(client))
+
+    async def _retire(self, client: TSServerClient):
+        proc = client.process
+        try:
+            await client.stop(self.drain_timeout)
+        except (TSServerProcessException, OSError):
+            if proc is not None and proc.returncode is None:
+                proc.kill()
+
+    async def _call(self, method: str, *args, retry: bool = True, **kwargs):
+        await self._available.wait()
+        client = self._client
+        self._requests += 1
+        if (self.max_requests is not None and self._requests >= self.max_requests
+                and (self._planned is None or self._planned.done())):
+            self._planned = self._spawn(self._replace(client, f'{self._requests} requests'))
+        self._in_flight[client] = self._in_flight.get(client, 0) + 1
+        try:
+            return await getattr(client, method)(*args, **kwargs)
+        except TSServerProcessException:
+            if not retry:
+                raise
+        finally:
+            self._in_flight[client] -= 1
+            if not self._in_flight[client]:
+                del self._in_flight[client]
+                async with self._drained:
+                    self._drained.notify_all()
+        await self._replace(client, 'request failed: tsserver exited')
+        return await self._call(method, *args, retry=False, **kwargs)
+
+    async def cmd_configure(self, **kwargs) -> bool:
+        return await self._call('cmd_configure', **kwargs)
+
+    async def cmd_compiler_options_for_inferrd_project(self, **kwargs) -> bool:
+        return await self._call('cmd_compiler_options_for_inferrd_project', **kwargs)
+
+    async def cmd_open(self, path: str, **kwargs) -> None:
+        return await self._call('cmd_open', path, **kwargs)
+
+    async def cmd_close(self, path: str, **kwargs) -> None:
+        return await self._call('cmd_close', path, **kwargs)
+
+    async def cmd_reload(self, path: str, alternate_path: Union[None, str] = None, **kwargs) -> bool:
+        return await self._call('cmd_reload', path, alternate_path, **kwargs)
+
+    async def cmd_change(self, path: str, *args, **kwargs) -> None:
+        return await self._call('cmd_change', path, *args, retry=False, **kwargs)
+
+    async def cmd_update_open(self, **kwargs) -> bool:
+        return await self._call('cmd_update_open', **kwargs)
+
+    async def sync_files(self, **kwargs) -> bool:
+        return await self._call('sync_files', **kwargs)
+
+    async def open_files(self, paths: Iterable[str] = (), **kwargs) -> bool:
+        return await self._call('open_files', list(paths), **kwargs)
+
+    async def close_files(self, paths: Iterable[str], **kwargs) -> bool:
+        return await self._call('close_files', list(paths), **kwargs)
+
+    def document(self, path: str) -> Union[None, TSDocument]:
+        return self._client.document(path)
+
+    @property
+    def documents(self) -> dict[str, TSDocument]:
+        return self._client.documents
+
+    async def open_document(self, path: str, text: Union[None, str] = None, **kwargs) -> TSDocument:
+        return await self._call('open_document', path, text, **kwargs)
+
+    async def edit_document(self, path: str, *args) -> TSDocument:
+        # the edit is part of the document once applied, a new tsserver already has it
+        return await self._call('edit_document', path, *args, retry=False)
+
+    async def update_document(self, path: str, text: str) -> TSDocument:
+        return await self._call('update_document', path, text)
+
+    async def close_document(self, path: str) -> None:
+        return await self._call('close_document', path)
+
+    async def cmd_completions(self, path: str, line: int, offset: int, prefix: str = '', **kwargs) -> Union[None, dict]:
+        return await self._call('cmd_completions', path, line, offset, prefix, **kwargs)
+
+    async def cmd_completion_info(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return await self._call('cmd_completion_info', path, line, offset, **kwargs)
+
+    async def cmd_completion_entry_details(self, path: str, line: int, offset: int, entry_names: list,
+                                           **kwargs) -> Union[None, list]:
+        return await self._call('cmd_completion_entry_details', path, line, offset, entry_names, **kwargs)
+
+    async def cmd_signature_help(self, path: str, line: int, offset: int, prefix: str = '', **kwargs) -> Union[None, dict]:
+        return await self._call('cmd_signature_help', path, line, offset, prefix, **kwargs)
+
+    async def cmd_organize_imports(self, path: str, **kwargs) -> Union[None, dict]:
+        return await self._call('cmd_organize_imports', path, **kwargs)
+
+    async def cmd_references(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return await self._call('cmd_references', path, line, offset, **kwargs)
+
+    async def cmd_goto_definition(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return await self._call('cmd_goto_definition', path, line, offset, **kwargs)
+
+    async def cmd_goto_type_definition(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return await self._call('cmd_goto_type_definition', path, line, offset, **kwargs)
+
+    async def cmd_quick_info(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return await self._call('cmd_quick_info', path, line, offset, **kwargs)
+
+    async def cmd_get_errors(self, path_list: list[str], delay: int = 0, **kwargs) -> Union[None, TSServerDiagnosticTable]:
+        return await self._call('cmd_get_errors', path_list, delay, **kwargs)
+
+    async def cmd_get_errors_for_project(self, path: str, delay: int = 0, **kwargs) -> Union[None, TSServerDiagnosticTable]:
+        return await self._call('cmd_get_errors_for_project', path, delay, **kwargs)
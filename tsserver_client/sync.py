@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import concurrent.futures
+from .client import TSServerClient
+from .diagnostics import TSServerDiagnosticTable
+from .documents import TSDocument
+from .launch import TSServerLaunchOptions
+from typing import (
+    Awaitable,
+    Callable,
+    Iterable,
+    Union
+)
+
+
+class SyncTSServerClient:
+    """
+    Blocking, thread-safe facade of TSServerClient.
+
+    The client runs on an event loop in a dedicated thread, every method
+    submits its coroutine to that loop and waits for the result, so any
+    number of threads can send requests concurrently over the same tsserver.
+    `submit` returns a concurrent.futures.Future instead of blocking.
+    """
+
+    def __init__(
+            self,
+            launch_options: Union[None, TSServerLaunchOptions] = None,
+            client_factory: Union[None, Callable[[], Awaitable[TSServerClient]]] = None,
+            **kwargs
+    ):
+        """
+        :param launch_options: used by the default client factory.
+        :param client_factory: coroutine function returning a started client, or
+                               anything with the same `cmd_*` surface and `stop`,
+                               e.g. TSServerPool.start. Defaults to TSServerClient.start.
+        :param kwargs: passed on to TSServerClient.start by the default client factory.
+        """
+        factory = client_factory or (lambda: TSServerClient.start(launch_options, **kwargs))
+        self._loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self._thread: threading.Thread = threading.Thread(
+            target=self._loop.run_forever,
+            name='tsserver-client-loop',
+            daemon=True
+        )
+        self._thread.start()
+        try:
+            self._client = self._run(factory())
+        except BaseException:
+            self._shutdown_loop()
+            raise
+
+    def __enter__(self) -> 'SyncTSServerClient':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def client(self) -> TSServerClient:
+        """
+        The wrapped client, only to be used on `loop`.
+        """
+        return self._client
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def _run(self, coro: Awaitable, timeout: Union[None, float] = None):
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError('SyncTSServerClient called from its own event loop')
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def _shutdown_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        try:
+            self._run(self._client.stop())
+        finally:
+            self._shutdown_loop()
+
+    def submit(self, method: str, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Call a coroutine method of the client without blocking,
+        e.g. submit('cmd_quick_info', path, line, offset).
+        """
+        return asyncio.run_coroutine_threadsafe(
+            getattr(self._client, method)(*args, **kwargs),
+            self._loop
+        )
+
+    def _call(self, method: str, *args, **kwargs):
+        return self._run(getattr(self._client, method)(*args, **kwargs))
+
+    def cmd_configure(self, **kwargs) -> bool:
+        return self._call('cmd_configure', **kwargs)
+
+    def cmd_compiler_options_for_inferrd_project(self, **kwargs) -> bool:
+        return self._call('cmd_compiler_options_for_inferrd_project', **kwargs)
+
+    def cmd_open(self, path: str, **kwargs) -> None:
+        return self._call('cmd_open', path, **kwargs)
+
+    def cmd_close(self, path: str, **kwargs) -> None:
+        return self._call('cmd_close', path, **kwargs)
+
+    def cmd_reload(self, path: str, alternate_path: Union[None, str] = None, **kwargs) -> bool:
+        return self._call('cmd_reload', path, alternate_path, **kwargs)
+
+    def cmd_change(self, path: str, *args, **kwargs) -> None:
+        return self._call('cmd_change', path, *args, **kwargs)
+
+    def cmd_update_open(self, **kwargs) -> bool:
+        return self._call('cmd_update_open', **kwargs)
+
+    def sync_files(self, **kwargs) -> bool:
+        return self._call('sync_files', **kwargs)
+
+    def open_files(self, paths: Iterable[str] = (), **kwargs) -> bool:
+        return self._call('open_files', list(paths), **kwargs)
+
+    def close_files(self, paths: Iterable[str], **kwargs) -> bool:
+        return self._call('close_files', list(paths), **kwargs)
+
+    def open_document(self, path: str, text: Union[None, str] = None, **kwargs) -> TSDocument:
+        return self._call('open_document', path, text, **kwargs)
+
+    def edit_document(self, path: str, *args) -> TSDocument:
+        return self._call('edit_document', path, *args)
+
+    def update_document(self, path: str, text: str) -> TSDocument:
+        return self._call('update_document', path, text)
+
+    def close_document(self, path: str) -> None:
+        return self._call('close_document', path)
+
+    def wait_project_loaded(self, path: Union[None, str] = None, **kwargs) -> Union[None, dict]:
+        return self._call('wait_project_loaded', path, **kwargs)
+
+    def cmd_completions(self, path: str, line: int, offset: int, prefix: str = '', **kwargs) -> Union[None, dict]:
+        return self._call('cmd_completions', path, line, offset, prefix, **kwargs)
+
+    def cmd_completion_info(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return self._call('cmd_completion_info', path, line, offset, **kwargs)
+
+    def cmd_completion_entry_details(self, path: str, line: int, offset: int, entry_names: list,
+                                     **kwargs) -> Union[None, list]:
+        return self._call('cmd_completion_entry_details', path, line, offset, entry_names, **kwargs)
+
+    def cmd_signature_help(self, path: str, line: int, offset: int, prefix: str = '', **kwargs) -> Union[None, dict]:
+        return self._call('cmd_signature_help', path, line, offset, prefix, **kwargs)
+
+    def cmd_organize_imports(self, path: str, **kwargs) -> Union[None, dict]:
+        return self._call('cmd_organize_imports', path, **kwargs)
+
+    def cmd_references(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return self._call('cmd_references', path, line, offset, **kwargs)
+
+    def cmd_goto_definition(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return self._call('cmd_goto_definition', path, line, offset, **kwargs)
+
+    def cmd_goto_type_definition(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return self._call('cmd_goto_type_definition', path, line, offset, **kwargs)
+
+    def cmd_quick_info(self, path: str, line: int, offset: int, **kwargs) -> Union[None, dict]:
+        return self._call('cmd_quick_info', path, line, offset, **kwargs)
+
+    def cmd_get_errors(self, path_list: list[str], delay: int = 0, **kwargs) -> Union[None, TSServerDiagnosticTable]:
+        return self._call('cmd_get_errors', path_list, delay, **kwargs)
+
+    def cmd_get_errors_for_project(self, path: str, delay: int = 0, **kwargs) -> Union[None, TSServerDiagnosticTable]:
+        return self._call('cmd_get_errors_for_project', path, delay, **kwargs)